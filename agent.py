@@ -1,21 +1,63 @@
+import json
+import os
+import shutil
 import numpy as np
 import tensorflow as tf
-from collections import deque
 import random
-import chess
-from engine import ChessEngine
+from core import ChessEngine
+from replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from encoding import board_to_state, move_to_index, index_to_move, legal_mask, masked_argmax, STATE_SIZE, ACTION_SIZE
+from evaluation import get_reward, IncrementalEvaluator
+from selfplay import SelfPlayPool
+from vecenv import VecChessEnv
+from telemetry import Telemetry
+from dataset import iter_shards, shard_batch
 
 class DQNAgent:
-    def __init__(self, state_size, action_size):
+    """Deep Q-network agent over the encoding.py state and action spaces.
+
+    With target_update set, targets bootstrap from a separate target
+    network that is copied from the online network every target_update
+    training steps; with tau set it instead tracks the online network by
+    Polyak averaging after every step. double_dqn picks the next action
+    with the online network and evaluates it with the target network.
+    Without either option, targets come from the network being trained.
+
+    With prioritized set, replay memory is a PrioritizedReplayBuffer:
+    transitions are replayed in proportion to their last TD error (so the
+    rare checkmates with reward +-100 are not drowned out by quiet moves),
+    importance-sampling weights scale each transition's loss and the
+    batch's TD errors become the new priorities.
+
+    Forward passes and replay stages are timed through telemetry, a
+    telemetry.Telemetry that records nothing unless one is passed in.
+    """
+    CHECKPOINT_META = "agent.json"
+
+    def __init__(self, state_size, action_size, memory_size=2000, memory_path=None,
+                 target_update=None, tau=None, double_dqn=False, telemetry=None, prioritized=False):
         self.state_size = state_size
+        self.telemetry = telemetry if telemetry is not None else Telemetry(enabled=False)
         self.action_size = action_size
-        self.memory = deque(maxlen=2000)
+        self.prioritized = prioritized
+        memory_class = PrioritizedReplayBuffer if prioritized else ReplayBuffer
+        self.memory = memory_class(memory_size, state_size, path=memory_path, mask_size=action_size)
         self.gamma = 0.95  # Discount rate
         self.epsilon = 1.0  # Exploration rate
         self.epsilon_min = 0.01
         self.epsilon_decay = 0.995
         self.learning_rate = 0.001
         self.model = self._build_model()
+        self._predict = self._build_predict()
+        self.target_update = target_update
+        self.tau = tau
+        self.double_dqn = double_dqn
+        self.train_steps = 0
+        self.target_model = None
+        if target_update or tau:
+            self.target_model = self._build_model()
+            self.target_model.set_weights(self.model.get_weights())
+            self._soft_update = self._build_soft_update()
         
     
     def _build_model(self):
@@ -28,150 +70,445 @@ class DQNAgent:
         model.compile(loss='mse', optimizer=tf.keras.optimizers.Adam(learning_rate=self.learning_rate))
         return model
 
-    def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+    def _build_predict(self):
+        """Trace the model's forward pass once for any batch of float32 states.
+
+        model.predict builds a data pipeline on every call, which costs
+        milliseconds per move; the traced function runs only the network.
+        Calling the concrete function directly also skips tf.function's
+        per-call signature matching.
+        """
+        model = self.model
+
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None, self.state_size), dtype=tf.float32)])
+        def predict(states):
+            return model(states, training=False)
+        return predict.get_concrete_function()
+
+    def _build_soft_update(self):
+        """Trace the Polyak update of all target weights into one graph call."""
+        pairs = list(zip(self.target_model.weights, self.model.weights))
+        tau = self.tau
+
+        @tf.function
+        def soft_update():
+            for target, online in pairs:
+                target.assign(tau * online + (1.0 - tau) * target)
+        return soft_update
+
+    def q_values(self, states):
+        """Q-values of a (batch, state_size) array of states through the traced forward pass."""
+        self.telemetry.count("predicts", len(states))
+        with self.telemetry.stage("predict"):
+            return self._predict(tf.convert_to_tensor(states, dtype=tf.float32)).numpy()
+
+    def remember(self, state, action, reward, next_state, done, next_legal_moves=None):
+        next_mask = legal_mask(next_legal_moves) if next_legal_moves is not None else None
+        self.memory.add(state, self.move_to_index(action), reward, next_state, done, next_mask)
 
     def act(self, state, legal_moves):
+        if not legal_moves:
+            return None
         if np.random.rand() <= self.epsilon:
-            return random.choice(legal_moves) if legal_moves else None
+            return random.choice(legal_moves)
         
         state_tensor = np.reshape(state, [1, self.state_size])
-        act_values = self.model.predict(state_tensor, verbose=0)
-        
-        # Filter predictions for only legal moves
-        legal_moves_list = list(legal_moves)
-        legal_moves_indices = [self.move_to_index(move) for move in legal_moves_list]
-        legal_move_values = [(i, act_values[0][i]) for i in legal_moves_indices]
+        act_values = self.q_values(state_tensor)
         
-        if not legal_move_values:
-            return None
-            
-        best_move_index = max(legal_move_values, key=lambda x: x[1])[0]
-        return self.index_to_move(best_move_index)
+        # Only legal moves can be chosen
+        return self.index_to_move(int(masked_argmax(act_values[0], legal_mask(legal_moves))))
+
+    def act_batch(self, states, masks, rng=np.random):
+        """Epsilon-greedy action indices for a batch of states with one forward pass."""
+        actions = masked_argmax(self.q_values(states), masks)
+        explore = rng.random_sample(len(actions)) <= self.epsilon
+        if explore.any():
+            # A uniformly random legal action: the legal entry with the largest random key
+            keys = rng.random_sample((int(explore.sum()), masks.shape[1]))
+            actions[explore] = masked_argmax(keys, masks[explore])
+        return actions
+
+    def choose_move(self, board, timer=None):
+        """Opponent interface used by ChessEngine: play the greedy move for board."""
+        legal_moves = list(board.legal_moves)
+        if not legal_moves:
+            return None, None
+        values = self.q_values(board_to_state(board)[np.newaxis])[0]
+        return self.index_to_move(int(masked_argmax(values, legal_mask(legal_moves)))), None
 
     def replay(self, batch_size):
         if len(self.memory) < batch_size:
             return
         
-        minibatch = random.sample(self.memory, batch_size)
-        states = np.zeros((batch_size, self.state_size))
-        targets = np.zeros((batch_size, self.action_size))
-
-        for i, (state, action, reward, next_state, done) in enumerate(minibatch):
-            target = reward
-            if not done:
-                next_state_tensor = np.reshape(next_state, [1, self.state_size])
-                target = reward + self.gamma * np.amax(self.model.predict(next_state_tensor, verbose=0)[0])
-            
-            target_f = self.model.predict(np.reshape(state, [1, self.state_size]), verbose=0)
-            action_index = self.move_to_index(action)
-            target_f[0][action_index] = target
-            
-            states[i] = state
-            targets[i] = target_f[0]
+        with self.telemetry.stage("replay_sample"):
+            batch = self.memory.sample(batch_size)
+        if self.prioritized:
+            *batch, weights, indices = batch
+            td_errors = self.train_batch(*batch, weights=weights)
+            with self.telemetry.stage("replay_priorities"):
+                self.memory.update_priorities(indices, td_errors)
+        else:
+            self.train_batch(*batch)
 
-        self.model.fit(states, targets, epochs=1, verbose=0)
-        
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
 
+    def train_batch(self, states, actions, rewards, next_states, dones, next_masks, weights=None):
+        """One Q-learning step on a batch of transitions; return their TD errors.
+
+        Rows of next_masks without any legal action are unknown and
+        bootstrap from all actions. weights, if given, scales each
+        transition's loss (importance sampling).
+        """
+        telemetry = self.telemetry
+        batch_size = len(actions)
+        # One forward pass for all next states and one for all states
+        with telemetry.stage("replay_predict"):
+            next_q_values = self.model.predict_on_batch(next_states)
+            targets = self.model.predict_on_batch(states)
+            target_q_values = self.target_model.predict_on_batch(next_states) if self.target_model is not None else None
+        # Bootstrap from the best legal next move; rows with an unknown mask fall back to all actions
+        known = next_masks.any(axis=1)
+        next_masks[~known] = True
+        rows = np.arange(batch_size)
+        if self.target_model is None:
+            next_values = next_q_values[rows, masked_argmax(next_q_values, next_masks)]
+        else:
+            selector = next_q_values if self.double_dqn else target_q_values
+            next_values = target_q_values[rows, masked_argmax(selector, next_masks)]
+        target_values = rewards + self.gamma * next_values * (1.0 - dones)
+        td_errors = target_values - targets[rows, actions]
+        targets[rows, actions] = target_values
+
+        with telemetry.stage("fit"):
+            self.model.train_on_batch(states, targets, sample_weight=weights)
+            self.train_steps += 1
+            self._update_target()
+        telemetry.count("replay_steps")
+        return td_errors
+
+    def _update_target(self):
+        """Hard-copy or Polyak-average the online weights into the target network."""
+        if self.target_model is None:
+            return
+        if self.tau:
+            self._soft_update()
+        elif self.train_steps % self.target_update == 0:
+            self.target_model.set_weights(self.model.get_weights())
+
+    def save_checkpoint(self, path, **metadata):
+        """Save weights, optimizer state, epsilon and replay memory to the directory path.
+
+        The checkpoint is written next to path and moved into place only when
+        complete, so a run killed while saving keeps its previous checkpoint.
+        A memory-mapped replay buffer is flushed in place instead of copied.
+        Extra keyword arguments (e.g. the episode number) are stored with it
+        and returned by load_checkpoint().
+        """
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        optimizer = self.model.optimizer
+        optimizer.build(self.model.trainable_variables)
+        arrays = {f"model_{i}": w for i, w in enumerate(self.model.get_weights())}
+        arrays.update({f"optimizer_{i}": v.numpy() for i, v in enumerate(optimizer.variables)})
+        if self.target_model is not None:
+            arrays.update({f"target_{i}": w for i, w in enumerate(self.target_model.get_weights())})
+        np.savez(os.path.join(tmp_path, "weights.npz"), **arrays)
+
+        if self.memory.path is None:
+            self.memory.save(os.path.join(tmp_path, "memory.npz"))
+        else:
+            self.memory.flush()
+        with open(os.path.join(tmp_path, self.CHECKPOINT_META), "w") as f:
+            json.dump({"epsilon": self.epsilon, "train_steps": self.train_steps, "metadata": metadata}, f)
+
+        old_path = f"{path}.old"
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def load_checkpoint(self, path):
+        """Restore a checkpoint written by save_checkpoint(); return its metadata, or None if there is none."""
+        if not os.path.exists(os.path.join(path, self.CHECKPOINT_META)):
+            # Interrupted between the two renames of save_checkpoint()
+            if os.path.exists(os.path.join(f"{path}.old", self.CHECKPOINT_META)):
+                path = f"{path}.old"
+            else:
+                return None
+        with open(os.path.join(path, self.CHECKPOINT_META)) as f:
+            meta = json.load(f)
+
+        with np.load(os.path.join(path, "weights.npz")) as data:
+            self.model.set_weights([data[f"model_{i}"] for i in range(len(self.model.weights))])
+            optimizer = self.model.optimizer
+            optimizer.build(self.model.trainable_variables)
+            for i, variable in enumerate(optimizer.variables):
+                variable.assign(data[f"optimizer_{i}"])
+            if self.target_model is not None:
+                if "target_0" in data:
+                    self.target_model.set_weights([data[f"target_{i}"] for i in range(len(self.target_model.weights))])
+                else:
+                    self.target_model.set_weights(self.model.get_weights())
+
+        memory_file = os.path.join(path, "memory.npz")
+        if self.memory.path is None and os.path.exists(memory_file):
+            self.memory.load(memory_file)
+        self.epsilon = meta["epsilon"]
+        self.train_steps = meta["train_steps"]
+        return meta["metadata"]
+
     def move_to_index(self, move):
         """Convert a chess move to a unique index."""
-        return move.from_square * 64 + move.to_square
+        return move_to_index(move)
 
     def index_to_move(self, index):
         """Convert an index back to a chess move."""
-        from_square = index // 64
-        to_square = index % 64
-        return chess.Move(from_square, to_square)
+        return index_to_move(index)
 
-def board_to_state(board):
-    """Convert chess board to neural network input state."""
-    state = np.zeros(8 * 8 * 12, dtype=np.float32)
-    
-    piece_types = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING]
-    
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece:
-            # Calculate piece index (0-5 for white pieces, 6-11 for black pieces)
-            piece_idx = piece_types.index(piece.piece_type)
-            if not piece.color:  # If black piece
-                piece_idx += 6
-            
-            square_idx = square * 12 + piece_idx
-            state[square_idx] = 1
-    
-    return state
-
-def get_reward(board):
-    """Calculate reward based on game state."""
-    if board.is_checkmate():
-        return 100 if board.turn == chess.BLACK else -100
-    elif board.is_stalemate():
-        return 0
-    
-    # Material counting using proper piece types
-    piece_values = {
-        chess.PAWN: 1,
-        chess.KNIGHT: 3,
-        chess.BISHOP: 3,
-        chess.ROOK: 5,
-        chess.QUEEN: 9,
-        chess.KING: 0
-    }
-    
-    white_material = 0
-    black_material = 0
-    
-    for piece_type in piece_values:
-        white_material += len(board.pieces(piece_type, chess.WHITE)) * piece_values[piece_type]
-        black_material += len(board.pieces(piece_type, chess.BLACK)) * piece_values[piece_type]
-    
-    # Center control
-    center_squares = [chess.E4, chess.E5, chess.D4, chess.D5]
-    white_center = sum(1 for sq in center_squares if board.piece_at(sq) and board.piece_at(sq).color == chess.WHITE)
-    black_center = sum(1 for sq in center_squares if board.piece_at(sq) and board.piece_at(sq).color == chess.BLACK)
-    
-    return (white_material - black_material) + (white_center - black_center) * 0.5
+def _record_episode(telemetry, agent, episode):
+    """Add the agent's gauges to the telemetry and close the episode's record."""
+    telemetry.gauge("epsilon", agent.epsilon)
+    telemetry.gauge("buffer_fill", len(agent.memory) / agent.memory.capacity)
+    telemetry.end_episode(episode)
+
+# Longest random opening played from a book whose max_depth is None
+BOOK_PLIES = 20
 
-def train_dqn_agent(episodes=1000):
-    game = ChessEngine()
-    state_size = 8 * 8 * 12  # 8x8 board with 12 piece types
-    action_size = 64 * 64    # All possible from-to square combinations
-    agent = DQNAgent(state_size, action_size)
+def train_dqn_agent(episodes=1000, memory_path=None, checkpoint_path=None, checkpoint_interval=50,
+                    target_update=None, tau=None, double_dqn=False, telemetry=None, book=None, tablebase=None,
+                    prioritized=False):
+    """Train a DQNAgent on games against itself in one process.
+
+    With checkpoint_path set, a checkpoint is saved every
+    checkpoint_interval episodes and a run started with the same path
+    resumes after the last saved episode. A telemetry.Telemetry passed as
+    telemetry records the time of every stage of each ply per episode.
+    With a book.OpeningBook as book, every episode starts after a random
+    number (up to the book's max_depth, or BOOK_PLIES for a book without
+    one) of weighted random book moves, which are not stored as
+    transitions. With a tablebase.EndgameTablebase as
+    tablebase, positions it covers get their tablebase reward and end the
+    episode, since their result is already decided; the plies this saves
+    against the move limit are reported per episode. prioritized replays
+    transitions in proportion to their TD error (see DQNAgent).
+    """
+    telemetry = telemetry if telemetry is not None else Telemetry(enabled=False)
+    game = ChessEngine(evaluator=IncrementalEvaluator())
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, memory_path=memory_path, target_update=target_update, tau=tau,
+                     double_dqn=double_dqn, telemetry=telemetry, prioritized=prioritized)
+    start_episode = 0
+    if checkpoint_path:
+        metadata = agent.load_checkpoint(checkpoint_path)
+        if metadata is not None:
+            start_episode = metadata["episode"]
+            print(f"Resuming from {checkpoint_path} after episode {start_episode}")
     
-    for episode in range(episodes):
+    for episode in range(start_episode, episodes):
+        telemetry.begin_episode(episode + 1)
         game.reset()
+        if book is not None:
+            with telemetry.stage("book"):
+                depth = book.max_depth if book.max_depth is not None else BOOK_PLIES
+                book.play_opening(game, plies=random.randint(0, depth))
         state = board_to_state(game.board)
         total_reward = 0
         move_count = 0
+        max_moves = 100  # Move limit to prevent infinite games
+        decided = False
         
-        while not game.game_over and move_count < 100:  # Add move limit to prevent infinite games
-            legal_moves = list(game.board.legal_moves)
+        while not game.game_over and not decided and move_count < max_moves:
+            legal_moves = game.legal_moves()
             if not legal_moves:
                 break
                 
-            action = agent.act(state, legal_moves)
+            with telemetry.stage("act"):
+                action = agent.act(state, legal_moves)
             if action is None:
                 break
                 
             # Make move and get new state
-            game.make_move(action)
-            next_state = board_to_state(game.board)
-            reward = get_reward(game.board)
-            done = game.game_over or len(list(game.board.legal_moves)) == 0
+            with telemetry.stage("make_move"):
+                game.make_trusted_move(action)
+            with telemetry.stage("encode"):
+                next_state = board_to_state(game.board)
+            with telemetry.stage("move_generation"):
+                next_legal_moves = game.legal_moves()
+            with telemetry.stage("reward"):
+                reward = get_reward(game.board, game.evaluator, game.position_moves(), tablebase)
+            decided = tablebase is not None and tablebase.probe_wdl(game.board) is not None
+            done = game.game_over or not next_legal_moves or decided
             
-            agent.remember(state, action, reward, next_state, done)
+            with telemetry.stage("remember"):
+                agent.remember(state, action, reward, next_state, done, next_legal_moves)
             state = next_state
             total_reward += reward
             move_count += 1
+            telemetry.count("plies")
             
             # Train on a batch of memories
             if len(agent.memory) > 32:
-                agent.replay(32)
+                with telemetry.stage("replay"):
+                    agent.replay(32)
         
-        print(f"Episode {episode + 1}/{episodes} completed with {move_count} moves and reward {total_reward}")
+        with telemetry.stage("checkpoint"):
+            if checkpoint_path and (episode + 1) % checkpoint_interval == 0:
+                agent.save_checkpoint(checkpoint_path, episode=episode + 1)
+            else:
+                agent.memory.flush()
+        telemetry.count("move_generations_avoided", game.move_cache.avoided)
+        tablebase_note = ""
+        if tablebase is not None:
+            plies_saved = max_moves - move_count if decided else 0
+            telemetry.count("tablebase_plies_saved", plies_saved)
+            tablebase_note = f", {plies_saved} plies saved by the tablebase"
+        _record_episode(telemetry, agent, episode + 1)
+        print(f"Episode {episode + 1}/{episodes} completed with {move_count} moves and reward {total_reward} "
+              f"({game.move_cache.avoided} of {game.move_cache.requests} move generations cached{tablebase_note})")
+    telemetry.close()
+    return agent
+
+def train_dqn_agent_self_play(episodes=1000, num_workers=None, sync_interval=10, train_every=4, memory_path=None,
+                              checkpoint_path=None, checkpoint_interval=50, target_update=None, tau=None,
+                              double_dqn=False, telemetry=None, prioritized=False):
+    """Train with self-play games generated in parallel by a SelfPlayPool.
+
+    The learner stores every finished game in replay memory, runs one replay
+    step per train_every transitions and pushes its weights and epsilon to
+    the workers every sync_interval games. Checkpointing and telemetry work
+    as in train_dqn_agent; the learner's stages are waiting for games,
+    storing them and replay.
+    """
+    telemetry = telemetry if telemetry is not None else Telemetry(enabled=False)
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, memory_path=memory_path, target_update=target_update, tau=tau,
+                     double_dqn=double_dqn, telemetry=telemetry, prioritized=prioritized)
+    pending_steps = 0
+    start_episode = 0
+    if checkpoint_path:
+        metadata = agent.load_checkpoint(checkpoint_path)
+        if metadata is not None:
+            start_episode = metadata["episode"]
+            print(f"Resuming from {checkpoint_path} after episode {start_episode}")
+
+    with SelfPlayPool(agent.model.get_weights(), agent.epsilon, num_workers=num_workers) as pool:
+        for episode in range(start_episode, episodes):
+            telemetry.begin_episode(episode + 1)
+            with telemetry.stage("wait_for_game"):
+                worker_id, transitions = pool.get_game()
+            with telemetry.stage("remember"):
+                agent.memory.add_batch(*transitions)
+            move_count = len(transitions[1])
+            telemetry.count("plies", move_count)
+
+            pending_steps += move_count
+            with telemetry.stage("replay"):
+                while pending_steps >= train_every and len(agent.memory) > 32:
+                    agent.replay(32)
+                    pending_steps -= train_every
+
+            if (episode + 1) % sync_interval == 0:
+                pool.push_weights(agent.model.get_weights(), agent.epsilon)
+                agent.memory.flush()
+            if checkpoint_path and (episode + 1) % checkpoint_interval == 0:
+                agent.save_checkpoint(checkpoint_path, episode=episode + 1)
+
+            _record_episode(telemetry, agent, episode + 1)
+            print(f"Episode {episode + 1}/{episodes} (worker {worker_id}) completed with {move_count} moves "
+                  f"and reward {transitions[2].sum()}")
+    telemetry.close()
+    return agent
+
+def train_dqn_agent_vec(episodes=1000, num_envs=16, train_every=4, memory_path=None,
+                        checkpoint_path=None, checkpoint_interval=50, target_update=None, tau=None,
+                        double_dqn=False, telemetry=None, prioritized=False):
+    """Train on num_envs games stepped together by a VecChessEnv.
+
+    Every step chooses all games' moves with one forward pass and stores
+    the whole batch of transitions; one replay step runs per train_every
+    transitions. Checkpointing and telemetry work as in train_dqn_agent,
+    counting finished episodes; a telemetry record covers the steps since
+    the previous episode finished.
+    """
+    telemetry = telemetry if telemetry is not None else Telemetry(enabled=False)
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, memory_path=memory_path, target_update=target_update, tau=tau,
+                     double_dqn=double_dqn, telemetry=telemetry, prioritized=prioritized)
+    episode = 0
+    if checkpoint_path:
+        metadata = agent.load_checkpoint(checkpoint_path)
+        if metadata is not None:
+            episode = metadata["episode"]
+            print(f"Resuming from {checkpoint_path} after episode {episode}")
+
+    env = VecChessEnv(num_envs)
+    states, masks = env.reset()
+    pending_steps = 0
+    if episode < episodes:
+        telemetry.begin_episode(episode + 1)
+    while episode < episodes:
+        with telemetry.stage("act"):
+            actions = agent.act_batch(states, masks)
+        with telemetry.stage("env_step"):
+            next_states, rewards, dones, _, next_masks = env.step(actions)
+        with telemetry.stage("remember"):
+            agent.memory.add_batch(states, actions, rewards, next_states, dones, np.packbits(next_masks, axis=1))
+        states, masks = env.states, env.masks
+        telemetry.count("plies", num_envs)
+
+        pending_steps += num_envs
+        with telemetry.stage("replay"):
+            while pending_steps >= train_every and len(agent.memory) > 32:
+                agent.replay(32)
+                pending_steps -= train_every
+
+        for total_reward, move_count in env.pop_finished_episodes():
+            # Several environments can finish on the same step; the rest past the target are dropped
+            if episode >= episodes:
+                break
+            episode += 1
+            print(f"Episode {episode}/{episodes} completed with {move_count} moves and reward {total_reward}")
+            if checkpoint_path and episode % checkpoint_interval == 0:
+                agent.save_checkpoint(checkpoint_path, episode=episode)
+            _record_episode(telemetry, agent, episode)
+            if episode < episodes:
+                telemetry.begin_episode(episode + 1)
+    agent.memory.flush()
+    telemetry.close()
+    return agent
+
+def pretrain_dqn_agent(dataset_path, epochs=1, batch_size=32, checkpoint_path=None, target_update=None,
+                       tau=None, double_dqn=False, telemetry=None, seed=0):
+    """Pretrain a DQNAgent offline on positions imported from PGN games with dataset.import_pgn.
+
+    Each epoch visits the shards in a shuffled order and trains on
+    minibatches drawn without replacement from one shard at a time, with
+    the same update as replay(). Rewards are get_reward's, as in
+    self-play, and epsilon is left where it was. With checkpoint_path set,
+    the agent is saved after every epoch as an episode 0 checkpoint that
+    the train_dqn_agent functions continue from.
+    """
+    telemetry = telemetry if telemetry is not None else Telemetry(enabled=False)
+    rng = np.random.default_rng(seed)
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, target_update=target_update, tau=tau, double_dqn=double_dqn,
+                     telemetry=telemetry)
+    for epoch in range(epochs):
+        telemetry.begin_episode(epoch + 1)
+        positions = 0
+        for shard in iter_shards(dataset_path, rng):
+            order = rng.permutation(len(shard["actions"]))
+            for i in range(0, len(order) - batch_size + 1, batch_size):
+                with telemetry.stage("decode"):
+                    batch = shard_batch(shard, order[i:i + batch_size])
+                agent.train_batch(*batch)
+                positions += batch_size
+        telemetry.count("positions", positions)
+        telemetry.end_episode(epoch + 1)
+        if checkpoint_path:
+            agent.save_checkpoint(checkpoint_path, episode=0, pretrain_epochs=epoch + 1)
+        print(f"Pretraining epoch {epoch + 1}/{epochs} completed on {positions} positions")
+    telemetry.close()
+    return agent
 
 if __name__ == "__main__":
     train_dqn_agent()
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""Benchmark single-position DQNAgent.act latency.
+
+Times greedy move selection for one position at a time, as in training
+and interactive play, through model.predict (the path act used before),
+model.predict_on_batch and the agent's traced tf.function forward pass.
+Checks that all three pick the same moves and reports p50/p99 latency
+per move.
+
+Usage: python benchmarks/bench_act.py [--moves N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agent import DQNAgent
+from encoding import STATE_SIZE, ACTION_SIZE, board_to_state, legal_mask, masked_argmax, index_to_move
+
+def positions(count, seed=0):
+    """Random positions with their encoded states and legal moves."""
+    rng = random.Random(seed)
+    result = []
+    board = chess.Board()
+    while len(result) < count:
+        moves = list(board.legal_moves)
+        if not moves or board.ply() > 80:
+            board = chess.Board()
+            continue
+        result.append((board_to_state(board), moves))
+        board.push(rng.choice(moves))
+    return result
+
+def time_moves(forward, workload):
+    """Return (latencies in seconds, chosen moves) of greedy selection through forward(states)."""
+    latencies = []
+    chosen = []
+    for state, legal_moves in workload:
+        start = time.perf_counter()
+        values = forward(state[np.newaxis])[0]
+        move = index_to_move(int(masked_argmax(values, legal_mask(legal_moves))))
+        latencies.append(time.perf_counter() - start)
+        chosen.append(move)
+    return np.array(latencies), chosen
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--moves', type=int, default=500)
+    args = parser.parse_args()
+
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE)
+    workload = positions(args.moves)
+    paths = [
+        ("predict", lambda states: agent.model.predict(states, verbose=0)),
+        ("predict_on_batch", lambda states: np.asarray(agent.model.predict_on_batch(states))),
+        ("tf.function", agent.q_values),
+    ]
+
+    results = {}
+    for name, forward in paths:
+        time_moves(forward, workload[:10])  # warm up and trace
+        latencies, chosen = time_moves(forward, workload)
+        results[name] = chosen
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{name:17s} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms   {len(latencies) / latencies.sum():8,.0f} moves/s")
+    assert results["tf.function"] == results["predict"], "traced forward pass chose different moves"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Check and benchmark opening book lookups on large Polyglot books.
+
+For each size, writes a Polyglot .bin book of that many megabytes: the
+positions of the first plies of seeded random games with a few
+weighted moves each, padded with random keys. It then checks that
+OpeningBook returns exactly the stored moves and weights, and reports
+the time to open the book and the resident memory it adds as lookups
+touch pages of the map (file-backed, so the kernel can drop them). It also
+reports p50/p99 lookup latency for the first lookups with the book
+evicted from the page cache (cold), for book positions (hits) and
+positions from other games (misses), next to the cost of the Zobrist
+hash alone.
+
+Usage: python benchmarks/bench_book.py [--sizes-mb 128,512] [--lookups N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import chess
+import chess.polyglot
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from book import OpeningBook
+
+ENTRY = np.dtype([("key", ">u8"), ("move", ">u2"), ("weight", ">u2"), ("learn", ">u4")])
+
+def raw_move(board, move):
+    """Polyglot encoding of move: castling as king takes rook, promotion piece in bits 12-14."""
+    move = board._to_chess960(move)
+    promotion = move.promotion - 1 if move.promotion else 0
+    return move.to_square | move.from_square << 6 | promotion << 12
+
+def book_positions(games, plies, seed):
+    """Boards along seeded random games (deduplicated), each with up to four weighted moves."""
+    rng = random.Random(seed)
+    positions = {}
+    for _ in range(games):
+        board = chess.Board()
+        for _ in range(plies):
+            legal_moves = list(board.legal_moves)
+            if not legal_moves:
+                break
+            key = chess.polyglot.zobrist_hash(board)
+            if key not in positions:
+                moves = rng.sample(legal_moves, min(len(legal_moves), rng.randint(1, 4)))
+                positions[key] = (board.copy(), {move: rng.randint(1, 1000) for move in moves})
+            board.push(rng.choice(legal_moves))
+    return positions
+
+def write_book(filename, size_mb, positions, seed):
+    """Write a sorted Polyglot book of size_mb megabytes holding positions plus random filler keys."""
+    real = [(key, raw_move(board, move), weight)
+            for key, (board, moves) in positions.items() for move, weight in moves.items()]
+    count = max(size_mb * 1024 * 1024 // ENTRY.itemsize, len(real))
+    rng = np.random.default_rng(seed)
+    keys = rng.integers(0, 2**64, size=count, dtype=np.uint64)
+    moves = rng.integers(0, 1 << 12, size=count, dtype=np.uint16)
+    weights = rng.integers(1, 1000, size=count, dtype=np.uint16)
+    keys[:len(real)] = [key for key, _, _ in real]
+    moves[:len(real)] = [move for _, move, _ in real]
+    weights[:len(real)] = [weight for _, _, weight in real]
+    order = np.argsort(keys, kind="stable")
+    entries = np.zeros(count, dtype=ENTRY)
+    entries["key"] = keys[order]
+    entries["move"] = moves[order]
+    entries["weight"] = weights[order]
+    with open(filename, "wb") as f:
+        entries.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+        # Evict the book from the page cache so the first lookups read from disk
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return count
+
+def resident_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+def latencies(fn, boards):
+    """Sorted per-call microseconds of fn over boards."""
+    times = []
+    for board in boards:
+        start = time.perf_counter()
+        fn(board)
+        times.append((time.perf_counter() - start) * 1e6)
+    return sorted(times)
+
+def percentiles(times):
+    return f"p50 {times[len(times) // 2]:6.1f} us  p99 {times[int(len(times) * 0.99)]:6.1f} us"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes-mb', default="128,512")
+    parser.add_argument('--lookups', type=int, default=5000)
+    args = parser.parse_args()
+
+    positions = book_positions(games=2000, plies=16, seed=0)
+    misses = [board for board, _ in book_positions(games=2000, plies=16, seed=1).values()]
+    misses = [board for board in misses if chess.polyglot.zobrist_hash(board) not in positions]
+    hits = [board for board, _ in positions.values()]
+    rng = random.Random(2)
+    hit_sample = [rng.choice(hits) for _ in range(args.lookups)]
+    miss_sample = [rng.choice(misses) for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in (int(size) for size in args.sizes_mb.split(",")):
+            filename = os.path.join(tmp, f"book{size_mb}.bin")
+            count = write_book(filename, size_mb, positions, seed=size_mb)
+
+            rss = resident_kib()
+            start = time.perf_counter()
+            book = OpeningBook(filename, max_depth=None)
+            opened = (time.perf_counter() - start) * 1e3
+            after_open = resident_kib() - rss
+            cold_times = latencies(book.moves, hit_sample[:100])
+            after_100 = resident_kib() - rss
+
+            for board, moves in positions.values():
+                assert dict(book.moves(board)) == moves, board.fen()
+
+            hit_times = latencies(book.moves, hit_sample)
+            miss_times = latencies(book.moves, miss_sample)
+            hash_times = latencies(chess.polyglot.zobrist_hash, hit_sample)
+            after_all = resident_kib() - rss
+            print(f"{os.path.getsize(filename) / 2**20:5.0f} MB book ({count:,} entries): opened in {opened:.2f} ms, "
+                  f"{len(positions):,} positions checked")
+            print(f"  resident memory: +{after_open / 1024:.1f} MB after opening, +{after_100 / 1024:.1f} MB after "
+                  f"100 lookups, +{after_all / 1024:.1f} MB after all lookups (page cache, reclaimable)")
+            print(f"  cold  {percentiles(cold_times)}  (first 100 hits, book evicted from the page cache)")
+            print(f"  hit   {percentiles(hit_times)}")
+            print(f"  miss  {percentiles(miss_times)}")
+            print(f"  zobrist_hash alone  {percentiles(hash_times)}")
+            book.close()
+            os.remove(filename)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Check and benchmark the bitboard board encoder and the action encoding.
+
+Verifies that encoding.board_to_state and encoding.boards_to_states match
+the original square-by-square encoder on random positions, then reports
+boards encoded per second for the original encoder, the single-board
+bitboard encoder and the batch encoder. Also checks that every legal move
+(including under-promotions) survives move_to_index/index_to_move and
+times greedy move selection with Python lists against the legal masks.
+
+Usage: python benchmarks/bench_encoding.py [--positions N] [--batch-size N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from encoding import (board_to_state, boards_to_states, move_to_index, index_to_move, legal_masks,
+                      masked_argmax, STATE_SIZE, ACTION_SIZE)
+
+def square_loop_board_to_state(board):
+    """The encoder as it was before bitboards, kept as a reference."""
+    state = np.zeros(8 * 8 * 12, dtype=np.float32)
+    piece_types = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING]
+    for square in chess.SQUARES:
+        piece = board.piece_at(square)
+        if piece:
+            piece_idx = piece_types.index(piece.piece_type)
+            if not piece.color:
+                piece_idx += 6
+            state[square * 12 + piece_idx] = 1
+    return state
+
+def random_positions(count, seed=0):
+    """Generate positions from random games of random length."""
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(0, 120)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board)
+    return boards
+
+def check(boards):
+    """Assert that both bitboard encoders match the reference encoder."""
+    expected = np.array([square_loop_board_to_state(board) for board in boards])
+    batch = boards_to_states(boards)
+    assert batch.dtype == np.float32 and batch.shape == (len(boards), STATE_SIZE)
+    assert np.array_equal(batch, expected), "boards_to_states differs from the reference encoder"
+    for board, row in zip(boards, expected):
+        assert np.array_equal(board_to_state(board), row), f"board_to_state differs on {board.fen()}"
+
+def check_actions(boards):
+    """Assert that legal moves map to distinct indices and back, and that the masks mark exactly them."""
+    move_lists = [list(board.legal_moves) for board in boards]
+    masks = legal_masks(move_lists)
+    for moves, mask in zip(move_lists, masks):
+        indices = [move_to_index(move) for move in moves]
+        assert len(set(indices)) == len(moves), "two legal moves share an action index"
+        assert all(index_to_move(index) == move for index, move in zip(indices, moves))
+        assert mask.sum() == len(moves) and mask[indices].all()
+
+def list_select(q_values, move_lists):
+    """Greedy selection as DQNAgent.act did it before the legal masks."""
+    return [max(moves, key=lambda move: row[move.from_square * 64 + move.to_square])
+            for row, moves in zip(q_values, move_lists)]
+
+def mask_select(q_values, move_lists):
+    return [index_to_move(int(index)) for index in masked_argmax(q_values, legal_masks(move_lists))]
+
+def boards_per_second(fn, boards, repeat=3):
+    """Return the best boards/s of fn(boards) over a few repeats."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(boards)
+        best = min(best, time.perf_counter() - start)
+    return len(boards) / best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--positions', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=256)
+    args = parser.parse_args()
+
+    boards = random_positions(args.positions)
+    check(boards)
+    print(f"encoders agree on {len(boards)} random positions")
+
+    out = np.empty((args.batch_size, STATE_SIZE), dtype=np.float32)
+
+    def batched(boards):
+        for i in range(0, len(boards), args.batch_size):
+            chunk = boards[i:i + args.batch_size]
+            boards_to_states(chunk, out[:len(chunk)])
+
+    loop = boards_per_second(lambda b: [square_loop_board_to_state(x) for x in b], boards)
+    single = boards_per_second(lambda b: [board_to_state(x) for x in b], boards)
+    batch = boards_per_second(batched, boards)
+    print(f"square loop:      {loop:12,.0f} boards/s")
+    print(f"bitboard single:  {single:12,.0f} boards/s ({single / loop:.1f}x)")
+    print(f"bitboard batch:   {batch:12,.0f} boards/s ({batch / loop:.1f}x)")
+
+    check_actions(boards)
+    print(f"action encoding round-trips every legal move ({ACTION_SIZE} actions)")
+    move_lists = [list(board.legal_moves) or [chess.Move.null()] for board in boards]
+    q_values = np.random.default_rng(0).standard_normal((len(boards), ACTION_SIZE), dtype=np.float32)
+
+    def batched_select(boards):
+        for i in range(0, len(boards), args.batch_size):
+            mask_select(q_values[i:i + args.batch_size], move_lists[i:i + args.batch_size])
+
+    lists = boards_per_second(lambda b: list_select(q_values, move_lists), boards)
+    masked = boards_per_second(batched_select, boards)
+    print(f"list selection:   {lists:12,.0f} positions/s")
+    print(f"mask selection:   {masked:12,.0f} positions/s ({masked / lists:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Check and benchmark the incremental evaluator.
+
+Plays random games (standard and Chess960) through IncrementalEvaluator in
+verify mode with both the reward features and the search features, and
+checks get_reward against the original dict-based recount. Then times the
+evaluation terms alone per ply (a recount after the push against the
+incremental update), and the reward per ply: the original get_reward, the
+bitboard recount get_reward does without an evaluator, the incremental
+update, and the incremental update with the mate/stalemate status taken
+from the legal move cache as the training loops do. Timings are the best
+of three replays. Finally compares search speed with evaluate() and
+with the incremental evaluator.
+
+Usage: python benchmarks/bench_evaluation.py [--games N] [--search-time S]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from evaluation import IncrementalEvaluator, get_reward
+from movecache import PositionMoves
+from search import SearchEngine, evaluate, incremental_evaluator
+
+def dict_get_reward(board):
+    """get_reward as it was before the incremental evaluator, kept as a reference."""
+    if board.is_checkmate():
+        return 100 if board.turn == chess.BLACK else -100
+    elif board.is_stalemate():
+        return 0
+    piece_values = {
+        chess.PAWN: 1,
+        chess.KNIGHT: 3,
+        chess.BISHOP: 3,
+        chess.ROOK: 5,
+        chess.QUEEN: 9,
+        chess.KING: 0
+    }
+    white_material = 0
+    black_material = 0
+    for piece_type in piece_values:
+        white_material += len(board.pieces(piece_type, chess.WHITE)) * piece_values[piece_type]
+        black_material += len(board.pieces(piece_type, chess.BLACK)) * piece_values[piece_type]
+    center_squares = [chess.E4, chess.E5, chess.D4, chess.D5]
+    white_center = sum(1 for sq in center_squares if board.piece_at(sq) and board.piece_at(sq).color == chess.WHITE)
+    black_center = sum(1 for sq in center_squares if board.piece_at(sq) and board.piece_at(sq).color == chess.BLACK)
+    return (white_material - black_material) + (white_center - black_center) * 0.5
+
+def random_games(count, seed=0, max_plies=200):
+    """Lists of moves with their start boards; every fourth game is Chess960."""
+    rng = random.Random(seed)
+    games = []
+    for i in range(count):
+        board = chess.Board.from_chess960_pos(rng.randrange(960)) if i % 4 == 0 else chess.Board()
+        start = board.copy()
+        moves = []
+        while len(moves) < max_plies:
+            legal_moves = list(board.legal_moves)
+            if not legal_moves:
+                break
+            move = rng.choice(legal_moves)
+            board.push(move)
+            moves.append(move)
+        games.append((start, moves))
+    return games
+
+def check(games):
+    """Replay games in verify mode, taking back a move now and then; return the number of plies checked."""
+    rng = random.Random(1)
+    plies = 0
+    for start, moves in games:
+        for evaluator in (IncrementalEvaluator(verify=True), incremental_evaluator(verify=True)):
+            board = start.copy()
+            evaluator.reset(board)
+            for move in moves:
+                evaluator.push(board, move)
+                if rng.random() < 0.1:
+                    evaluator.pop(board)
+                    evaluator.push(board, move)
+                plies += 1
+        board = start.copy()
+        evaluator = IncrementalEvaluator()
+        evaluator.reset(board)
+        for move in moves:
+            evaluator.push(board, move)
+            assert get_reward(board, evaluator) == get_reward(board) == dict_get_reward(board)
+            assert incremental_evaluator().full(board) * (1 if board.turn else -1) == evaluate(board)
+    return plies
+
+def move_positions(games):
+    """PositionMoves after every move, as the training loops already have them from the move cache."""
+    result = []
+    for start, moves in games:
+        board = start.copy()
+        positions = []
+        for move in moves:
+            board.push(move)
+            positions.append(PositionMoves(board))
+        result.append(positions)
+    return result
+
+def time_rewards(games, positions, reward_per_ply):
+    """Seconds per ply of replaying games with reward_per_ply(board, evaluator, move, position) doing the push."""
+    best = float("inf")
+    for _ in range(3):
+        plies = 0
+        start_time = time.perf_counter()
+        for (start, moves), game_positions in zip(games, positions):
+            board = start.copy()
+            evaluator = IncrementalEvaluator()
+            evaluator.reset(board)
+            for move, position in zip(moves, game_positions):
+                reward_per_ply(board, evaluator, move, position)
+                plies += 1
+        best = min(best, (time.perf_counter() - start_time) / plies)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--search-time', type=float, default=2.0)
+    args = parser.parse_args()
+
+    games = random_games(args.games)
+    print(f"incremental scores match full recounts on {check(games)} plies")
+
+    def push_only(board, evaluator, move, position):
+        board.push(move)
+
+    def terms_recount(board, evaluator, move, position):
+        board.push(move)
+        evaluator.full(board)
+
+    def terms_incremental(board, evaluator, move, position):
+        evaluator.push(board, move)
+
+    def dict_recount(board, evaluator, move, position):
+        board.push(move)
+        dict_get_reward(board)
+
+    def bitboard_recount(board, evaluator, move, position):
+        board.push(move)
+        get_reward(board)
+
+    def incremental(board, evaluator, move, position):
+        evaluator.push(board, move)
+        get_reward(board, evaluator)
+
+    def incremental_cached(board, evaluator, move, position):
+        evaluator.push(board, move)
+        get_reward(board, evaluator, position)
+
+    positions = move_positions(games)
+    base = time_rewards(games, positions, push_only)
+    for name, fn in (("terms recount", terms_recount), ("terms incremental", terms_incremental),
+                     ("dict recount", dict_recount), ("bitboard recount", bitboard_recount),
+                     ("incremental", incremental), ("incremental+cache", incremental_cached)):
+        print(f"{name:17s} {(time_rewards(games, positions, fn) - base) * 1e6:6.2f} us/ply on top of the push")
+
+    board = chess.Board("r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+    for name, engine in (("evaluate()", SearchEngine()), ("incremental", SearchEngine(evaluator=incremental_evaluator()))):
+        move, info = engine.search(board, max_time=args.search_time)
+        print(f"search with {name:12s} depth {info.depth}  {info.nps:8,d} nps  best {move}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Benchmark move-stack undo/redo against the old FEN snapshot history.
+
+Builds a long game (10,000 plies by default) of quiet moves, then replays
+it through ChessEngine while randomly undoing and redoing a few plies at a
+time. The same workload runs through a copy of the old history, which
+stored a FEN string per ply and re-parsed it on undo/redo. Reports the
+time per operation and the memory held by each engine afterwards.
+
+Usage: python benchmarks/bench_history.py [--plies N] [--checkpoint-interval N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import chess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core import ChessEngine
+
+class FenHistoryEngine(ChessEngine):
+    """ChessEngine with the FEN-list history it used before the move-stack history."""
+    def reset(self):
+        super().reset()
+        self.board_history = [self.board.fen()]
+
+    def undo_move(self):
+        if self.current_position > 0:
+            self.current_position -= 1
+            self.board = chess.Board(self.board_history[self.current_position])
+            self.game_over = False
+            return True
+        return False
+
+    def redo_move(self):
+        if self.current_position + 1 < len(self.board_history):
+            self.current_position += 1
+            self.board = chess.Board(self.board_history[self.current_position])
+            self.game_over = self.board.is_game_over()
+            return True
+        return False
+
+    def make_move(self, move):
+        if move in self.board.legal_moves:
+            if not self.game_started:
+                self.timer.start()
+                self.game_started = True
+            self.last_move_was_capture = self.board.is_capture(move)
+            self.board.push(move)
+            self.timer.switch_player()
+            self.current_position += 1
+            self.board_history = self.board_history[:self.current_position]
+            self.board_history.append(self.board.fen())
+            self.last_move = move
+            if self.board.is_game_over() or self.timer.is_time_up():
+                self.game_over = True
+                self.timer.stop()
+            return True
+        return False
+
+def long_game(plies, seed=0):
+    """A game that can run for thousands of plies.
+
+    Mostly random quiet piece moves; a pawn move or capture is played
+    whenever the 50-move counter reaches 100 plies, while there are any.
+    """
+    rng = random.Random(seed)
+    board = chess.Board()
+    moves = []
+    while len(moves) < plies:
+        zeroing, quiet = [], []
+        for move in board.legal_moves:
+            (zeroing if board.is_zeroing(move) else quiet).append(move)
+        if board.halfmove_clock >= 100 and zeroing:
+            candidates = zeroing
+        else:
+            candidates = quiet or zeroing
+        if not candidates:
+            board.pop()
+            moves.pop()
+            continue
+        move = rng.choice(candidates)
+        board.push(move)
+        moves.append(move)
+    return board.root().fen(), moves
+
+def workload(plies, seed=0):
+    """Operations: ('move', move), ('undo',) and ('redo',), with random undo/redo bursts."""
+    rng = random.Random(seed)
+    fen, moves = long_game(plies, seed)
+    ops = []
+    for move in moves:
+        ops.append(('move', move))
+        if rng.random() < 0.1:
+            depth = rng.randint(1, 5)
+            ops.extend([('undo',)] * depth)
+            ops.extend([('redo',)] * depth)
+    return fen, ops
+
+def run(engine, fen, ops):
+    """Apply ops to engine and return seconds elapsed."""
+    engine.board = chess.Board(fen)
+    if isinstance(engine, FenHistoryEngine):
+        engine.board_history = [fen]
+    start = time.perf_counter()
+    for op in ops:
+        if op[0] == 'move':
+            assert engine.make_move(op[1])
+        elif op[0] == 'undo':
+            assert engine.undo_move()
+        else:
+            assert engine.redo_move()
+    return time.perf_counter() - start
+
+def measure(make_engine, fen, ops):
+    """Return (seconds, bytes retained by the engine)."""
+    tracemalloc.start()
+    engine = make_engine()
+    elapsed = run(engine, fen, ops)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    final_fen = engine.board.fen()
+    return elapsed, retained, final_fen
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--plies', type=int, default=10000)
+    parser.add_argument('--checkpoint-interval', type=int, default=100)
+    args = parser.parse_args()
+
+    fen, ops = workload(args.plies)
+    print(f"{args.plies} plies, {len(ops)} operations")
+
+    # Timing without tracemalloc, which slows allocation-heavy code unevenly
+    old_time = run(FenHistoryEngine(), fen, ops)
+    new_time = run(ChessEngine(checkpoint_interval=args.checkpoint_interval), fen, ops)
+    _, old_memory, old_fen = measure(FenHistoryEngine, fen, ops)
+    _, new_memory, new_fen = measure(lambda: ChessEngine(checkpoint_interval=args.checkpoint_interval), fen, ops)
+    assert old_fen == new_fen, "histories ended in different positions"
+
+    print(f"FEN snapshots: {old_time * 1e6 / len(ops):8.1f} us/op  {old_memory / 1024:10,.0f} KiB")
+    print(f"move stack:    {new_time * 1e6 / len(ops):8.1f} us/op  {new_memory / 1024:10,.0f} KiB")
+    print(f"speedup {old_time / new_time:.1f}x, memory {new_memory / old_memory:.1f}x of the FEN snapshots")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark batched inference for DQNAgent.act across concurrent games.
+
+Runs G game threads that each request moves for random positions, first
+with every thread calling DQNAgent.act directly and then through a shared
+BatchedInference server. Reports moves per second, p50/p99 latency per
+move and the mean batch size achieved.
+
+Usage: python benchmarks/bench_inference.py [--games G] [--moves N] [--max-batch-size B] [--max-wait S]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import chess
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agent import DQNAgent
+from encoding import STATE_SIZE, ACTION_SIZE, board_to_state
+from inference import BatchedInference
+
+def positions(count, seed):
+    """Random positions with their encoded states and legal moves."""
+    rng = random.Random(seed)
+    result = []
+    board = chess.Board()
+    while len(result) < count:
+        moves = list(board.legal_moves)
+        if not moves or board.ply() > 80:
+            board = chess.Board()
+            continue
+        result.append((board_to_state(board), moves))
+        board.push(rng.choice(moves))
+    return result
+
+def run_games(act, games, moves):
+    """Run concurrent game threads calling act; return (moves/s, latencies in seconds)."""
+    latencies = [[] for _ in range(games)]
+    workloads = [positions(moves, seed) for seed in range(games)]
+
+    def play(i):
+        for state, legal_moves in workloads[i]:
+            start = time.perf_counter()
+            act(state, legal_moves)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=play, args=(i,)) for i in range(games)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return games * moves / elapsed, np.concatenate(latencies)
+
+def report(name, throughput, latencies):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{name:10s} {throughput:10,.0f} moves/s   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=64)
+    parser.add_argument('--moves', type=int, default=50)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait', type=float, default=0.002)
+    args = parser.parse_args()
+
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE)
+    agent.epsilon = 0.0  # measure the model path only
+
+    # Keras models are not safe to call concurrently, so direct calls share a lock
+    lock = threading.Lock()
+
+    def direct_act(state, legal_moves):
+        with lock:
+            return agent.act(state, legal_moves)
+
+    report("direct", *run_games(direct_act, args.games, args.moves))
+
+    server = BatchedInference(agent, max_batch_size=args.max_batch_size, max_wait=args.max_wait)
+    report("batched", *run_games(server.act, args.games, args.moves))
+    print(f"mean batch size {server.mean_batch_size():.1f} (max {args.max_batch_size}, max wait {args.max_wait * 1000:.1f} ms)")
+    server.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Check and benchmark the legal move cache on the training loop's access pattern.
+
+Plays random games the way train_dqn_agent does (list the moves, pick
+one, make it, check for the end of the game and list the moves again for
+the done flag), once with raw python-chess calls as the loop did before
+the cache and once through ChessEngine. Both must produce the same games.
+Every few plies the ChessEngine run also undoes and redoes a couple of
+moves, as the UI does. Reports time per ply and the move generations the
+cache avoided per game.
+
+Usage: python benchmarks/bench_movecache.py [--games N] [--max-moves N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from core import ChessEngine
+
+def raw_games(games, max_moves, seed=0):
+    """The loop as written before the cache; returns (seconds, plies, final FENs)."""
+    rng = random.Random(seed)
+    plies = 0
+    fens = []
+    start = time.perf_counter()
+    for _ in range(games):
+        board = chess.Board()
+        game_over = False
+        moves = 0
+        while not game_over and moves < max_moves:
+            legal_moves = list(board.legal_moves)
+            if not legal_moves:
+                break
+            move = rng.choice(legal_moves)
+            assert move in board.legal_moves
+            board.push(move)
+            game_over = board.is_game_over()
+            done = game_over or len(list(board.legal_moves)) == 0
+            moves += 1
+        plies += moves
+        fens.append(board.fen())
+    return time.perf_counter() - start, plies, fens
+
+def cached_games(games, max_moves, seed=0, undo_every=0):
+    """The same games through ChessEngine; returns (seconds, plies, final FENs, avoided per game)."""
+    rng = random.Random(seed)
+    game = ChessEngine()
+    plies = 0
+    fens = []
+    avoided = []
+    start = time.perf_counter()
+    for _ in range(games):
+        game.reset()
+        moves = 0
+        while not game.game_over and moves < max_moves:
+            legal_moves = game.legal_moves()
+            if not legal_moves:
+                break
+            move = rng.choice(legal_moves)
+            assert game.make_move(move)
+            done = game.game_over or not game.legal_moves()
+            moves += 1
+            if undo_every and moves % undo_every == 0 and not game.game_over:
+                game.undo_move()
+                game.undo_move()
+                game.legal_moves()
+                game.redo_move()
+                game.redo_move()
+        plies += moves
+        fens.append(game.board.fen())
+        avoided.append(game.move_cache.avoided)
+    return time.perf_counter() - start, plies, fens, sum(avoided) / len(avoided)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--max-moves', type=int, default=100)
+    parser.add_argument('--undo-every', type=int, default=10)
+    args = parser.parse_args()
+
+    raw_time, plies, raw_fens = raw_games(args.games, args.max_moves)
+    cached_time, cached_plies, cached_fens, _ = cached_games(args.games, args.max_moves)
+    assert cached_plies == plies and cached_fens == raw_fens, "cached games differ from raw python-chess games"
+    print(f"{args.games} games, {plies} plies: cached and raw games agree")
+    print(f"raw python-chess: {raw_time / plies * 1e6:8.1f} us/ply")
+    print(f"ChessEngine:      {cached_time / plies * 1e6:8.1f} us/ply ({raw_time / cached_time:.2f}x)")
+
+    _, undo_plies, _, avoided = cached_games(args.games, args.max_moves, undo_every=args.undo_every)
+    print(f"with undo/redo every {args.undo_every} plies: "
+          f"{avoided:.1f} move generations avoided per game ({undo_plies / args.games:.1f} plies per game)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Check ChessEngine's move paths against perft counts and measure their throughput.
+
+Runs the standard perft test positions to fixed depths with raw
+python-chess push and pop, through ChessEngine.make_move and undo_move,
+and through ChessEngine.make_trusted_move. Every count must match the
+published one. Reports leaf nodes per second for each path,
+then the time per ply of the training loop's pattern (play a move,
+then list the new position's legal moves) and of replaying a game that
+only needs the game over flag (make_trusted_move with generate=False)
+along seeded random games, and the speed-up of splitting the root moves of the start position across
+--workers processes.
+
+Usage: python benchmarks/bench_perft.py [--depth-offset N] [--workers N] [--games N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import perft
+from core import ChessEngine
+
+# Depths that take about a second on the raw path
+DEPTHS = {"start": 4, "kiwipete": 3, "endgame": 4, "promotions": 3, "discovered": 3, "middlegame": 3}
+
+def check_paths(depth_offset):
+    totals = {path: [0, 0.0] for path in perft.PATHS}
+    for name, (fen, expected) in perft.POSITIONS.items():
+        depth = min(DEPTHS[name] + depth_offset, len(expected))
+        row = []
+        for path in perft.PATHS:
+            start = time.perf_counter()
+            nodes = perft.count(fen, depth, path)
+            elapsed = time.perf_counter() - start
+            assert nodes == expected[depth - 1], (name, path, nodes, expected[depth - 1])
+            totals[path][0] += nodes
+            totals[path][1] += elapsed
+            row.append(f"{nodes / elapsed:9,.0f}")
+        print(f"{name:>10} depth {depth} ({expected[depth - 1]:>9,} nodes): " + "  ".join(row))
+    print(f"{'all':>10} {'':>25}  " + "  ".join(f"{nodes / elapsed:9,.0f}" for nodes, elapsed in totals.values()))
+
+def random_games(games, max_plies=120, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(games):
+        board = chess.Board()
+        line = []
+        while len(line) < max_plies and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            line.append(move)
+        lines.append(line)
+    return lines
+
+def time_per_ply(lines, play):
+    """Microseconds per ply of play(line) over all lines."""
+    start = time.perf_counter()
+    for line in lines:
+        play(line)
+    return (time.perf_counter() - start) / sum(len(line) for line in lines) * 1e6
+
+def play_raw(line):
+    board = chess.Board()
+    for move in line:
+        board.push(move)
+        game_over = board.is_game_over()
+        legal_moves = list(board.legal_moves)
+
+def play_checked(line):
+    game = ChessEngine()
+    for move in line:
+        game.make_move(move)
+        legal_moves = game.legal_moves()
+
+def play_trusted(line):
+    game = ChessEngine()
+    for move in line:
+        game.make_trusted_move(move)
+        legal_moves = game.legal_moves()
+
+def replay_raw(line):
+    board = chess.Board()
+    for move in line:
+        board.push(move)
+        game_over = board.is_game_over()
+
+def replay_checked(line):
+    game = ChessEngine()
+    for move in line:
+        game.make_move(move)
+
+def replay_trusted(line):
+    game = ChessEngine()
+    for move in line:
+        game.make_trusted_move(move, generate=False)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--depth-offset', type=int, default=0, help="added to every position's depth")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--games', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"leaf nodes per second: {'  '.join(f'{path:>9}' for path in perft.PATHS)}")
+    check_paths(args.depth_offset)
+
+    lines = random_games(args.games)
+    raw = time_per_ply(lines, play_raw)
+    checked = time_per_ply(lines, play_checked)
+    trusted = time_per_ply(lines, play_trusted)
+    print(f"move then list the moves, per ply: raw {raw:.1f} us, make_move {checked:.1f} us, "
+          f"make_trusted_move {trusted:.1f} us")
+    raw = time_per_ply(lines, replay_raw)
+    checked = time_per_ply(lines, replay_checked)
+    trusted = time_per_ply(lines, replay_trusted)
+    print(f"move and game over only, per ply: raw {raw:.1f} us, make_move {checked:.1f} us, "
+          f"make_trusted_move(generate=False) {trusted:.1f} us")
+
+    fen, expected = perft.POSITIONS["start"]
+    depth = DEPTHS["start"] + args.depth_offset + 1
+    for workers in sorted({1, args.workers}):
+        start = time.perf_counter()
+        if workers == 1:
+            results = perft.divide(fen, depth)
+        else:
+            results = perft.divide_parallel(fen, depth, num_workers=workers)
+        elapsed = time.perf_counter() - start
+        assert sum(results.values()) == expected[depth - 1]
+        print(f"start position depth {depth}, {workers} worker(s): {elapsed:.2f} s "
+              f"({expected[depth - 1] / elapsed:,.0f} nodes/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Check and benchmark PGN import into .npz shards and pretraining from them.
+
+Writes a PGN file of random games from a fixed seed (with headers,
+comments, a game from a FEN and unfinished games that the import must
+skip), then checks that splitting the file into small byte ranges
+yields every game exactly once, and that imported records decode back
+to the positions, legal moves and rewards of the games. Reports import
+throughput with one worker and with --workers processes, the size on
+disk per position, and pretraining steps per second.
+
+Usage: python benchmarks/bench_pgn.py [--games N] [--workers N] [--pretrain-steps N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import chess
+import chess.pgn
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dataset
+from encoding import ACTION_SIZE, boards_to_states, legal_mask, move_to_index
+from evaluation import get_reward
+
+def write_games(filename, count, seed=0, max_plies=120):
+    """Write count random games; every tenth is unfinished and every 25th starts from a FEN."""
+    rng = random.Random(seed)
+    expected = 0
+    with open(filename, "w") as f:
+        for i in range(count):
+            if i % 25 == 24:
+                board = chess.Board("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1")
+            else:
+                board = chess.Board()
+            game = chess.pgn.Game.from_board(board)
+            game.headers["Event"] = f"Synthetic {i}"
+            game.headers["WhiteElo"] = str(rng.randrange(1800, 2800))
+            game.headers["BlackElo"] = str(rng.randrange(1800, 2800))
+            node = game
+            for ply in range(rng.randrange(1, max_plies)):
+                legal_moves = list(board.legal_moves)
+                if not legal_moves:
+                    break
+                move = rng.choice(legal_moves)
+                board.push(move)
+                node = node.add_variation(move)
+                if ply % 17 == 3:
+                    node.comment = "a comment\nspanning two lines [%clk 0:01:00]"
+            finished = i % 10 != 9
+            game.headers["Result"] = board.result(claim_draw=True) if finished else "*"
+            if game.headers["Result"] == "*" and finished:
+                game.headers["Result"] = "1/2-1/2"
+            expected += finished and i % 25 != 24
+            print(game, file=f, end="\n\n")
+    return expected
+
+def check_ranges(filename, count):
+    """Every game is read exactly once however the file is split into ranges."""
+    size = os.path.getsize(filename)
+    whole = [offset for offset, _ in dataset.iter_game_texts(filename)]
+    assert len(whole) == count, (len(whole), count)
+    for chunk in (1000, 4093, 65536):
+        split = [offset for start in range(0, size, chunk)
+                 for offset, _ in dataset.iter_game_texts(filename, start, min(start + chunk, size))]
+        assert split == whole, f"{chunk}-byte ranges read {len(split)} games, expected {len(whole)}"
+
+def check_records(directory, filename):
+    """Decoded records match a replay of the accepted games with chess.Board.
+
+    Relies on a single-worker import, which writes the games in file order.
+    """
+    games = [game for game in dataset.iter_games(filename) if dataset.accept_game(game)]
+    moves = [(game_index, move) for game_index, game in enumerate(games) for move in game.mainline_moves()]
+    shards = list(dataset.iter_shards(directory))
+    assert sum(len(shard["actions"]) for shard in shards) == len(moves)
+    i = 0
+    board = chess.Board()
+    for shard in shards:
+        states, actions, rewards, next_states, dones, next_masks = dataset.shard_batch(
+            shard, np.arange(len(shard["actions"])))
+        for j in range(len(actions)):
+            game_index, move = moves[i]
+            if j == 0 or dones[j - 1]:
+                board = chess.Board()
+            assert shard["fens"][j] == board.fen()
+            assert (states[j] == boards_to_states([board])[0]).all()
+            assert actions[j] == move_to_index(move)
+            assert (np.unpackbits(shard["legal"][j], count=ACTION_SIZE) == legal_mask(list(board.legal_moves))).all()
+            board.push(move)
+            assert rewards[j] == get_reward(board)
+            assert dones[j] == (i + 1 == len(moves) or moves[i + 1][0] != game_index)
+            if not dones[j]:
+                assert (next_states[j] == states[j + 1]).all()
+                assert (next_masks[j] == legal_mask(list(board.legal_moves))).all()
+            i += 1
+    return i
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--pretrain-steps', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "games.pgn")
+        accepted = write_games(filename, args.games)
+        print(f"{args.games} games, {os.path.getsize(filename) / 1e6:.1f} MB of PGN, {accepted} to import")
+        check_ranges(filename, args.games)
+        print("byte ranges split the file between games")
+
+        checked_dir = os.path.join(tmp, "checked")
+        manifest = dataset.import_pgn(filename, checked_dir, num_workers=1, shard_size=5000, fens=True,
+                                      chunk_bytes=256 * 1024)
+        assert manifest["games"] == accepted, (manifest["games"], accepted)
+        print(f"records match a chess.Board replay on {check_records(checked_dir, filename)} positions")
+
+        for workers in sorted({1, args.workers}):
+            directory = os.path.join(tmp, f"workers{workers}")
+            start = time.perf_counter()
+            manifest = dataset.import_pgn(filename, directory, num_workers=workers,
+                                          chunk_bytes=max(64 * 1024, os.path.getsize(filename) // (4 * workers)))
+            elapsed = time.perf_counter() - start
+            size = sum(os.path.getsize(os.path.join(directory, shard["file"])) for shard in manifest["shards"])
+            print(f"{workers} worker(s): {manifest['games'] / elapsed:7.1f} games/s  "
+                  f"{manifest['positions'] / elapsed:8.0f} positions/s  "
+                  f"{size / manifest['positions']:.0f} bytes/position on disk")
+
+        from agent import DQNAgent, STATE_SIZE
+        agent = DQNAgent(STATE_SIZE, ACTION_SIZE)
+        shard = next(dataset.iter_shards(directory))
+        rng = np.random.default_rng(0)
+        agent.train_batch(*dataset.shard_batch(shard, rng.integers(0, len(shard["actions"]), 32)))  # warm up
+        start = time.perf_counter()
+        for _ in range(args.pretrain_steps):
+            agent.train_batch(*dataset.shard_batch(shard, rng.integers(0, len(shard["actions"]), 32)))
+        print(f"pretraining: {args.pretrain_steps / (time.perf_counter() - start):.1f} steps/s of 32 positions")
+
+if __name__ == "__main__":
+    main()
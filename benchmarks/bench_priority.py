@@ -0,0 +1,137 @@
+"""Check the sum-tree and benchmark prioritized replay against uniform sampling.
+
+Checks that SumTree.find() maps points across each leaf's prefix-sum
+interval to that leaf, and that batched updates leave the same sums as a
+rebuild. Then fills a buffer where one transition in a thousand is a
+"checkmate" with a TD error of 100 among quiet moves with TD errors
+around 1, and counts how often each kind is replayed with uniform and
+with prioritized sampling. Finally fills a PrioritizedReplayBuffer of
+--capacity transitions with the agent's state and mask sizes and reports
+microseconds per batch for the tree alone (find and update) and for a
+whole sample, a priority update and a uniform sample, plus
+DQNAgent.replay steps per second with and without prioritized replay.
+
+Usage: python benchmarks/bench_priority.py [--capacity N] [--batch-sizes 32,256] [--agent-steps N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from encoding import ACTION_SIZE, STATE_SIZE
+from replay_buffer import PrioritizedReplayBuffer, ReplayBuffer, SumTree
+
+def check_tree(rng):
+    for capacity in (1, 7, 1000, 4096):
+        tree = SumTree(capacity)
+        priorities = rng.random(capacity) * (rng.random(capacity) < 0.8)
+        tree.rebuild(priorities)
+        assert np.isclose(tree.total, priorities.sum())
+        ends = np.cumsum(priorities)
+        stored = np.flatnonzero(priorities)
+        for fraction in (0.01, 0.5, 0.99):
+            points = ends - priorities * (1 - fraction)
+            assert (tree.find(points[stored]) == stored).all(), capacity
+
+        # Batched updates, with repeated indices, match a rebuild from the final leaves
+        for _ in range(20):
+            indices = rng.integers(0, capacity, size=64)
+            values = rng.random(64)
+            tree.update(indices, values)
+            for index, value in zip(indices, values):
+                priorities[index] = value
+        rebuilt = SumTree(capacity)
+        rebuilt.rebuild(priorities)
+        assert np.allclose(tree.tree, rebuilt.tree)
+
+def checkmate_replay(rng, size=100000, batch_size=32, batches=2000):
+    """Expected checkmates per batch, and the average drawn uniformly and by priority."""
+    buffer = PrioritizedReplayBuffer(size, 8)
+    buffer.add_batch(np.zeros((size, 8)), np.zeros(size), np.zeros(size), np.zeros((size, 8)), np.zeros(size))
+    mates = rng.random(size) < 0.001
+    td_errors = np.where(mates, 100.0, rng.normal(0, 1, size))
+    buffer.update_priorities(np.arange(size), td_errors)
+    uniform = sum(mates[rng.integers(0, size, batch_size)].sum() for _ in range(batches)) / batches
+    prioritized = sum(mates[buffer.sample(batch_size, np.random)[-1]].sum() for _ in range(batches)) / batches
+    return mates.mean() * batch_size, uniform, prioritized
+
+def fill(buffer, capacity, rng, chunk=10000):
+    pool = (rng.random((256, buffer.state_size)) < 0.04).astype(np.uint8)
+    masks = np.packbits(rng.random((256, ACTION_SIZE)) < 0.01, axis=1)
+    for start in range(0, capacity, chunk):
+        n = min(chunk, capacity - start)
+        picks = rng.integers(0, len(pool), n)
+        buffer.add_batch(pool[picks], rng.integers(0, ACTION_SIZE, n), rng.normal(size=n).astype(np.float32),
+                         pool[picks[::-1]], rng.random(n) < 0.05, masks[picks])
+
+def per_call(fn, repeat=200):
+    """Median microseconds per call of fn."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1e6
+
+def agent_steps(prioritized, steps, batch_size, rng):
+    from agent import DQNAgent
+    np.random.seed(0)
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, prioritized=prioritized)
+    fill(agent.memory, agent.memory.capacity, rng)
+    agent.replay(batch_size)  # warm up
+    start = time.perf_counter()
+    for _ in range(steps):
+        agent.replay(batch_size)
+    return steps / (time.perf_counter() - start)
+
+def sampling_costs(capacity, batch_sizes, rng):
+    """Fill a capacity-sized buffer and print the sampling and update costs per batch size.
+
+    The buffer is freed on return, before the agent steps allocate their own.
+    """
+    start = time.perf_counter()
+    buffer = PrioritizedReplayBuffer(capacity, STATE_SIZE, mask_size=ACTION_SIZE)
+    fill(buffer, capacity, rng)
+    print(f"{capacity:,} transitions stored in {time.perf_counter() - start:.1f} s; "
+          f"the tree adds {buffer.tree.tree.nbytes / 2**20:.0f} MB and the priorities {buffer.priorities.nbytes / 2**20:.0f} MB "
+          f"to {sum(array.nbytes for array in ReplayBuffer.arrays(buffer).values()) / 2**20:,.0f} MB of transitions")
+    for batch_size in batch_sizes:
+        values = rng.random(batch_size) * buffer.tree.total
+        indices = rng.integers(0, capacity, batch_size)
+        td_errors = rng.normal(size=batch_size)
+        find = per_call(lambda: buffer.tree.find(values))
+        update = per_call(lambda: buffer.tree.update(indices, np.abs(td_errors)))
+        sample = per_call(lambda: buffer.sample(batch_size))
+        update_priorities = per_call(lambda: buffer.update_priorities(indices, td_errors))
+        uniform = per_call(lambda: ReplayBuffer.sample(buffer, batch_size))
+        print(f"batch {batch_size:4d}: tree find {find:6.1f} us  tree update {update:6.1f} us  |  "
+              f"prioritized sample {sample:7.1f} us + priority update {update_priorities:6.1f} us  "
+              f"vs uniform sample {uniform:7.1f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--capacity', type=int, default=1000000)
+    parser.add_argument('--batch-sizes', default="32,256")
+    parser.add_argument('--agent-steps', type=int, default=50, help="DQNAgent.replay steps to time, 0 to skip")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    check_tree(rng)
+    print("sum-tree find and update checks passed")
+    expected, uniform, prioritized = checkmate_replay(rng)
+    print(f"checkmates per batch of 32 (0.1% of transitions, TD error 100): uniform {uniform:.3f} "
+          f"(expected {expected:.3f}), prioritized {prioritized:.2f}")
+
+    sampling_costs(args.capacity, [int(size) for size in args.batch_sizes.split(",")], rng)
+
+    if args.agent_steps:
+        uniform = agent_steps(False, args.agent_steps, 32, rng)
+        prioritized = agent_steps(True, args.agent_steps, 32, rng)
+        print(f"DQNAgent.replay(32): uniform {uniform:.1f} steps/s, prioritized {prioritized:.1f} steps/s")
+
+if __name__ == "__main__":
+    main()
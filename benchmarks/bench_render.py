@@ -0,0 +1,62 @@
+"""Benchmark ChessRenderer frame times.
+
+Runs headless on SDL's dummy video driver. For a fixed mid-game position
+it times full redraws (what every frame cost before dirty-rectangle
+rendering) and incremental frames in which only the clocks change.
+
+Usage: python benchmarks/bench_render.py [--frames N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import chess
+
+import engine
+
+POSITION = ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "f8c5", "e1g1", "g8f6", "d2d3", "d7d6"]
+
+def make_renderer():
+    renderer = engine.ChessRenderer()
+    for uci in POSITION:
+        renderer.game.make_move(chess.Move.from_uci(uci))
+    return renderer
+
+def time_frames(renderer, frames, full):
+    """Return mean milliseconds per frame."""
+    timer = renderer.game.timer
+    start = time.perf_counter()
+    for i in range(frames):
+        if full:
+            renderer.invalidate()
+        else:
+            # Tick the clock to a new displayed second so the timer region is redrawn
+            timer.white_time -= 1
+            if i % 60 == 0:
+                timer.white_time = timer.initial_time
+        renderer.draw()
+    return (time.perf_counter() - start) * 1000 / frames
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=500)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)  # piece images are loaded relative to the project root
+    engine.init_display()
+    renderer = make_renderer()
+    renderer.game.timer.stop()
+    renderer.draw()
+
+    full = time_frames(renderer, args.frames, full=True)
+    tick = time_frames(renderer, args.frames, full=False)
+    print(f"full redraw {full:6.3f} ms   clock tick {tick:6.3f} ms   ({full / tick:.0f}x saved by dirty regions)")
+
+if __name__ == "__main__":
+    main()
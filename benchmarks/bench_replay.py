@@ -0,0 +1,84 @@
+"""Benchmark DQNAgent.replay training throughput.
+
+Compares the original per-sample replay loop (two Keras predict calls per
+sample) against the batched replay in agent.py and reports training steps
+per second for both, and for batched replay with a Polyak-averaged target
+network and Double-DQN targets (one more forward pass and a weight update
+per step).
+
+Usage: python benchmarks/bench_replay.py [--steps N] [--batch-size N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import chess
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agent import DQNAgent
+from encoding import STATE_SIZE, ACTION_SIZE
+
+def per_sample_replay(agent, batch_size):
+    """The replay loop as it was before batching, kept as a baseline."""
+    minibatch = zip(*agent.memory.sample(batch_size)[:5])
+    states = np.zeros((batch_size, agent.state_size))
+    targets = np.zeros((batch_size, agent.action_size))
+
+    for i, (state, action_index, reward, next_state, done) in enumerate(minibatch):
+        target = reward
+        if not done:
+            next_state_tensor = np.reshape(next_state, [1, agent.state_size])
+            target = reward + agent.gamma * np.amax(agent.model.predict(next_state_tensor, verbose=0)[0])
+
+        target_f = agent.model.predict(np.reshape(state, [1, agent.state_size]), verbose=0)
+        target_f[0][action_index] = target
+
+        states[i] = state
+        targets[i] = target_f[0]
+
+    agent.model.fit(states, targets, epochs=1, verbose=0)
+
+def fill_memory(agent, size):
+    """Fill the agent's replay memory with random transitions."""
+    rng = np.random.default_rng(0)
+    for _ in range(size):
+        state = (rng.random(STATE_SIZE) < 0.04).astype(np.float32)
+        next_state = (rng.random(STATE_SIZE) < 0.04).astype(np.float32)
+        action = chess.Move(int(rng.integers(64)), int(rng.integers(64)))
+        agent.remember(state, action, float(rng.normal()), next_state, bool(rng.random() < 0.05))
+
+def time_steps(replay, agent, steps, batch_size):
+    """Return training steps per second of a replay function."""
+    replay(agent, batch_size)  # warm up
+    start = time.perf_counter()
+    for _ in range(steps):
+        replay(agent, batch_size)
+    return steps / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE)
+    fill_memory(agent, 2000)
+
+    before = time_steps(per_sample_replay, agent, max(1, args.steps // 10), args.batch_size)
+    after = time_steps(lambda a, b: a.replay(b), agent, args.steps, args.batch_size)
+
+    print(f"per-sample replay: {before:8.2f} steps/s")
+    print(f"batched replay:    {after:8.2f} steps/s")
+    print(f"speedup:           {after / before:8.1f}x")
+
+    double_agent = DQNAgent(STATE_SIZE, ACTION_SIZE, tau=0.005, double_dqn=True)
+    fill_memory(double_agent, 2000)
+    double = time_steps(lambda a, b: a.replay(b), double_agent, args.steps, args.batch_size)
+    print(f"double DQN replay: {double:8.2f} steps/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Benchmark the alpha-beta search engine on fixed positions.
+
+Searches each position for a fixed time and reports the depth reached,
+nodes per second and best move, so engine strength can be tracked against
+speed.
+
+Usage: python benchmarks/bench_search.py [--time S] [--tt-size N]
+"""
+import argparse
+import os
+import sys
+
+import chess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from search import SearchEngine
+
+POSITIONS = [
+    ("start", chess.STARTING_FEN),
+    ("italian", "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("middlegame", "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 0 10"),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--time', type=float, default=2.0)
+    parser.add_argument('--tt-size', type=int, default=1 << 18)
+    args = parser.parse_args()
+
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen in POSITIONS:
+        engine = SearchEngine(tt_size=args.tt_size)
+        move, info = engine.search(chess.Board(fen), max_time=args.time)
+        total_nodes += info.nodes
+        total_time += info.elapsed
+        print(f"{name:12s} depth {info.depth:2d}  {info.nps:8,d} nps  best {move}")
+    print(f"{'total':12s}          {int(total_nodes / total_time):8,d} nps")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark self-play experience throughput against the number of workers.
+
+Runs a SelfPlayPool with a randomly initialised policy of the DQNAgent's
+shape for a fixed wall-clock time per worker count and reports transitions
+(plies) per second. On a CPU-only machine the rate should grow roughly
+linearly up to the number of cores.
+
+Usage: python benchmarks/bench_selfplay.py [--workers 1 2 4] [--seconds S]
+"""
+import argparse
+import os
+import queue
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from encoding import STATE_SIZE, ACTION_SIZE
+from selfplay import SelfPlayPool
+
+def random_weights(seed=0):
+    """Weights shaped like the DQNAgent network: STATE_SIZE inputs, two hidden layers of 256, ACTION_SIZE outputs."""
+    rng = np.random.default_rng(seed)
+    sizes = [STATE_SIZE, 256, 256, ACTION_SIZE]
+    weights = []
+    for fan_in, fan_out in zip(sizes[:-1], sizes[1:]):
+        weights.append(rng.normal(0, np.sqrt(2 / fan_in), (fan_in, fan_out)).astype(np.float32))
+        weights.append(np.zeros(fan_out, dtype=np.float32))
+    return weights
+
+def transitions_per_second(num_workers, seconds, epsilon):
+    """Return plies per second collected from a pool of num_workers."""
+    with SelfPlayPool(random_weights(), epsilon, num_workers=num_workers) as pool:
+        pool.get_game()  # wait until the workers are up
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            try:
+                _, transitions = pool.get_game(timeout=1)
+            except queue.Empty:
+                continue
+            count += len(transitions[1])
+        return count / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cores = os.cpu_count() or 1
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, max(1, cores // 2), cores}))
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--epsilon', type=float, default=0.5)
+    args = parser.parse_args()
+
+    base = None
+    for num_workers in args.workers:
+        rate = transitions_per_second(num_workers, args.seconds, args.epsilon)
+        base = base or rate
+        print(f"{num_workers:3d} workers: {rate:10,.0f} transitions/s ({rate / base:.2f}x)")
+
+if __name__ == "__main__":
+    main()
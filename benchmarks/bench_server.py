@@ -0,0 +1,268 @@
+"""Check the game server protocol and load it with many concurrent sessions.
+
+Starts server.py in a separate process (or uses --connect HOST:PORT),
+then checks over TCP that clocks that are not a positive number of
+minutes (NaN, Infinity, negative) are refused and huge ones capped,
+that illegal and out-of-turn moves are refused,
+that the server's clock flags a player who stops moving and refuses the
+moves after it, and that a WebSocket client can start a game and play
+a move. The load generator then opens each number of sessions in
+--sessions, with a hot-seat player and --spectators watchers each, and
+has every player send a random legal move every --interval seconds
+(jittered, resetting finished games) for --duration seconds. It reports
+the moves per second sustained, the p50/p99 latency from sending a move
+to receiving its state, the messages pushed to spectators and the
+server process's CPU use. A last run with no pause between moves
+measures the saturated throughput. The load generator shares the machine
+with the server, so on few cores its latencies include its own
+scheduling.
+
+Usage: python benchmarks/bench_server.py [--sessions 100,1000,2000] [--interval S] [--duration S]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+import chess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from server import MAX_MINUTES
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server.py')
+
+async def request(writer, **fields):
+    writer.write(json.dumps(fields).encode() + b"\n")
+
+async def expect(reader, kind, request_id=None):
+    """The next message of the given type (and request id), skipping clocks and other states."""
+    while True:
+        line = await asyncio.wait_for(reader.readline(), 10)
+        assert line, f"connection closed while waiting for {kind}"
+        message = json.loads(line)
+        if message["type"] == kind and (request_id is None or message.get("id") == request_id):
+            return message
+        assert message["type"] in ("clock", "state"), message
+
+async def check_protocol(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    for request_id, minutes in enumerate((float("nan"), float("inf"), -1, 0), 1):
+        await request(writer, type="new", minutes=minutes, id=request_id)
+        assert "positive number" in (await expect(reader, "error", request_id))["message"], minutes
+    await request(writer, type="new", minutes=1e9, id=5)
+    await expect(reader, "joined", 5)
+    assert (await expect(reader, "state", 5))["white"] == MAX_MINUTES * 60
+    await request(writer, type="new", color="white", minutes=0.02)
+    session = (await expect(reader, "joined"))["session"]
+    await expect(reader, "state")
+    await request(writer, type="move", uci="e2e5", id=1)
+    assert "illegal" in (await expect(reader, "error", 1))["message"]
+
+    black_reader, black_writer = await asyncio.open_connection(host, port)
+    await request(black_writer, type="join", session=session, color="black")
+    await expect(black_reader, "joined")
+    await expect(black_reader, "state")
+    await request(black_writer, type="move", uci="e7e5", id=2)
+    assert (await expect(black_reader, "error", 2))["message"] == "not your turn"
+    await request(writer, type="undo", id=3)
+    assert "hot-seat" in (await expect(reader, "error", 3))["message"]
+
+    await request(writer, type="move", uci="e2e4", id=4)
+    state = await expect(black_reader, "state", 4)
+    assert state["last_move"] == "e2e4" and state["running"]
+    await request(black_writer, type="move", uci="e7e5", id=5)
+    await expect(reader, "state", 5)
+
+    # White stops moving: the server flags white after its 1.2 s without any request
+    start = time.perf_counter()
+    state = await expect(reader, "state")
+    flagged_after = time.perf_counter() - start
+    assert (state["result"], state["reason"]) == ("0-1", "time"), state
+    await request(writer, type="move", uci="g1f3", id=6)
+    assert (await expect(reader, "error", 6))["message"] == "the game is over"
+    writer.close()
+    black_writer.close()
+
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET / HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    response = (await reader.readuntil(b"\r\n\r\n")).decode()
+    assert response.startswith("HTTP/1.1 101"), response
+
+    def frame(text):
+        payload = text.encode()
+        mask = os.urandom(4)
+        masked = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+        return bytes([0x81, 0x80 | len(payload)]) + mask + masked
+
+    async def receive():
+        head = await reader.readexactly(2)
+        length = head[1] & 0x7F
+        if length == 126:
+            length = int.from_bytes(await reader.readexactly(2), "big")
+        return json.loads(await reader.readexactly(length))
+
+    writer.write(frame(json.dumps({"type": "new"})))
+    assert (await receive())["type"] == "joined"
+    assert (await receive())["type"] == "state"
+    writer.write(frame(json.dumps({"type": "move", "uci": "g1f3", "id": 1})))
+    state = await receive()
+    assert state["id"] == 1 and state["last_move"] == "g1f3", state
+    writer.write(b"\x88\x80" + os.urandom(4))
+    writer.close()
+    return flagged_after
+
+class Load:
+    """Pace, measurement window and results shared by the players of one run."""
+    def __init__(self, interval, seed):
+        self.interval = interval
+        self.go = asyncio.Event()
+        self.start = self.warmup = self.end = float("inf")
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.moves = 0
+        self.pushed = 0
+        self.games = 0
+
+async def player(host, port, load, spectators, ready):
+    reader, writer = await asyncio.open_connection(host, port)
+    await request(writer, type="new", color="both")
+    session = (await expect(reader, "joined"))["session"]
+    await expect(reader, "state")
+    watchers = []
+    for _ in range(spectators):
+        watcher = await asyncio.open_connection(host, port)
+        await request(watcher[1], type="join", session=session)
+        watchers.append(watcher)
+    ready.release()
+    tasks = [asyncio.ensure_future(spectate(watcher, load)) for watcher in watchers]
+
+    rng = random.Random(load.rng.random())
+    board = chess.Board()
+    await load.go.wait()
+    await asyncio.sleep(rng.uniform(0, load.interval))
+    next_move = time.perf_counter()
+    request_id = 0
+    while time.perf_counter() < load.end:
+        request_id += 1
+        move = rng.choice(list(board.legal_moves))
+        sent = time.perf_counter()
+        await request(writer, type="move", uci=move.uci(), id=request_id)
+        state = await expect(reader, "state", request_id)
+        received = time.perf_counter()
+        board.push(move)
+        if load.warmup <= sent and received <= load.end:
+            load.latencies.append(received - sent)
+            load.moves += 1
+        if state["game_over"]:
+            request_id += 1
+            await request(writer, type="reset", id=request_id)
+            await expect(reader, "state", request_id)
+            board = chess.Board()
+            load.games += 1
+        next_move += load.interval * rng.uniform(0.5, 1.5)
+        delay = next_move - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            next_move = time.perf_counter()
+    writer.close()
+    for _, watcher_writer in watchers:
+        watcher_writer.close()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def spectate(connection, load):
+    reader, _ = connection
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        now = time.perf_counter()
+        if load.warmup <= now <= load.end:
+            load.pushed += 1
+
+def cpu_seconds(pid):
+    """User plus system CPU seconds used so far by process pid."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+async def run_load(host, port, sessions, interval, duration, spectators, server_pid):
+    ready = asyncio.Semaphore(0)
+    connect_start = time.perf_counter()
+    # Players wait for load.go, so connecting does not count as play
+    load = Load(interval, seed=sessions)
+    tasks = [asyncio.ensure_future(player(host, port, load, spectators, ready)) for _ in range(sessions)]
+    for _ in range(sessions):
+        await ready.acquire()
+    connected = time.perf_counter() - connect_start
+    load.start = time.perf_counter()
+    load.warmup = load.start + max(interval * 1.5, 1.0)
+    load.end = load.warmup + duration
+    load.go.set()
+    await asyncio.sleep(load.warmup - time.perf_counter())
+    cpu = cpu_seconds(server_pid) if server_pid else None
+    await asyncio.sleep(load.end - time.perf_counter())
+    cpu = (cpu_seconds(server_pid) - cpu) / duration if server_pid else None
+    await asyncio.gather(*tasks)
+    latencies = sorted(load.latencies)
+    pace = f"every {interval:g} s" if interval else "back to back"
+    line = (f"{sessions:5d} sessions, moves {pace:>12}: connected in {connected:5.2f} s  "
+            f"{load.moves / duration:7.0f} moves/s  "
+            f"p50 {latencies[len(latencies) // 2] * 1e3:6.2f} ms  p99 {latencies[int(len(latencies) * 0.99)] * 1e3:6.2f} ms  "
+            f"{load.pushed / duration:7.0f} pushes/s to spectators")
+    if cpu is not None:
+        line += f"  server CPU {cpu:.0%}"
+    print(line, flush=True)
+
+def start_server():
+    process = subprocess.Popen([sys.executable, SERVER, "--port", "0"], stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    assert line.startswith("listening on "), line
+    host, _, port = line.split()[-1].rpartition(":")
+    return process, host, int(port)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', default="100,1000,2000")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between a player's moves")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds measured per run")
+    parser.add_argument('--spectators', type=int, default=1, help="watchers per session")
+    parser.add_argument('--saturate', type=int, default=100, help="sessions of the back-to-back run, 0 to skip")
+    parser.add_argument('--connect', metavar="HOST:PORT", help="load a running server instead of starting one")
+    args = parser.parse_args()
+
+    # Each session holds 1 + spectators sockets here (and as many in the server)
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    process = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        port = int(port)
+    else:
+        process, host, port = start_server()
+    try:
+        flagged_after = asyncio.run(check_protocol(host, port))
+        print(f"protocol checks passed; a 1.2 s clock flagged after {flagged_after:.2f} s without moves")
+        runs = [(int(sessions), args.interval) for sessions in args.sessions.split(",")]
+        if args.saturate:
+            runs.append((args.saturate, 0.0))
+        for sessions, interval in runs:
+            asyncio.run(run_load(host, port, sessions, interval, args.duration, args.spectators,
+                                 process.pid if process else None))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Run the benchmark suite of engine, encoder, agent and renderer hot paths.
+
+Every case works on fixed, seeded inputs: one 80-ply game generated from
+a fixed seed, the positions along it, and an agent and replay memory
+built with fixed NumPy, Python and TensorFlow seeds. As in asv, a case's
+setup() builds its inputs untimed and returns the function to time; each
+sample times one call on fresh inputs, and the median, minimum and
+spread of the samples are reported per operation (per ply, per position
+or per replay step).
+
+Results are written as JSON together with the machine and library
+versions. Baselines are only comparable on the machine that recorded
+them, so they are stored per host as benchmarks/baselines/<hostname>.json:
+--save-baseline records this machine's, and --compare compares each
+median against it (or against a given file) and exits with status 1 if
+any case is slower by more than --threshold.
+
+The renderer cases run headless on SDL's dummy video driver.
+
+Usage: python benchmarks/bench_suite.py [--output FILE] [--save-baseline] [--compare [BASELINE]] [--threshold 0.1] [--repeat N] [--filter NAME]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+import chess
+import numpy as np
+
+from core import ChessEngine
+from encoding import board_to_state
+from evaluation import IncrementalEvaluator, get_reward
+
+SEED = 0
+GAME_PLIES = 80
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", f"{platform.node()}.json")
+
+def fixed_game(plies=GAME_PLIES, seed=SEED):
+    """A reproducible game: at each ply a seeded pick among the legal moves sorted by UCI."""
+    rng = random.Random(seed)
+    board = chess.Board()
+    moves = []
+    while len(moves) < plies and not board.is_game_over():
+        move = rng.choice(sorted(board.legal_moves, key=chess.Move.uci))
+        board.push(move)
+        moves.append(move)
+    return moves
+
+def fixed_positions(moves):
+    """The board after every move of the game."""
+    board = chess.Board()
+    boards = []
+    for move in moves:
+        board.push(move)
+        boards.append(board.copy())
+    return boards
+
+def seed_everything():
+    random.seed(SEED)
+    np.random.seed(SEED)
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(SEED)
+
+def played_engine(moves):
+    game = ChessEngine()
+    for move in moves:
+        game.make_move(move)
+    game.timer.stop()
+    return game
+
+class Case:
+    """One benchmark: setup() returns the function to time, which performs ops operations."""
+    def __init__(self, name, setup, ops, repeat=None):
+        self.name = name
+        self.setup = setup
+        self.ops = ops
+        self.repeat = repeat
+
+    def run(self, repeat):
+        """Per-operation seconds of each sample, after one untimed warm-up call."""
+        self.setup()()
+        samples = []
+        for _ in range(self.repeat or repeat):
+            fn = self.setup()
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) / self.ops)
+        return samples
+
+def engine_cases(moves):
+    def make_move():
+        game = ChessEngine()
+        def run():
+            for move in moves:
+                game.make_move(move)
+        return run
+
+    def undo_move():
+        game = played_engine(moves)
+        def run():
+            for _ in moves:
+                game.undo_move()
+        return run
+
+    def redo_move():
+        game = played_engine(moves)
+        game.goto_position(0)
+        def run():
+            for _ in moves:
+                game.redo_move()
+        return run
+
+    plies = len(moves)
+    return [Case("engine.make_move", make_move, plies),
+            Case("engine.undo_move", undo_move, plies),
+            Case("engine.redo_move", redo_move, plies)]
+
+def encoder_cases(boards):
+    def encode():
+        def run():
+            for board in boards:
+                board_to_state(board)
+        return run
+
+    def reward():
+        def run():
+            for board in boards:
+                get_reward(board)
+        return run
+
+    moves = [board.peek() for board in boards]
+
+    def reward_incremental():
+        # Includes the evaluator's push, which is where the incremental work happens
+        def run():
+            board = chess.Board()
+            evaluator = IncrementalEvaluator()
+            evaluator.reset(board)
+            for move in moves:
+                evaluator.push(board, move)
+                get_reward(board, evaluator)
+        return run
+
+    return [Case("encoding.board_to_state", encode, len(boards)),
+            Case("evaluation.get_reward", reward, len(boards)),
+            Case("evaluation.get_reward_incremental", reward_incremental, len(boards))]
+
+def agent_cases(boards):
+    from agent import DQNAgent
+    from encoding import STATE_SIZE, ACTION_SIZE
+
+    seed_everything()
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE)
+    agent.epsilon = 0.0  # measure the model path, not random exploration
+    states = [board_to_state(board) for board in boards]
+    legal_moves = [list(board.legal_moves) for board in boards]
+    positions = [(state, moves) for state, moves in zip(states, legal_moves) if moves]
+
+    rng = np.random.default_rng(SEED)
+    for state, next_state, moves in zip(states, states[1:], legal_moves[1:]):
+        action = moves[rng.integers(len(moves))] if moves else chess.Move.null()
+        agent.remember(state, action, float(rng.normal()), next_state, not moves, moves)
+
+    def act():
+        def run():
+            for state, moves in positions:
+                agent.act(state, moves)
+        return run
+
+    def replay():
+        # Every sample trains on the same minibatches
+        random.seed(SEED)
+        np.random.seed(SEED)
+        return lambda: agent.replay(32)
+
+    return [Case("agent.act", act, len(positions)),
+            Case("agent.replay", replay, 1)]
+
+def renderer_cases(moves):
+    import engine
+
+    cwd = os.getcwd()
+    os.chdir(ROOT)  # piece images are loaded relative to the project root
+    try:
+        engine.init_display()
+        renderer = engine.ChessRenderer(played_engine(moves[:20]))
+        renderer.draw()
+    finally:
+        os.chdir(cwd)
+
+    def full_redraw():
+        renderer.invalidate()
+        return renderer.draw
+
+    def clock_tick():
+        # A new displayed second, so only the timer region is redrawn
+        renderer.game.timer.white_time -= 1
+        return renderer.draw
+
+    return [Case("renderer.draw_full", full_redraw, 1, repeat=200),
+            Case("renderer.draw_clock_tick", clock_tick, 1, repeat=200)]
+
+def suite():
+    moves = fixed_game()
+    boards = fixed_positions(moves)
+    return (engine_cases(moves) + encoder_cases(boards) + agent_cases(boards) + renderer_cases(moves))
+
+def machine_info():
+    import pygame
+    import tensorflow as tf
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+            "python": platform.python_version(), "chess": chess.__version__, "numpy": np.__version__,
+            "tensorflow": tf.__version__, "pygame": pygame.version.ver, "commit": commit}
+
+def compare(results, baseline, threshold):
+    """Print each case against the baseline and return the names of the regressions."""
+    regressions = []
+    print(f"\n{'case':36s} {'baseline':>12s} {'current':>12s}  ratio")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:36s} {'-':>12s} {result['median'] * 1e6:10.2f}us  (new)")
+            continue
+        ratio = result["median"] / baseline[name]["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:36s} {baseline[name]['median'] * 1e6:10.2f}us {result['median'] * 1e6:10.2f}us  "
+              f"{ratio:5.2f}x{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--save-baseline', action='store_true', help="record the results as this machine's baseline")
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE,
+                        help="baseline JSON to compare against, by default this machine's")
+    parser.add_argument('--threshold', type=float, default=0.1, help="relative slowdown reported as a regression")
+    parser.add_argument('--repeat', type=int, default=30, help="samples per case")
+    parser.add_argument('--filter', default="", help="only run cases whose name contains this")
+    args = parser.parse_args()
+    if args.compare and not os.path.exists(args.compare):
+        if args.compare == DEFAULT_BASELINE:
+            parser.error(f"no baseline for this machine ({platform.node()}) at {args.compare}; "
+                         f"run once with --save-baseline, then compare with --compare")
+        parser.error(f"no baseline at {args.compare}")
+
+    results = {}
+    for case in suite():
+        if args.filter not in case.name:
+            continue
+        samples = case.run(args.repeat)
+        results[case.name] = {"median": statistics.median(samples), "min": min(samples),
+                              "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+                              "samples": len(samples), "ops": case.ops}
+        result = results[case.name]
+        print(f"{case.name:36s} median {result['median'] * 1e6:10.2f} us  min {result['min'] * 1e6:10.2f} us  "
+              f"stdev {result['stdev'] * 1e6:8.2f} us  per op")
+
+    info = machine_info()
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(DEFAULT_BASELINE), exist_ok=True)
+    for path in (args.output, DEFAULT_BASELINE if args.save_baseline else None):
+        if path:
+            with open(path, "w") as f:
+                json.dump({"machine": info, "results": results}, f, indent=2)
+                f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        differing = [key for key, value in baseline["machine"].items()
+                     if key != "commit" and info.get(key) != value]
+        if differing:
+            print(f"warning: baseline was recorded with a different {', '.join(differing)}")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Measure the plies and probes saved by ending training episodes at tablebase positions.
+
+Plays seeded random games from random endgame starts (kings plus a few
+pieces and pawns) up to the training loop's 100-move limit, and records
+when each game first reaches a position the tablebase covers. Training
+with a tablebase ends the episode there, so the rest of the game is the
+number of plies saved. The benchmark also reports the probe cache's hit
+rate and the cost of a cached and an uncached probe, and checks that
+the search scores a capture into a covered position as a tablebase win.
+
+With --syzygy DIR the real Syzygy files in DIR are probed. Without
+them, a stand-in prober answers exactly for positions with three pieces
+and no pawns: bare kings and a minor piece are draws, and a queen or
+rook wins unless the weak side can take it or is stalemated. It has no
+DTZ, and positions with pawns count as missing tables.
+
+Usage: python benchmarks/bench_tablebase.py [--games N] [--syzygy DIR]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from search import SearchEngine
+from tablebase import EndgameTablebase
+
+class ThreePieceProber:
+    """Exact WDL of pawnless three-piece positions; no DTZ."""
+    def get_wdl(self, board):
+        if board.pawns or chess.popcount(board.occupied) > 3:
+            return None
+        pieces = board.occupied & ~board.kings
+        if not pieces or board.knights | board.bishops:
+            return 0
+        square = chess.lsb(pieces)
+        strong = board.color_at(square)
+        if board.turn == strong:
+            return 2
+        # Weak side to move: a draw if it can take the piece or has no move
+        if not any(board.legal_moves) and not board.is_check():
+            return 0
+        if board.is_legal(chess.Move(board.king(not strong), square)):
+            return 0
+        return -2
+
+    def get_dtz(self, board):
+        return None
+
+def random_start(rng):
+    """A legal position with both kings and two to four random other pieces, white to move."""
+    while True:
+        board = chess.Board(None)
+        squares = rng.sample(chess.SQUARES, 6)
+        board.set_piece_at(squares[0], chess.Piece(chess.KING, chess.WHITE))
+        board.set_piece_at(squares[1], chess.Piece(chess.KING, chess.BLACK))
+        for square in squares[2:2 + rng.randint(2, 4)]:
+            piece_type = rng.choice([chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN])
+            if piece_type == chess.PAWN and chess.square_rank(square) in (0, 7):
+                continue
+            board.set_piece_at(square, chess.Piece(piece_type, rng.choice([chess.WHITE, chess.BLACK])))
+        if board.is_valid() and not board.is_game_over():
+            return board
+
+def playout(board, tablebase, rng, max_plies=100):
+    """Length of a random game from board, the ply at which the tablebase first covers it and that position.
+
+    The ply and position are None if the game never reaches the tablebase.
+    """
+    decided_at = decided_board = None
+    plies = 0
+    while plies < max_plies and not board.is_game_over():
+        board.push(rng.choice(list(board.legal_moves)))
+        plies += 1
+        if decided_at is None and tablebase.probe(board) is not None:
+            decided_at = plies
+            decided_board = board.copy(stack=False)
+    return plies, decided_at, decided_board
+
+def time_probe(tablebase, boards, cached):
+    if not cached:
+        tablebase.clear()
+    start = time.perf_counter()
+    for board in boards:
+        tablebase.probe(board)
+    return (time.perf_counter() - start) / len(boards) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=500)
+    parser.add_argument('--syzygy', help="directory of Syzygy .rtbw/.rtbz files")
+    args = parser.parse_args()
+
+    if args.syzygy:
+        tablebase = EndgameTablebase(args.syzygy)
+        print(f"Syzygy tables from {args.syzygy}, up to {tablebase.max_pieces} pieces")
+    else:
+        tablebase = EndgameTablebase(prober=ThreePieceProber(), max_pieces=3)
+        print("stand-in three-piece prober (pass --syzygy DIR for real tables)")
+
+    rng = random.Random(0)
+    saved = []
+    decided_games = 0
+    covered = []
+    for _ in range(args.games):
+        board = random_start(rng)
+        plies, decided_at, decided_board = playout(board, tablebase, rng)
+        if decided_at is not None:
+            decided_games += 1
+            saved.append(plies - decided_at)
+            covered.append(decided_board)
+        else:
+            saved.append(0)
+    lookups = tablebase.probes + tablebase.hits
+    print(f"{decided_games}/{args.games} games reach a tablebase position; "
+          f"{sum(saved) / len(saved):.1f} plies saved per episode "
+          f"({sum(saved) / max(decided_games, 1):.1f} per episode that reaches one)")
+    print(f"probe cache: {tablebase.hits}/{lookups} lookups served from the cache, "
+          f"{tablebase.probes} probes of the tables")
+    if covered:
+        print(f"probe cost: {time_probe(tablebase, covered, cached=False):.1f} us uncached, "
+              f"{time_probe(tablebase, covered, cached=True):.1f} us cached")
+
+    # Queen takes the undefended rook into a won king and queen endgame
+    board = chess.Board("8/6r1/8/3k4/8/8/8/Q1K5 w - - 0 1")
+    move, info = SearchEngine(tablebase=tablebase, max_time=1.0).search(board, max_depth=3)
+    assert move == chess.Move.from_uci("a1g7"), move
+    print(f"search with tablebase: {info}")
+
+if __name__ == "__main__":
+    main()
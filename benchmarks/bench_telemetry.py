@@ -0,0 +1,78 @@
+"""Measure the cost of telemetry stages and show a sample episode record.
+
+Times a loop of small stage bodies bare, wrapped in stages of a disabled
+Telemetry and of an enabled one, and reports the overhead per stage.
+Then trains one short episode with train_dqn_agent writing JSONL (or CSV
+with --csv) and prints the record, so the split of an episode's time
+between move generation, encoding, reward, predict and fit can be read
+off directly. With --profile the episode is also profiled with the
+chosen profiler.
+
+Usage: python benchmarks/bench_telemetry.py [--iterations N] [--csv] [--profile cprofile|sampling]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from telemetry import Telemetry
+
+def stage_loop(telemetry, iterations):
+    """Seconds per iteration of a loop with three stages and a counter, as a training ply has."""
+    total = 0
+    start = time.perf_counter()
+    if telemetry is None:
+        for i in range(iterations):
+            total += i
+            total ^= i
+            total -= i
+    else:
+        for i in range(iterations):
+            with telemetry.stage("a"):
+                total += i
+            with telemetry.stage("b"):
+                total ^= i
+            with telemetry.stage("c"):
+                total -= i
+            telemetry.count("plies")
+    return (time.perf_counter() - start) / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--csv', action='store_true')
+    parser.add_argument('--profile', choices=("cprofile", "sampling"))
+    args = parser.parse_args()
+
+    base = stage_loop(None, args.iterations)
+    for name, telemetry in (("disabled", Telemetry(enabled=False)), ("enabled", Telemetry())):
+        per_iteration = stage_loop(telemetry, args.iterations)
+        print(f"{name:8s} telemetry: {(per_iteration - base) / 3 * 1e9:6.0f} ns per stage")
+
+    from agent import train_dqn_agent
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "telemetry.csv" if args.csv else "telemetry.jsonl")
+        profile_path = os.path.join(directory, "profile")
+        telemetry = Telemetry(path, profile_episodes=(1, 1) if args.profile else None,
+                              profile_path=profile_path, profiler=args.profile or "cprofile")
+        train_dqn_agent(episodes=1, telemetry=telemetry)
+        with open(path) as f:
+            contents = f.read()
+        if args.csv:
+            print(contents)
+        else:
+            print(json.dumps(json.loads(contents), indent=2))
+        if args.profile == "cprofile":
+            import pstats
+            pstats.Stats(profile_path + ".prof").sort_stats("cumulative").print_stats(15)
+        elif args.profile == "sampling":
+            with open(profile_path + ".txt") as f:
+                print("".join(f.readlines()[:5]))
+
+if __name__ == "__main__":
+    main()
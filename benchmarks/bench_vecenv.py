@@ -0,0 +1,75 @@
+"""Benchmark acting through VecChessEnv against one game at a time.
+
+Collects greedy transitions (state, action, reward, next state, done and
+next legal mask) for a fixed number of plies the way train_dqn_agent does,
+with one ChessEngine and one DQNAgent.act call per ply, and then through
+VecChessEnv with one act_batch call per step for each number of
+environments. Reports transitions per second; no training steps are run.
+
+Usage: python benchmarks/bench_vecenv.py [--plies N] [--envs 1,16,64]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agent import DQNAgent
+from core import ChessEngine
+from encoding import STATE_SIZE, ACTION_SIZE, board_to_state, legal_mask
+from evaluation import IncrementalEvaluator, get_reward
+from vecenv import VecChessEnv
+
+def sequential(agent, plies):
+    """The train_dqn_agent loop without replay; returns transitions per second."""
+    game = ChessEngine(evaluator=IncrementalEvaluator())
+    state = board_to_state(game.board)
+    start = time.perf_counter()
+    for _ in range(plies):
+        action = agent.act(state, game.legal_moves())
+        game.make_move(action)
+        next_state = board_to_state(game.board)
+        next_legal_moves = game.legal_moves()
+        reward = get_reward(game.board, game.evaluator, game.position_moves())
+        done = game.game_over or not next_legal_moves
+        legal_mask(next_legal_moves)
+        state = next_state
+        if done or game.current_position >= 100:
+            game.reset()
+            state = board_to_state(game.board)
+    return plies / (time.perf_counter() - start)
+
+def vectorized(agent, plies, num_envs):
+    """The train_dqn_agent_vec loop without replay; returns transitions per second."""
+    env = VecChessEnv(num_envs)
+    states, masks = env.reset()
+    steps = max(1, plies // num_envs)
+    start = time.perf_counter()
+    for _ in range(steps):
+        actions = agent.act_batch(states, masks)
+        next_states, rewards, dones, _, next_masks = env.step(actions)
+        np.packbits(next_masks, axis=1)
+        states, masks = env.states, env.masks
+    return steps * num_envs / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--plies', type=int, default=2000)
+    parser.add_argument('--envs', default="1,16,64")
+    args = parser.parse_args()
+
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE)
+    agent.epsilon = 0.0  # measure the model path only
+    sequential(agent, 10)  # warm up
+
+    base = sequential(agent, args.plies)
+    print(f"one game, act per ply: {base:8,.0f} transitions/s")
+    for num_envs in (int(n) for n in args.envs.split(",")):
+        rate = vectorized(agent, args.plies, num_envs)
+        print(f"VecChessEnv({num_envs:3d}):      {rate:8,.0f} transitions/s ({rate / base:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import random
+
+import chess
+import chess.polyglot
+
+class OpeningBook:
+    """Polyglot .bin opening book read through a memory map.
+
+    Lookups hash the position with the Polyglot Zobrist keys and binary
+    search the book's sorted entries in place
+    (chess.polyglot.MemoryMappedReader), so only the pages touched by a
+    search are read and a book of any size opens instantly. Only
+    positions before ply max_depth are looked up, and entries with less
+    than minimum_weight or whose move is illegal on the board are
+    ignored. lookups and hits count the lookups made and the ones that
+    found a move.
+    """
+    def __init__(self, path, max_depth=20, minimum_weight=1):
+        self.path = path
+        self.max_depth = max_depth
+        self.minimum_weight = minimum_weight
+        self.reader = chess.polyglot.open_reader(path)
+        self.lookups = 0
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.reader)
+
+    def moves(self, board):
+        """(move, weight) of every book entry for board, or [] past max_depth or out of book."""
+        if self.max_depth is not None and board.ply() >= self.max_depth:
+            return []
+        self.lookups += 1
+        entries = [(entry.move, entry.weight)
+                   for entry in self.reader.find_all(board, minimum_weight=self.minimum_weight)]
+        if entries:
+            self.hits += 1
+        return entries
+
+    def choose(self, board, rng=random, weighted=True):
+        """A book move for board picked at random in proportion to the weights, or the heaviest one.
+
+        Returns None when the position is not in the book.
+        """
+        entries = self.moves(board)
+        if not entries:
+            return None
+        if not weighted:
+            return max(entries, key=lambda entry: entry[1])[0]
+        return rng.choices([move for move, _ in entries], weights=[weight for _, weight in entries])[0]
+
+    def play_opening(self, game, rng=random, plies=None):
+        """Play weighted random book moves on a ChessEngine until it leaves the book; return the plies played.
+
+        plies caps the number of moves (max_depth still applies).
+        """
+        played = 0
+        while (plies is None or played < plies) and not game.game_over:
+            move = self.choose(game.board, rng)
+            if move is None or not game.make_move(move):
+                break
+            played += 1
+        return played
+
+    def close(self):
+        self.reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
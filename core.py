@@ -0,0 +1,302 @@
+import chess
+import time
+from movecache import LegalMoveCache
+
+class ChessTimer:
+    """Manages game timer for both players."""
+    def __init__(self, initial_time_minutes=10):
+        self.initial_time = initial_time_minutes * 60
+        self.white_time = self.initial_time
+        self.black_time = self.initial_time
+        self.last_update = time.time()
+        self.running = False
+        self.current_player = chess.WHITE
+
+    def start(self):
+        """Start the timer."""
+        self.running = True
+        self.last_update = time.time()
+
+    def stop(self):
+        """Stop the timer."""
+        self.running = False
+
+    def reset(self):
+        """Reset the timer to initial time."""
+        self.white_time = self.initial_time
+        self.black_time = self.initial_time
+        self.running = False
+        self.current_player = chess.WHITE
+
+    def switch_player(self):
+        """Switch the active player's timer."""
+        self.current_player = not self.current_player
+        self.last_update = time.time()
+
+    def update(self):
+        """Update the current player's remaining time."""
+        if self.running:
+            current_time = time.time()
+            elapsed = current_time - self.last_update
+            if self.current_player == chess.WHITE:
+                self.white_time -= elapsed
+            else:
+                self.black_time -= elapsed
+            self.last_update = current_time
+
+    def is_time_up(self):
+        """Check if either player has run out of time."""
+        return self.white_time <= 0 or self.black_time <= 0
+
+    def get_time_str(self, seconds):
+        """Format seconds as MM:SS string."""
+        minutes = int(seconds // 60)
+        seconds = int(seconds % 60)
+        return f"{minutes:02d}:{seconds:02d}"
+
+class ChessEngine:
+    """Headless chess game state: board, move history, timer and move application.
+
+    Has no pygame dependency so that training and batch tools can create many
+    instances cheaply. The pygame UI in engine.py wraps an instance of this class.
+
+    History is the list of moves of the current line: undo pops the board's
+    move stack and redo pushes the next move, so repetition and 50-move
+    state stay correct. With checkpoint_interval set, a board snapshot is
+    kept every checkpoint_interval plies (at the next pawn move or capture,
+    before which no position can repeat). The live board then only keeps
+    its move stack since the last checkpoint, which bounds memory on long
+    games, and goto_position() can jump far back by replaying from a
+    snapshot instead of popping every move.
+
+    Legal moves and game-over checks go through a LegalMoveCache, so each
+    position's moves are generated once no matter how often the UI or a
+    training loop asks; move_cache.avoided counts the generations saved
+    in the current game.
+
+    With an evaluation.IncrementalEvaluator as evaluator, moves are played
+    and taken back through it so its score always matches the board.
+
+    With a book.OpeningBook as book, the computer opponent plays book
+    moves while the position is in the book and only searches after that.
+
+    Only a clocked game (the UI's and the server's) charges wall-clock
+    time to the mover and ends when a flag falls; headless games for
+    training, imports and benchmarks never lose on time.
+    """
+    def __init__(self, opponent=None, opponent_color=chess.BLACK, checkpoint_interval=None, evaluator=None,
+                 book=None, clocked=False):
+        self.timer = ChessTimer()
+        self.clocked = clocked
+        self.evaluator = evaluator
+        self.book = book
+        self.opponent = opponent
+        self.opponent_color = opponent_color
+        self.checkpoint_interval = checkpoint_interval
+        self.last_search_info = None
+        self.move_cache = LegalMoveCache()
+        self.reset()
+
+    def set_opponent(self, opponent, color=chess.BLACK):
+        """Let a computer opponent (e.g. search.SearchEngine) play the given color, or None for two humans."""
+        self.opponent = opponent
+        self.opponent_color = color
+
+    def is_opponent_turn(self):
+        """Check if the computer opponent is to move."""
+        return self.opponent is not None and not self.game_over and self.board.turn == self.opponent_color
+
+    def book_move(self):
+        """A weighted random move from the opening book for the current position, or None."""
+        if self.book is None:
+            return None
+        return self.book.choose(self.board)
+
+    def reset(self, fen=None):
+        """Reset the game to the initial position, or to the position fen (e.g. a test position)."""
+        self.board = chess.Board(fen) if fen else chess.Board()
+        self.start_board = self.board.copy()
+        if self.evaluator is not None:
+            self.evaluator.reset(self.board)
+        self.move_cache.invalidate()
+        self.move_cache.reset_counters()
+        self.game_over = False
+        self.move_history = []
+        self.capture_history = []
+        self.checkpoints = []
+        self.base_position = 0
+        self.current_position = 0
+        self.last_move = None
+        self.last_move_was_capture = False
+        self.timer.reset()
+        self.game_started = False
+        self.resigned = False
+        self.winner_by_resignation = None
+        self.last_search_info = None
+
+    def resign_game(self, color=None):
+        """The given color, by default the current player, resigns the game."""
+        if not self.game_over and self.game_started:
+            if color is None:
+                color = self.board.turn
+            self.resigned = True
+            self.game_over = True
+            self.winner_by_resignation = not color
+            self.timer.stop()
+
+    def undo_move(self):
+        """Undo the last move."""
+        if self.current_position > 0:
+            if self.current_position > self.base_position:
+                self._pop()
+                self._set_position(self.current_position - 1)
+            else:
+                self.goto_position(self.current_position - 1)
+            self.game_over = False
+            return True
+        return False
+
+    def redo_move(self):
+        """Redo a previously undone move."""
+        if self.current_position < len(self.move_history):
+            self._push(self.move_history[self.current_position])
+            self._set_position(self.current_position + 1)
+            self._add_checkpoint()
+            self.game_over = self.is_game_over()
+            return True
+        return False
+
+    def goto_position(self, ply):
+        """Jump to any ply of the current line, from a checkpoint when that is cheaper than popping."""
+        if not 0 <= ply <= len(self.move_history):
+            return False
+        if ply < self.current_position:
+            base, snapshot = 0, None
+            for checkpoint_ply, checkpoint_board in self.checkpoints:
+                if checkpoint_ply > ply:
+                    break
+                base, snapshot = checkpoint_ply, checkpoint_board
+            # A pop costs about a third of a push, so replay only when it is much shorter
+            if ply < self.base_position or 3 * (ply - base) < self.current_position - ply:
+                # Load the position into the live board, which the evaluator or a renderer may hold
+                source = snapshot if snapshot is not None else self.start_board
+                self.board.set_fen(source.fen(en_passant="fen"))
+                self.base_position = base
+                if self.evaluator is not None:
+                    self.evaluator.reset(self.board)
+                for move in self.move_history[base:ply]:
+                    self._push(move)
+            else:
+                for _ in range(self.current_position - ply):
+                    self._pop()
+        else:
+            for move in self.move_history[self.current_position:ply]:
+                self._push(move)
+        self.move_cache.invalidate()
+        self._set_position(ply)
+        self.game_over = self.is_game_over()
+        return True
+
+    def _push(self, move):
+        """Play move on the board, keeping the evaluator and move cache in step."""
+        if self.evaluator is not None:
+            self.evaluator.push(self.board, move)
+        else:
+            self.board.push(move)
+        self.move_cache.invalidate()
+
+    def _pop(self):
+        """Take back the board's last move, keeping the evaluator and move cache in step."""
+        if self.evaluator is not None:
+            self.evaluator.pop(self.board)
+        else:
+            self.board.pop()
+        self.move_cache.invalidate()
+
+    def _set_position(self, ply):
+        """Point the history at ply and restore the last move details."""
+        self.current_position = ply
+        self.last_move = self.move_history[ply - 1] if ply else None
+        self.last_move_was_capture = self.capture_history[ply - 1] if ply else False
+
+    def _add_checkpoint(self):
+        """Snapshot the board if a checkpoint is due at the current ply."""
+        if not self.checkpoint_interval or self.board.halfmove_clock != 0:
+            return
+        last_checkpoint = self.checkpoints[-1][0] if self.checkpoints else 0
+        if self.current_position - last_checkpoint >= self.checkpoint_interval:
+            self.checkpoints.append((self.current_position, self.board.copy(stack=False)))
+            # Drop the live board's states (and the evaluator's scores) from before the checkpoint in place
+            self.board.clear_stack()
+            if self.evaluator is not None:
+                self.evaluator.trim()
+            self.base_position = self.current_position
+
+    def make_move(self, move):
+        """Execute a move if it's legal and update game state."""
+        if self.move_cache.is_legal(self.board, move):
+            self._apply(move)
+            return True
+        return False
+
+    def make_trusted_move(self, move, generate=True):
+        """Execute a move the caller knows to be legal (from a search, a masked agent action or a PGN replay).
+
+        Skips make_move's legality check; playing an illegal move this way
+        corrupts the game. With generate, game over is decided from the new
+        position's full move list, which is cached for the caller's next
+        legal_moves() or position_moves(); callers that only need game_over
+        pass generate=False, and board.is_game_over() stops at the first
+        legal move instead.
+        """
+        self._apply(move, generate=generate)
+
+    def _apply(self, move, generate=False):
+        """Play move and update the history, clock and game over state."""
+        if not self.game_started:
+            self.timer.start()
+            self.game_started = True
+
+        # Store capture status before making the move
+        self.last_move_was_capture = self.board.is_capture(move)
+        self._push(move)
+        if self.clocked:
+            # Charge the mover for time spent since the last update (e.g. a computer search)
+            self.timer.update()
+        self.timer.switch_player()
+        # Drop the undone moves (and their checkpoints) that this move replaces
+        del self.move_history[self.current_position:]
+        del self.capture_history[self.current_position:]
+        while self.checkpoints and self.checkpoints[-1][0] > self.current_position:
+            self.checkpoints.pop()
+        self.move_history.append(move)
+        self.capture_history.append(self.last_move_was_capture)
+        self.current_position += 1
+        self.last_move = move
+        self._add_checkpoint()
+
+        if generate:
+            self.position_moves()
+        if self.is_game_over() or (self.clocked and self.timer.is_time_up()):
+            self.game_over = True
+            self.timer.stop()
+
+    def is_promotion_move(self, from_square, to_square):
+        """Check if a move from from_square to to_square is a pawn promotion."""
+        return self.position_moves().is_promotion(from_square, to_square)
+
+    def position_moves(self):
+        """Cached PositionMoves (legal moves, check and mate state) of the current position."""
+        return self.move_cache.position(self.board)
+
+    def legal_moves(self):
+        """List of legal moves in the current position."""
+        return self.position_moves().moves
+
+    def moves_from(self, square):
+        """Legal moves starting on square."""
+        return self.position_moves().moves_from(square)
+
+    def is_game_over(self):
+        """Same as board.is_game_over(), without generating the moves again."""
+        return self.move_cache.is_game_over(self.board)
@@ -0,0 +1,259 @@
+import argparse
+import io
+import json
+import multiprocessing as mp
+import os
+
+import chess
+import chess.pgn
+import numpy as np
+
+from core import ChessEngine
+from encoding import piece_masks, piece_masks_to_states, legal_masks, move_indices, ACTION_SIZE
+from evaluation import IncrementalEvaluator, get_reward
+
+MANIFEST = "dataset.json"
+RESULTS = {"1-0": 1, "0-1": -1, "1/2-1/2": 0}
+CHUNK_BYTES = 64 * 1024 * 1024
+
+def _previous_line_is_tag(f, pos):
+    """Whether the line ending just before byte pos of the binary file f is a PGN tag."""
+    if pos == 0:
+        return False
+    # Tag lines are short, so a line longer than the look-back is movetext
+    lookback = min(pos, 4096)
+    f.seek(pos - lookback)
+    block = f.read(lookback)[:-1]
+    newline = block.rfind(b"\n")
+    if newline < 0 and lookback < pos:
+        return False
+    return block[newline + 1:].startswith(b"[")
+
+def iter_game_texts(path, start=0, end=None):
+    """Yield (offset, bytes) of every game of a PGN file that starts in the byte range [start, end).
+
+    A game starts at a tag line ("[Name ...]") that does not follow
+    another tag line. Consecutive ranges therefore split a file between
+    games, so each worker of a parallel import can read its own range
+    without scanning the file first. Only one game is held in memory.
+    """
+    with open(path, "rb") as f:
+        offset = start
+        if start > 0:
+            # Continue from the first full line at or after start
+            f.seek(start - 1)
+            offset = start - 1 + len(f.readline())
+            previous_tag = _previous_line_is_tag(f, offset)
+            f.seek(offset)
+        else:
+            previous_tag = False
+        game_offset, lines = None, []
+        for line in f:
+            is_tag = line.startswith(b"[")
+            if is_tag and not previous_tag:
+                if lines:
+                    yield game_offset, b"".join(lines)
+                if end is not None and offset >= end:
+                    return
+                game_offset, lines = offset, []
+            if game_offset is not None:
+                lines.append(line)
+            previous_tag = is_tag
+            offset += len(line)
+        if lines:
+            yield game_offset, b"".join(lines)
+
+def iter_games(path, start=0, end=None):
+    """Parse the games of a PGN file (or of a byte range of it) one at a time as chess.pgn.Game objects."""
+    for _, text in iter_game_texts(path, start, end):
+        game = chess.pgn.read_game(io.StringIO(text.decode("utf-8", errors="replace")))
+        if game is not None:
+            yield game
+
+def accept_game(game, min_elo=None):
+    """Whether game is a finished standard chess game without parse errors, with both players over min_elo."""
+    headers = game.headers
+    if game.errors or headers.get("Result") not in RESULTS:
+        return False
+    if "FEN" in headers or headers.get("Variant", "Standard").lower() not in ("standard", "chess"):
+        return False
+    if min_elo is not None:
+        for key in ("WhiteElo", "BlackElo"):
+            elo = headers.get(key, "")
+            if not elo.isdigit() or int(elo) < min_elo:
+                return False
+    return True
+
+def game_records(game, engine, fens=False):
+    """Replay game's main line through a headless ChessEngine and return its records, or None.
+
+    Returns a dict of per-ply arrays: the 12 piece bitboards of the
+    position before the move ("boards"), its bit-packed legal-action mask
+    ("legal"), the move's action index, get_reward after the move, done
+    on the last ply and the game result from white's point of view.
+    None means a move was rejected as illegal.
+    """
+    engine.reset()
+    boards, move_lists, moves, rewards, fen_list = [], [], [], [], []
+    for move in game.mainline_moves():
+        board = engine.board
+        boards.append(piece_masks(board))
+        move_lists.append(engine.legal_moves())
+        if fens:
+            fen_list.append(board.fen())
+        if move not in move_lists[-1]:
+            return None
+        engine.make_trusted_move(move)
+        moves.append(move)
+        rewards.append(get_reward(engine.board, engine.evaluator, engine.position_moves()))
+    n = len(moves)
+    if n == 0:
+        return None
+    dones = np.zeros(n, dtype=np.bool_)
+    dones[-1] = True
+    records = {
+        "boards": np.array(boards, dtype=np.uint64),
+        "legal": np.packbits(legal_masks(move_lists), axis=1),
+        "actions": move_indices(moves).astype(np.int32),
+        "rewards": np.array(rewards, dtype=np.float32),
+        "dones": dones,
+        "results": np.full(n, RESULTS[game.headers["Result"]], dtype=np.int8)
+    }
+    if fens:
+        records["fens"] = np.array(fen_list)
+    return records
+
+class ShardWriter:
+    """Collects game records and writes them as compressed .npz shards of about shard_size positions.
+
+    Shards only end between games, so the next position of every record
+    that is not done is the following record of the same shard.
+    """
+    def __init__(self, directory, prefix, shard_size=100000):
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.games = []
+        self.positions = 0
+        self.shards = []
+
+    def add(self, records):
+        self.games.append(records)
+        self.positions += len(records["actions"])
+        if self.positions >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """Write the collected games as one shard."""
+        if not self.games:
+            return
+        filename = f"{self.prefix}-{len(self.shards):04d}.npz"
+        arrays = {name: np.concatenate([game[name] for game in self.games]) for name in self.games[0]}
+        np.savez_compressed(os.path.join(self.directory, filename), **arrays)
+        self.shards.append({"file": filename, "positions": self.positions, "games": len(self.games)})
+        self.games = []
+        self.positions = 0
+
+def import_range(path, start, end, directory, prefix, shard_size=100000, min_elo=None, fens=False):
+    """Import the games starting in one byte range of a PGN file; return the shards written and counts."""
+    engine = ChessEngine(evaluator=IncrementalEvaluator())
+    writer = ShardWriter(directory, prefix, shard_size)
+    games = skipped = 0
+    for game in iter_games(path, start, end):
+        records = game_records(game, engine, fens) if accept_game(game, min_elo) else None
+        if records is None:
+            skipped += 1
+            continue
+        writer.add(records)
+        games += 1
+    writer.flush()
+    return {"shards": writer.shards, "games": games, "skipped": skipped}
+
+def _import_task(task):
+    return import_range(*task)
+
+def import_pgn(paths, directory, num_workers=None, shard_size=100000, min_elo=None, fens=False,
+               chunk_bytes=CHUNK_BYTES):
+    """Import PGN files into a directory of .npz shards, splitting them into byte ranges across processes.
+
+    Every chunk_bytes of input is one task for a pool of num_workers
+    processes (all CPUs by default), each writing its own shards, so files
+    of any size are streamed with one game in memory per worker. The
+    shards are listed with their sizes in dataset.json, which is returned.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    os.makedirs(directory, exist_ok=True)
+    tasks = []
+    for path in paths:
+        size = os.path.getsize(path)
+        for start in range(0, max(size, 1), chunk_bytes):
+            prefix = f"{os.path.splitext(os.path.basename(path))[0]}-{len(tasks):05d}"
+            tasks.append((path, start, min(start + chunk_bytes, size), directory, prefix,
+                          shard_size, min_elo, fens))
+
+    num_workers = min(num_workers or os.cpu_count() or 1, len(tasks))
+    if num_workers <= 1:
+        results = [_import_task(task) for task in tasks]
+    else:
+        # Workers only need the chess code, so start them without the parent's state
+        with mp.get_context("spawn").Pool(num_workers) as pool:
+            results = list(pool.imap_unordered(_import_task, tasks))
+
+    shards = sorted((shard for result in results for shard in result["shards"]), key=lambda shard: shard["file"])
+    manifest = {
+        "sources": [os.path.abspath(path) for path in paths],
+        "games": sum(result["games"] for result in results),
+        "skipped": sum(result["skipped"] for result in results),
+        "positions": sum(shard["positions"] for shard in shards),
+        "action_size": ACTION_SIZE,
+        "shards": shards
+    }
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def load_manifest(directory):
+    with open(os.path.join(directory, MANIFEST)) as f:
+        return json.load(f)
+
+def iter_shards(directory, rng=None):
+    """Load the shards of an imported dataset one at a time, in a shuffled order if rng is given."""
+    shards = load_manifest(directory)["shards"]
+    order = rng.permutation(len(shards)) if rng is not None else range(len(shards))
+    for i in order:
+        with np.load(os.path.join(directory, shards[i]["file"])) as data:
+            yield {name: data[name] for name in data.files}
+
+def shard_batch(shard, indices):
+    """Decode the records at indices of a shard into replay transitions.
+
+    Returns (states, actions, rewards, next_states, dones, next_masks) as
+    ReplayBuffer.get_batch does. The next state and mask of a done
+    record are unknown and left as the record's own state and an empty
+    mask.
+    """
+    boards, legal, dones = shard["boards"], shard["legal"], shard["dones"]
+    batch_dones = dones[indices]
+    next_indices = np.where(batch_dones, indices, indices + 1)
+    next_masks = np.unpackbits(legal[next_indices], axis=1, count=ACTION_SIZE).astype(np.bool_)
+    next_masks[batch_dones] = False
+    return (piece_masks_to_states(boards[indices]), shard["actions"][indices], shard["rewards"][indices],
+            piece_masks_to_states(boards[next_indices]), batch_dones, next_masks)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import PGN files into .npz shards for pretraining.")
+    parser.add_argument('pgn', nargs='+', help="PGN files to import")
+    parser.add_argument('--output', required=True, help="dataset directory")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--shard-size', type=int, default=100000, help="positions per shard")
+    parser.add_argument('--min-elo', type=int, default=None, help="skip games with a player rated below this")
+    parser.add_argument('--fens', action='store_true', help="also store the FEN of every position")
+    args = parser.parse_args()
+
+    manifest = import_pgn(args.pgn, args.output, args.workers, args.shard_size, args.min_elo, args.fens)
+    print(f"Imported {manifest['games']} games ({manifest['positions']} positions, {manifest['skipped']} skipped) "
+          f"into {len(manifest['shards'])} shards in {args.output}")
+
+if __name__ == "__main__":
+    main()
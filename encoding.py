@@ -0,0 +1,97 @@
+import chess
+import numpy as np
+
+PIECE_TYPES = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING]
+PROMOTION_PIECES = [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]
+STATE_SIZE = 8 * 8 * 12  # 8x8 board with 12 piece types
+
+def _promotion_moves():
+    """Every geometrically possible promotion: straight or capturing, to each promotion piece."""
+    moves = []
+    for from_rank, to_rank in ((6, 7), (1, 0)):
+        for file in range(8):
+            for to_file in (file - 1, file, file + 1):
+                if 0 <= to_file < 8:
+                    for piece_type in PROMOTION_PIECES:
+                        moves.append(chess.Move(chess.square(file, from_rank), chess.square(to_file, to_rank), piece_type))
+    return moves
+
+# Action layout: from_square * 64 + to_square for all non-promotion moves,
+# followed by one slot per (from, to, piece) promotion. Plain from-to slots
+# of pawn moves onto the last rank are never legal.
+INDEX_TO_MOVE = [chess.Move(index // 64, index % 64) for index in range(64 * 64)] + _promotion_moves()
+PROMOTION_INDEX = {(move.from_square, move.to_square, move.promotion): index
+                   for index, move in enumerate(INDEX_TO_MOVE) if move.promotion}
+ACTION_SIZE = len(INDEX_TO_MOVE)  # 4096 from-to pairs and 176 promotions
+
+def piece_masks(board):
+    """Return the 12 piece bitboards (white pawn..king, then black pawn..king)."""
+    return ([board.pieces_mask(piece_type, chess.WHITE) for piece_type in PIECE_TYPES] +
+            [board.pieces_mask(piece_type, chess.BLACK) for piece_type in PIECE_TYPES])
+
+def boards_to_states(boards, out=None):
+    """Encode a list of boards into one (N, 768) float32 array.
+
+    The 12 piece bitboards of every board are unpacked with NumPy bit
+    operations, so the index of a piece is square * 12 + piece_idx where
+    piece_idx is 0-5 for white pieces and 6-11 for black pieces.
+    """
+    masks = np.array([piece_masks(board) for board in boards], dtype='<u8').reshape(len(boards), 12)
+    return piece_masks_to_states(masks, out)
+
+def piece_masks_to_states(masks, out=None, dtype=np.float32):
+    """Encode an (N, 12) uint64 array of piece_masks() rows into (N, 768) states."""
+    n = len(masks)
+    if out is None:
+        out = np.empty((n, STATE_SIZE), dtype=dtype)
+    masks = np.ascontiguousarray(masks, dtype='<u8')
+    # Little-endian bytes with little bit order yield bit i == square i
+    bits = np.unpackbits(masks.view(np.uint8).reshape(n, 12, 8), axis=2, bitorder='little')
+    out[:] = bits.transpose(0, 2, 1).reshape(n, STATE_SIZE)
+    return out
+
+def board_to_state(board):
+    """Convert chess board to neural network input state."""
+    return boards_to_states([board])[0]
+
+def move_to_index(move):
+    """Convert a chess move to its action index."""
+    if move.promotion:
+        return PROMOTION_INDEX[(move.from_square, move.to_square, move.promotion)]
+    return move.from_square * 64 + move.to_square
+
+def index_to_move(index):
+    """Convert an action index back to a chess move, including its promotion piece."""
+    return INDEX_TO_MOVE[index]
+
+def move_indices(moves):
+    """Action indices of a sequence of moves as an int64 array."""
+    # move_to_index inlined: this runs for every legal move of every position in a batch
+    return np.array([move.from_square * 64 + move.to_square if not move.promotion else
+                     PROMOTION_INDEX[(move.from_square, move.to_square, move.promotion)]
+                     for move in moves], dtype=np.int64)
+
+def legal_mask(moves, out=None):
+    """Boolean (ACTION_SIZE,) mask that is True at the action index of every move."""
+    if out is None:
+        out = np.zeros(ACTION_SIZE, dtype=np.bool_)
+    else:
+        out[:] = False
+    out[move_indices(moves)] = True
+    return out
+
+def legal_masks(move_lists, out=None):
+    """Boolean (N, ACTION_SIZE) masks for a batch of move lists, filled with one scatter."""
+    n = len(move_lists)
+    if out is None:
+        out = np.zeros((n, ACTION_SIZE), dtype=np.bool_)
+    else:
+        out[:] = False
+    lengths = [len(moves) for moves in move_lists]
+    rows = np.repeat(np.arange(n), lengths)
+    out[rows, move_indices(move for moves in move_lists for move in moves)] = True
+    return out
+
+def masked_argmax(q_values, masks):
+    """Index of the highest Q-value among legal actions, per row of a batch (or for a single row)."""
+    return np.argmax(np.where(masks, q_values, -np.inf), axis=-1)
@@ -1,8 +1,13 @@
+import argparse
 import pygame
 import chess
 import time
-
-pygame.init()
+from core import ChessEngine
+from search import SearchEngine, incremental_evaluator
+from worker import SearchWorker
+from book import OpeningBook
+from tablebase import EndgameTablebase
+from server import RemoteGame
 
 # Color Constants
 DARK_SQUARE = (118, 150, 86)      # Darker green
@@ -24,26 +29,53 @@ BOARD_OFFSET_X = (WIDTH - BOARD_SIZE) // 2
 BOARD_OFFSET_Y = (HEIGHT - BOARD_SIZE) // 2
 FPS = 60
 
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("ChessGame")
-clock = pygame.time.Clock()
-
-# Load and scale piece images
-pieces_images = {
-    'p': pygame.transform.scale(pygame.image.load(f"images/p.png"), (SQUARE, SQUARE)),
-    'r': pygame.transform.scale(pygame.image.load(f"images/r.png"), (SQUARE, SQUARE)),
-    'n': pygame.transform.scale(pygame.image.load(f"images/n.png"), (SQUARE, SQUARE)),
-    'b': pygame.transform.scale(pygame.image.load(f"images/b.png"), (SQUARE, SQUARE)),
-    'q': pygame.transform.scale(pygame.image.load(f"images/q.png"), (SQUARE, SQUARE)),
-    'k': pygame.transform.scale(pygame.image.load(f"images/k.png"), (SQUARE, SQUARE)),
-    'P': pygame.transform.scale(pygame.image.load(f"images/wP.png"), (SQUARE, SQUARE)),
-    'R': pygame.transform.scale(pygame.image.load(f"images/wR.png"), (SQUARE, SQUARE)),
-    'N': pygame.transform.scale(pygame.image.load(f"images/wN.png"), (SQUARE, SQUARE)),
-    'B': pygame.transform.scale(pygame.image.load(f"images/wB.png"), (SQUARE, SQUARE)),
-    'Q': pygame.transform.scale(pygame.image.load(f"images/wQ.png"), (SQUARE, SQUARE)),
-    'K': pygame.transform.scale(pygame.image.load(f"images/wK.png"), (SQUARE, SQUARE))
+# Piece image file names, keyed by piece symbol
+PIECE_IMAGE_FILES = {
+    'p': "p.png", 'r': "r.png", 'n': "n.png", 'b': "b.png", 'q': "q.png", 'k': "k.png",
+    'P': "wP.png", 'R': "wR.png", 'N': "wN.png", 'B': "wB.png", 'Q': "wQ.png", 'K': "wK.png"
 }
 
+# Screen regions redrawn independently of the board squares
+STATUS_RECT = pygame.Rect(0, 0, WIDTH, BOARD_OFFSET_Y - 20)
+LEFT_PANEL_RECT = pygame.Rect(0, BOARD_OFFSET_Y - 20, BOARD_OFFSET_X - 20, BOARD_SIZE + 40)
+WHITE_TIMER_RECT = pygame.Rect(WIDTH - 120, BOARD_OFFSET_Y + 5, 120, 30)
+BLACK_TIMER_RECT = pygame.Rect(WIDTH - 120, BOARD_OFFSET_Y + BOARD_SIZE - 35, 120, 30)
+_NOT_DRAWN = object()
+NETWORK_EVENT = pygame.USEREVENT + 1  # posted by RemoteGame's network thread
+
+# Created by init_display() so that importing this module does not open a window
+screen = None
+clock = None
+pieces_images = {}
+
+def init_display():
+    """Initialize pygame, open the game window and load and scale piece images."""
+    global screen, clock
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("ChessGame")
+    clock = pygame.time.Clock()
+    for symbol, filename in PIECE_IMAGE_FILES.items():
+        image = pygame.image.load(f"images/{filename}").convert_alpha()
+        pieces_images[symbol] = pygame.transform.scale(image, (SQUARE, SQUARE))
+
+# Fonts by size, created on first use
+_fonts = {}
+
+def render_text(text, size, color):
+    """Antialiased surface for text in the default font at the given size."""
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font.render(text, True, color)
+
+# Font sizes
+BUTTON_FONT_SIZE = 28
+COORD_FONT_SIZE = 24
+INFO_FONT_SIZE = 24
+TEXT_FONT_SIZE = 32
+TIMER_FONT_SIZE = 36
+
 class Button:
     """Represents a clickable button in the UI."""
     def __init__(self, x, y, width, height, text, color, text_color):
@@ -52,13 +84,12 @@ class Button:
         self.color = color
         self.text_color = text_color
         self.hover = False
-        self.font = pygame.font.Font(None, 28)
 
     def draw(self, surface):
         color = BUTTON_HOVER_COLOR if self.hover else self.color
         # Draw button with rounded corners
         pygame.draw.rect(surface, color, self.rect, border_radius=5)
-        text_surface = self.font.render(self.text, True, self.text_color)
+        text_surface = render_text(self.text, BUTTON_FONT_SIZE, self.text_color)
         text_rect = text_surface.get_rect(center=self.rect.center)
         surface.blit(text_surface, text_rect)
 
@@ -107,91 +138,26 @@ class PromotionMenu:
             return self.pieces[clicked_index]
         return None
 
-class ChessTimer:
-    """Manages game timer for both players."""
-    def __init__(self, initial_time_minutes=10):
-            self.initial_time = initial_time_minutes * 60  
-            self.white_time = self.initial_time
-            self.black_time = self.initial_time
-            self.last_update = time.time()
-            self.running = False
-            self.current_player = chess.WHITE
-            self.font = pygame.font.Font(None, 36)
-
-    def start(self):
-        """Start the timer."""
-        self.running = True
-        self.last_update = time.time()
-
-    def stop(self):
-        """Stop the timer."""
-        self.running = False
-
-    def reset(self):
-        """Reset the timer to initial time."""
-        self.white_time = self.initial_time
-        self.black_time = self.initial_time
-        self.running = False
-
-    def switch_player(self):
-        """Switch the active player's timer."""
-        self.current_player = not self.current_player
-        self.last_update = time.time()
-
-    def update(self):
-        """Update the current player's remaining time."""
-        if self.running:
-            current_time = time.time()
-            elapsed = current_time - self.last_update
-            if self.current_player == chess.WHITE:
-                self.white_time -= elapsed
-            else:
-                self.black_time -= elapsed
-            self.last_update = current_time
-
-    def is_time_up(self):
-        """Check if either player has run out of time."""
-        return self.white_time <= 0 or self.black_time <= 0
-
-    def get_time_str(self, seconds):
-        """Format seconds as MM:SS string."""
-        minutes = int(seconds // 60)
-        seconds = int(seconds % 60)
-        return f"{minutes:02d}:{seconds:02d}"
-
-    def draw(self, screen):
-        """Draw the timer display on screen."""
-        # White's timer
-        white_text = self.font.render(f"{self.get_time_str(max(0, self.white_time))}", True, TEXT_COLOR)
-        screen.blit(white_text, (WIDTH - 120, BOARD_OFFSET_Y + 5))
-
-        # Black's timer
-        black_text = self.font.render(f"{self.get_time_str(max(0, self.black_time))}", True, TEXT_COLOR)
-        screen.blit(black_text, (WIDTH - 120, BOARD_OFFSET_Y + BOARD_SIZE - 35))
-
-class ChessEngine:
-    """Main chess game engine handling board state, moves, and UI rendering."""
-    def __init__(self):
-        self.board = chess.Board()
+class ChessRenderer:
+    """Pygame UI layer that draws a ChessEngine game and turns clicks into moves.
+
+    When the game has a computer opponent and a SearchWorker is given, the
+    opponent's moves are computed in the background and picked up by
+    update_computer() once per frame.
+    """
+    def __init__(self, game=None, worker=None, ponder=True):
+        self.game = game if game is not None else ChessEngine(clocked=True)
+        self.worker = worker
+        self.ponder = ponder
+        self.awaiting_computer_move = False
+        self.thinking_info = None
         self.selected_square = None
-        self.game_over = False
-        self.font = pygame.font.Font(None, 32)
+        self.static_surface = None
+        self.drawn = {}
+        self.dirty_rects = []
+        self.menu_rect = None
         
         self._init_buttons()
-        
-        self.promotion_menu = None
-        self.pending_promotion_move = None
-        self.illegal_move_squares = None
-        self.illegal_move_time = 0
-        self.illegal_move_duration = 0.5
-        self.board_history = [chess.Board().fen()]
-        self.current_position = 0
-        self.last_move = None
-        self.timer = ChessTimer()
-        self.game_started = False
-        self.highlighted_moves = []
-        self.resigned = False
-        self.winner_by_resignation = None
     
     def _init_buttons(self):
         """Initialize UI buttons."""
@@ -247,18 +213,22 @@ class ChessEngine:
         self.illegal_move_squares = None
         self.illegal_move_time = 0
         self.illegal_move_duration = 0.5
-        self.board_history = [chess.Board().fen()]
-        self.current_position = 0
-        self.last_move = None
-        self.last_move_was_capture = False
-        self.timer = ChessTimer()
-        self.game_started = False
         self.highlighted_moves = []
-        self.resigned = False
-        self.winner_by_resignation = None
 
-    def draw_board(self):
-        """Draw the chess board with squares and coordinates."""
+    def _square_rect(self, square):
+        """Screen rectangle of a chess square."""
+        return pygame.Rect(
+            BOARD_OFFSET_X + chess.square_file(square) * SQUARE,
+            BOARD_OFFSET_Y + (7 - chess.square_rank(square)) * SQUARE,
+            SQUARE,
+            SQUARE
+        )
+
+    def _build_static_surface(self):
+        """Prebuild everything that never changes: background, board squares and coordinates."""
+        surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+        surface.fill(BACKGROUND)
+
         # Draw board background
         board_background = pygame.Rect(
             BOARD_OFFSET_X - 20,
@@ -266,7 +236,7 @@ class ChessEngine:
             BOARD_SIZE + 40,
             BOARD_SIZE + 40
         )
-        pygame.draw.rect(screen, (60, 60, 60), board_background, border_radius=10)
+        pygame.draw.rect(surface, (60, 60, 60), board_background, border_radius=10)
         
         # Draw squares
         colors = [LIGHT_SQUARE, DARK_SQUARE]
@@ -274,7 +244,7 @@ class ChessEngine:
             for col in range(8):
                 color = colors[(row + col) % 2]
                 pygame.draw.rect(
-                    screen,
+                    surface,
                     color,
                     pygame.Rect(
                         BOARD_OFFSET_X + col * SQUARE,
@@ -285,224 +255,262 @@ class ChessEngine:
                 )
         
         # Draw coordinates
-        coord_font = pygame.font.Font(None, 24)
         for i in range(8):
             # Draw file labels (a-h)
-            file_label = coord_font.render(chess.FILE_NAMES[i], True, TEXT_COLOR)
+            file_label = render_text(chess.FILE_NAMES[i], COORD_FONT_SIZE, TEXT_COLOR)
             x = BOARD_OFFSET_X + i * SQUARE + SQUARE//2 - file_label.get_width()//2
-            screen.blit(file_label, (x, BOARD_OFFSET_Y + BOARD_SIZE + 5))
+            surface.blit(file_label, (x, BOARD_OFFSET_Y + BOARD_SIZE + 5))
             
             # Draw rank labels (1-8)
-            rank_label = coord_font.render(str(8-i), True, TEXT_COLOR)
+            rank_label = render_text(str(8-i), COORD_FONT_SIZE, TEXT_COLOR)
             y = BOARD_OFFSET_Y + i * SQUARE + SQUARE//2 - rank_label.get_height()//2
-            screen.blit(rank_label, (BOARD_OFFSET_X - 20, y))
-        
+            surface.blit(rank_label, (BOARD_OFFSET_X - 20, y))
+        return surface
+
+    def _square_highlights(self):
+        """Map squares to (colors drawn under the piece, colors drawn over it)."""
+        board = self.game.board
+        under = {}
+        over = {}
         if self.selected_square is not None:
-            row, col = chess.square_rank(self.selected_square), chess.square_file(self.selected_square)
-            pygame.draw.rect(screen, HIGHLIGHT_BLUE, pygame.Rect(BOARD_OFFSET_X + col * SQUARE, BOARD_OFFSET_Y + (7 - row) * SQUARE, SQUARE, SQUARE), 5)
-
+            under.setdefault(self.selected_square, []).append(HIGHLIGHT_BLUE)
         if self.illegal_move_squares and time.time() - self.illegal_move_time < self.illegal_move_duration:
             for square in self.illegal_move_squares:
-                row, col = chess.square_rank(square), chess.square_file(square)
-                pygame.draw.rect(screen, HIGHLIGHT_RED, pygame.Rect(BOARD_OFFSET_X + col * SQUARE, BOARD_OFFSET_Y + (7 - row) * SQUARE, SQUARE, SQUARE), 5)
+                under.setdefault(square, []).append(HIGHLIGHT_RED)
         else:
             self.illegal_move_squares = None
-
         for move in self.highlighted_moves:
-            from_row, from_col = chess.square_rank(move.from_square), chess.square_file(move.from_square)
-            to_row, to_col = chess.square_rank(move.to_square), chess.square_file(move.to_square)
-            pygame.draw.rect(screen, HIGHLIGHT_YELLOW, pygame.Rect(BOARD_OFFSET_X + to_col * SQUARE, BOARD_OFFSET_Y + (7 - to_row) * SQUARE, SQUARE, SQUARE), 5)
+            under.setdefault(move.to_square, []).append(HIGHLIGHT_YELLOW)
+
+        last_move = self.game.last_move
+        if last_move:
+            over.setdefault(last_move.from_square, []).append(HIGHLIGHT_YELLOW)
+            over.setdefault(last_move.to_square, []).append(HIGHLIGHT_YELLOW)
+
+        king_square = board.king(board.turn)
+        position = self.game.position_moves()
+        if not self.game.resigned and not self.game.timer.is_time_up():
+            if position.is_checkmate or (not position.is_stalemate and board.is_variant_draw()):
+                over.setdefault(king_square, []).append(HIGHLIGHT_RED)
+            elif not position.is_stalemate and position.is_check:
+                over.setdefault(king_square, []).append(HIGHLIGHT_YELLOW)
+        return under, over
+
+    def last_move_notation(self):
+        """Notation of the last move, with check or checkmate symbol, or None."""
+        last_move = self.game.last_move
+        if not last_move:
+            return None
 
-    def draw_pieces(self):
-        """Draw all pieces on the board."""
-        for square in chess.SQUARES:
-            piece = self.board.piece_at(square)
-            if piece:
-                file, rank = chess.square_file(square), chess.square_rank(square)
-                x = BOARD_OFFSET_X + file * SQUARE
-                y = BOARD_OFFSET_Y + (7 - rank) * SQUARE
-                piece_image = pieces_images[piece.symbol()]
-                screen.blit(piece_image, (x, y))
-
-    def draw_game_state(self):
-        """Draw game state indicators like check, checkmate, and move notation."""
-        king_square = self.board.king(self.board.turn)
-        col, row = chess.square_file(king_square), 7 - chess.square_rank(king_square)
-
-        if self.last_move:
-            from_file, from_rank = chess.square_file(self.last_move.from_square), chess.square_rank(self.last_move.from_square)
-            to_file, to_rank = chess.square_file(self.last_move.to_square), chess.square_rank(self.last_move.to_square)
-
-            # Determine move notation
-            if self.last_move.from_square == chess.E1 and self.last_move.to_square == chess.G1:
-                notation = "w.O-O"
-            elif self.last_move.from_square == chess.E1 and self.last_move.to_square == chess.C1:
-                notation = "w.O-O-O"
-            elif self.last_move.from_square == chess.E8 and self.last_move.to_square == chess.G8:
-                notation = "b.O-O"
-            elif self.last_move.from_square == chess.E8 and self.last_move.to_square == chess.C8:
-                notation = "b.O-O-O"
-            else:
-                piece = self.board.piece_at(self.last_move.to_square)
-                piece_name = piece.symbol().upper() if piece else ""
-                if piece_name == 'P':
-                    piece_name = ""
-                
-                capture_symbol = "x" if self.last_move_was_capture else ""
-
-                notation = f"{piece_name}{chess.square_name(self.last_move.from_square)}{capture_symbol}{chess.square_name(self.last_move.to_square)}"
-            
-            # Add checkmate or check symbol
-            if self.board.is_checkmate():
-                notation += "#"
-            elif self.board.is_check():
-                notation += "+"
-
-            last_move_surface = self.font.render(notation, True, TEXT_COLOR)
-            last_move_rect = last_move_surface.get_rect(topleft=(WIDTH - 760, HEIGHT // 2 - 10))
-            screen.blit(last_move_surface, last_move_rect)
+        # Determine move notation
+        if last_move.from_square == chess.E1 and last_move.to_square == chess.G1:
+            notation = "w.O-O"
+        elif last_move.from_square == chess.E1 and last_move.to_square == chess.C1:
+            notation = "w.O-O-O"
+        elif last_move.from_square == chess.E8 and last_move.to_square == chess.G8:
+            notation = "b.O-O"
+        elif last_move.from_square == chess.E8 and last_move.to_square == chess.C8:
+            notation = "b.O-O-O"
+        else:
+            piece = self.game.board.piece_at(last_move.to_square)
+            piece_name = piece.symbol().upper() if piece else ""
+            if piece_name == 'P':
+                piece_name = ""
             
-            # Highlight last move squares
-            pygame.draw.rect(
-                screen,
-                HIGHLIGHT_YELLOW,
-                pygame.Rect(
-                    BOARD_OFFSET_X + from_file * SQUARE,
-                    BOARD_OFFSET_Y + (7 - from_rank) * SQUARE,
-                    SQUARE,
-                    SQUARE
-                ),
-                5
-            )
-            pygame.draw.rect(
-                screen,
-                HIGHLIGHT_YELLOW,
-                pygame.Rect(
-                    BOARD_OFFSET_X + to_file * SQUARE,
-                    BOARD_OFFSET_Y + (7 - to_rank) * SQUARE,
-                    SQUARE,
-                    SQUARE
-                ),
-                5
-            )
-        
-        # Draw game status messages
-        status_text = ""
-        if self.resigned:
-            status_text = "White resigns! Black wins!" if self.winner_by_resignation == chess.BLACK else "Black resigns! White wins!"
-        elif self.timer.white_time <= 0:
-            status_text = "Black wins on time!"
-        elif self.timer.black_time <= 0:
-            status_text = "White wins on time!"
-        elif self.board.is_checkmate():
-            status_text = "0-1" if self.board.turn == chess.WHITE else "1-0"
-            pygame.draw.rect(screen, HIGHLIGHT_RED, pygame.Rect(BOARD_OFFSET_X + col * SQUARE, BOARD_OFFSET_Y + (row) * SQUARE, SQUARE, SQUARE), 5)
-        elif self.board.is_stalemate():
-            status_text = "Stalemate"
-        elif self.board.is_variant_draw():
-            status_text = "1/2-1/2"
-            pygame.draw.rect(screen, HIGHLIGHT_RED, pygame.Rect(BOARD_OFFSET_X + col * SQUARE, BOARD_OFFSET_Y + (row) * SQUARE, SQUARE, SQUARE), 5)
-        elif self.board.is_check():
-            pygame.draw.rect(screen, HIGHLIGHT_YELLOW, pygame.Rect(BOARD_OFFSET_X + col * SQUARE, BOARD_OFFSET_Y + (row) * SQUARE, SQUARE, SQUARE), 5)
-            return
+            capture_symbol = "x" if self.game.last_move_was_capture else ""
+
+            notation = f"{piece_name}{chess.square_name(last_move.from_square)}{capture_symbol}{chess.square_name(last_move.to_square)}"
         
+        # Add checkmate or check symbol
+        position = self.game.position_moves()
+        if position.is_checkmate:
+            notation += "#"
+        elif position.is_check:
+            notation += "+"
+        return notation
+
+    def status_text(self):
+        """Game status message shown at the top of the window."""
+        board = self.game.board
+        if self.game.resigned:
+            return "White resigns! Black wins!" if self.game.winner_by_resignation == chess.BLACK else "Black resigns! White wins!"
+        elif self.game.timer.white_time <= 0:
+            return "Black wins on time!"
+        elif self.game.timer.black_time <= 0:
+            return "White wins on time!"
+        elif self.game.position_moves().is_checkmate:
+            return "0-1" if board.turn == chess.WHITE else "1-0"
+        elif self.game.position_moves().is_stalemate:
+            return "Stalemate"
+        elif board.is_variant_draw():
+            return "1/2-1/2"
+        return ""
+
+    def search_info_lines(self):
+        """The computer's search progress, or depth and speed of its last search."""
+        if self.awaiting_computer_move:
+            info = self.thinking_info
+            return ("Thinking...",) + ((f"depth {info.depth}", f"{info.nps // 1000}k nps") if info else ())
+        info = self.game.last_search_info
+        if info is not None:
+            return (f"depth {info.depth}", f"{info.nps // 1000}k nps")
+        return ()
+
+    def _draw_square(self, rect, symbol, under, over):
+        if under:
+            for color in under:
+                pygame.draw.rect(screen, color, rect, 5)
+        if symbol:
+            screen.blit(pieces_images[symbol], rect)
+        if over:
+            for color in over:
+                pygame.draw.rect(screen, color, rect, 5)
+
+    def _draw_left_panel(self, notation, info_lines):
+        if notation:
+            last_move_surface = render_text(notation, TEXT_FONT_SIZE, TEXT_COLOR)
+            screen.blit(last_move_surface, last_move_surface.get_rect(topleft=(WIDTH - 760, HEIGHT // 2 - 10)))
+        for i, line in enumerate(info_lines):
+            text_surface = render_text(line, INFO_FONT_SIZE, TEXT_COLOR)
+            screen.blit(text_surface, (WIDTH - 760, HEIGHT // 2 + 30 + i * 22))
+
+    def _draw_status(self, status_text):
         if status_text:
-            text_surface = self.font.render(status_text, True, TEXT_COLOR)
+            text_surface = render_text(status_text, TEXT_FONT_SIZE, TEXT_COLOR)
             text_rect = text_surface.get_rect(center=(WIDTH//2, 30))
             bg_rect = text_rect.copy()
             bg_rect.inflate_ip(20, 10)
             pygame.draw.rect(screen, (*BACKGROUND, 200), bg_rect, border_radius=5)
             screen.blit(text_surface, text_rect)
 
+    def _draw_timer(self, text, position):
+        screen.blit(render_text(text, TIMER_FONT_SIZE, TEXT_COLOR), position)
+
+    def _update_region(self, key, rect, signature, draw_fn, *args):
+        """Redraw a screen region over the static background if its signature changed."""
+        if self.drawn.get(key, _NOT_DRAWN) == signature:
+            return False
+        self.drawn[key] = signature
+        screen.set_clip(rect)
+        screen.blit(self.static_surface, rect, rect)
+        draw_fn(*args)
+        screen.set_clip(None)
+        self.dirty_rects.append(rect)
+        return True
+
+    def invalidate(self):
+        """Force a full redraw on the next frame (e.g. after the window was exposed)."""
+        self.drawn = {}
+
     def draw(self):
-        """Main draw method that renders all game elements."""
-        screen.fill(BACKGROUND)
-        self.draw_board()
-        self.draw_pieces()
-        self.draw_game_state()
-        self.timer.draw(screen)
-        
+        """Redraw the regions whose content changed and return their rectangles.
+
+        The background, board squares and coordinates are prebuilt on a static
+        surface. Squares, texts, timers and buttons are redrawn only when what
+        they show changes, so the caller passes the result to
+        pygame.display.update() instead of flipping the whole window.
+        """
+        self.dirty_rects = []
+        if self.static_surface is None:
+            self.static_surface = self._build_static_surface()
+        if not self.drawn:
+            screen.blit(self.static_surface, (0, 0))
+            self.dirty_rects.append(screen.get_rect())
+
+        # Repaint whatever a closed or moved promotion menu was covering
+        menu = self.promotion_menu
+        menu_rect = menu.rect if menu else None
+        if self.menu_rect is not None and self.menu_rect != menu_rect:
+            for square in chess.SQUARES:
+                if self.menu_rect.colliderect(self._square_rect(square)):
+                    self.drawn.pop(square, None)
+            self.drawn.pop("promotion", None)
+        self.menu_rect = menu_rect
+
+        board = self.game.board
+        under, over = self._square_highlights()
+        menu_covered_dirty = False
+        for square in chess.SQUARES:
+            piece = board.piece_at(square)
+            symbol = piece.symbol() if piece else None
+            square_under = under.get(square)
+            square_over = over.get(square)
+            signature = (symbol, tuple(square_under or ()), tuple(square_over or ()))
+            rect = self._square_rect(square)
+            if self._update_region(square, rect, signature, self._draw_square, rect, symbol, square_under, square_over):
+                menu_covered_dirty = menu_covered_dirty or (menu_rect is not None and menu_rect.colliderect(rect))
+
+        if menu is not None:
+            if menu_covered_dirty:
+                self.drawn.pop("promotion", None)
+            self._update_region("promotion", menu.rect, (menu.square, tuple(menu.pieces)), menu.draw, screen)
+
+        notation = self.last_move_notation()
+        info_lines = self.search_info_lines()
+        self._update_region("left_panel", LEFT_PANEL_RECT, (notation, info_lines),
+                            self._draw_left_panel, notation, info_lines)
+
+        status_text = self.status_text()
+        self._update_region("status", STATUS_RECT, status_text, self._draw_status, status_text)
+
+        timer = self.game.timer
+        white_time = timer.get_time_str(max(0, timer.white_time))
+        black_time = timer.get_time_str(max(0, timer.black_time))
+        self._update_region("white_timer", WHITE_TIMER_RECT, white_time, self._draw_timer, white_time, WHITE_TIMER_RECT.topleft)
+        self._update_region("black_timer", BLACK_TIMER_RECT, black_time, self._draw_timer, black_time, BLACK_TIMER_RECT.topleft)
+
         # Update button hover states
         mouse_pos = pygame.mouse.get_pos()
         for button in [self.reset_button, self.undo_button, self.redo_button, self.resign_button]:
             button.update_hover(mouse_pos)
-            button.draw(screen)
-        
-        if self.promotion_menu:
-            self.promotion_menu.draw(screen)
+            self._update_region(button.text, button.rect, button.hover, button.draw, screen)
+
+        return self.dirty_rects
+
+    def idle_timeout(self):
+        """Seconds until the screen can next change without user input, or None if it can't.
+
+        The main loop sleeps in pygame.event.wait() for this long instead of
+        redrawing at a fixed frame rate.
+        """
+        timeouts = []
+        if self.awaiting_computer_move:
+            timeouts.append(0.05)  # poll the search worker
+        if self.illegal_move_squares:
+            timeouts.append(self.illegal_move_duration - (time.time() - self.illegal_move_time))
+        timer = self.game.timer
+        if timer.running:
+            remaining = timer.white_time if timer.current_player == chess.WHITE else timer.black_time
+            timeouts.append(remaining % 1)  # next change of the displayed seconds
+        return max(0.0, min(timeouts)) if timeouts else None
     
-    def reset(self):
-        """Reset the game to initial state."""
-        self.board = chess.Board()
+    def clear_selection(self):
+        """Clear the selected piece and its highlighted moves."""
         self.selected_square = None
-        self.game_over = False
+        self.highlighted_moves = []
+
+    def reset(self):
+        """Reset the game and the UI state."""
+        self.game.reset()
+        self.clear_selection()
         self.promotion_menu = None
         self.pending_promotion_move = None
         self.illegal_move_squares = None
         self.illegal_move_time = 0
-        self.board_history = [chess.Board().fen()]
-        self.current_position = 0
-        self.last_move = None
-        self.last_move_was_capture = False
-        self.timer.reset()
-        self.game_started = False
-        self.resigned = False
-        self.winner_by_resignation = None
-        self.highlighted_moves = []
-    
-    def resign_game(self):
-        """Current player resigns the game."""
-        if not self.game_over and self.game_started:
-            self.resigned = True
-            self.game_over = True
-            self.winner_by_resignation = chess.BLACK if self.board.turn == chess.WHITE else chess.WHITE
-            self.timer.stop()
 
     def undo_move(self):
-        """Undo the last move."""
-        if self.current_position > 0 and not self.promotion_menu:
-            self.current_position -= 1
-            self.board = chess.Board(self.board_history[self.current_position])
-            self.game_over = False
-            self.selected_square = None
-            self.highlighted_moves = []
-    
+        """Undo the last move, or the last move pair when playing the computer."""
+        if not self.promotion_menu and self.game.undo_move():
+            if self.game.is_opponent_turn():
+                self.game.undo_move()
+            self.clear_selection()
+
     def redo_move(self):
-        """Redo a previously undone move."""
-        if self.current_position + 1 < len(self.board_history) and not self.promotion_menu:
-            self.current_position += 1
-            self.board = chess.Board(self.board_history[self.current_position])
-            self.game_over = self.board.is_game_over()
-            self.selected_square = None
-            self.highlighted_moves = []
-    
-    def make_move(self, move):
-        """Execute a move if it's legal and update game state."""
-        if move in self.board.legal_moves:
-            if not self.game_started:
-                self.timer.start()
-                self.game_started = True
-            
-            # Store capture status before making the move
-            self.last_move_was_capture = self.board.is_capture(move)
-            self.board.push(move)
-            self.timer.switch_player()
-            self.current_position += 1
-            self.board_history = self.board_history[:self.current_position]
-            self.board_history.append(self.board.fen())
-            self.last_move = move
-            
-            if self.board.is_game_over() or self.timer.is_time_up():
-                self.game_over = True
-                self.timer.stop()
-            return True
-        return False
-
-    def is_promotion_move(self, from_square, to_square):
-        """Check if a move from from_square to to_square is a pawn promotion."""
-        legal_moves = [move for move in self.board.legal_moves
-                       if move.from_square == from_square and move.to_square == to_square]
-        return any(move.promotion for move in legal_moves)
+        """Redo a previously undone move, or move pair when playing the computer."""
+        if not self.promotion_menu and self.game.redo_move():
+            if self.game.is_opponent_turn():
+                self.game.redo_move()
+            self.clear_selection()
     
     def get_square_from_pos(self, pos):
         """Convert screen coordinates to chess square index."""
@@ -515,25 +523,69 @@ class ChessEngine:
         
         return row * 8 + col
     
+    def cancel_computer(self):
+        """Stop any background search or pondering."""
+        if self.worker is not None:
+            self.worker.cancel()
+        self.awaiting_computer_move = False
+        self.thinking_info = None
+
+    def update_computer(self):
+        """Collect finished background searches and start new ones when the computer is to move."""
+        if self.worker is None:
+            return
+        game = self.game
+        for message in self.worker.poll():
+            if message[0] == "info":
+                self.thinking_info = message[1]
+                continue
+            _, move, info = message
+            self.awaiting_computer_move = False
+            self.thinking_info = None
+            game.last_search_info = info
+            if move is None:
+                continue
+            # The worker only delivers results for the current position, so the move is legal
+            game.make_trusted_move(move)
+            if self.ponder and not game.game_over and len(info.pv) > 1:
+                self.worker.ponder(game.board, info.pv[1])
+
+        if game.is_opponent_turn() and not self.promotion_menu and not self.awaiting_computer_move:
+            move = game.book_move()
+            if move is not None:
+                # Still in the book: play it now instead of searching
+                self.worker.cancel()
+                game.last_search_info = None
+                game.make_trusted_move(move)
+                return
+            budget = game.opponent.time_for_move(game.timer, game.board.turn)
+            if not (self.worker.pondering and game.last_move == self.worker.ponder_move and self.worker.ponderhit(budget)):
+                self.worker.start(game.board, budget)
+            self.awaiting_computer_move = True
+
     def handle_click(self, pos):
         """Handle mouse click events on the board and UI."""
         if self.reset_button.is_clicked(pos):
+            self.cancel_computer()
             self.reset()
             return
         
         if self.undo_button.is_clicked(pos):
+            self.cancel_computer()
             self.undo_move()
             return
         
         if self.redo_button.is_clicked(pos):
+            self.cancel_computer()
             self.redo_move()
             return
         
         if self.resign_button.is_clicked(pos):
-            self.resign_game()
+            self.cancel_computer()
+            self.game.resign_game()
             return
 
-        if self.game_over:
+        if self.game.game_over or self.game.is_opponent_turn():
             return
         
         # Check if click is within board bounds
@@ -549,7 +601,7 @@ class ChessEngine:
                     self.pending_promotion_move.to_square,
                     promotion=chess.Piece.from_symbol(promotion_piece).piece_type
                 )
-                if self.make_move(promotion_move):
+                if self.game.make_move(promotion_move):
                     self.promotion_menu = None
                     self.pending_promotion_move = None
             return
@@ -559,17 +611,17 @@ class ChessEngine:
             return
         
         if self.selected_square is None:
-            piece = self.board.piece_at(square)
-            if piece and piece.color == self.board.turn:
+            piece = self.game.board.piece_at(square)
+            if piece and piece.color == self.game.board.turn:
                 self.selected_square = square
-                self.highlighted_moves = [move for move in self.board.legal_moves if move.from_square == square]
+                self.highlighted_moves = self.game.moves_from(square)
         else:
-            if self.is_promotion_move(self.selected_square, square):
+            if self.game.is_promotion_move(self.selected_square, square):
                 self.pending_promotion_move = chess.Move(self.selected_square, square)
-                self.promotion_menu = PromotionMenu(square, self.board.turn == chess.WHITE)
+                self.promotion_menu = PromotionMenu(square, self.game.board.turn == chess.WHITE)
             else:
                 move = chess.Move(self.selected_square, square)
-                if not self.make_move(move) and self.selected_square != square:
+                if not self.game.make_move(move) and self.selected_square != square:
                     self.illegal_move_squares = (self.selected_square, square)
                     self.illegal_move_time = time.time()
             self.selected_square = None
@@ -577,21 +629,73 @@ class ChessEngine:
 
 def main():
     """Main game loop."""
-    game = ChessEngine()
+    parser = argparse.ArgumentParser(description="Play chess against a friend or the computer.")
+    parser.add_argument("--computer", choices=["white", "black"],
+                        help="let the built-in search engine play this color")
+    parser.add_argument("--max-think-time", type=float, default=5.0,
+                        help="upper bound in seconds on the computer's time per move")
+    parser.add_argument("--no-ponder", action="store_true",
+                        help="don't let the computer think on your time")
+    parser.add_argument("--book", help="Polyglot .bin opening book for the computer")
+    parser.add_argument("--book-depth", type=int, default=20,
+                        help="number of plies from the start in which the book is used")
+    parser.add_argument("--syzygy", help="directory of Syzygy tablebase files for perfect endgame play")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="play a game hosted by server.py instead")
+    parser.add_argument("--session", help="with --connect, join this session instead of starting one")
+    parser.add_argument("--color", choices=["white", "black", "both"], default="both",
+                        help="with --connect, the seat to take (both for hot-seat play)")
+    args = parser.parse_args()
+
+    init_display()
+    worker = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        game = RemoteGame(host or "127.0.0.1", int(port), args.session, args.color,
+                          notify=lambda: pygame.event.post(pygame.event.Event(NETWORK_EVENT)))
+    else:
+        game = ChessEngine(book=OpeningBook(args.book, max_depth=args.book_depth) if args.book else None, clocked=True)
+    if args.computer and not args.connect:
+        color = chess.WHITE if args.computer == "white" else chess.BLACK
+        tablebase = EndgameTablebase(args.syzygy) if args.syzygy else None
+        search_engine = SearchEngine(max_time=args.max_think_time, evaluator=incremental_evaluator(), tablebase=tablebase)
+        game.set_opponent(search_engine, color)
+        worker = SearchWorker(search_engine)
+    renderer = ChessRenderer(game, worker, ponder=not args.no_ponder)
+    caption = None
     running = True
 
     while running:
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        if not events:
+            # Nothing to do: sleep until input arrives or something on screen is due to change
+            timeout = renderer.idle_timeout()
+            event = pygame.event.wait() if timeout is None else pygame.event.wait(int(timeout * 1000) + 1)
+            events = [event] if event.type != pygame.NOEVENT else []
+
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                game.handle_click(event.pos)
-
-        game.timer.update()
-        game.draw()
-        pygame.display.flip()
+                renderer.handle_click(event.pos)
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                renderer.invalidate()
+
+        if args.connect:
+            if game.poll():
+                renderer.clear_selection()
+            if game.session is not None and caption is None:
+                caption = f"ChessGame - session {game.session} ({game.color or 'watching'})"
+                pygame.display.set_caption(caption)
+        renderer.update_computer()
+        renderer.game.timer.update()
+        dirty_rects = renderer.draw()
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
         clock.tick(FPS)
     
+    renderer.cancel_computer()
+    if args.connect:
+        game.close()
     pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+import chess
+
+BB_SQUARES = chess.BB_SQUARES
+
+# Piece values in pawns, indexed by piece type
+REWARD_PIECE_VALUES = [0, 1, 3, 3, 5, 9, 0]
+REWARD_CENTER_WEIGHT = 0.5
+# Reward of a tablebase win; each ply of DTZ takes off 1%, down to half
+TABLEBASE_WIN_REWARD = 100
+
+class EvaluationMismatch(Exception):
+    """Raised in verify mode when the incremental score differs from a full recount."""
+
+class MaterialFeature:
+    """Material balance: sum of piece values, white minus black."""
+    def __init__(self, values):
+        self.values = values
+
+    def full(self, board):
+        """Recount the term for board from scratch."""
+        white = board.occupied_co[chess.WHITE]
+        black = board.occupied_co[chess.BLACK]
+        score = 0
+        for piece_type, bb in ((chess.PAWN, board.pawns), (chess.KNIGHT, board.knights),
+                               (chess.BISHOP, board.bishops), (chess.ROOK, board.rooks),
+                               (chess.QUEEN, board.queens)):
+            score += self.values[piece_type] * ((bb & white).bit_count() - (bb & black).bit_count())
+        return score
+
+    def delta(self, board, move):
+        """Change of the term when move is played on board (before the push)."""
+        values = self.values
+        if board.occupied_co[not board.turn] & BB_SQUARES[move.to_square]:
+            gain = values[board.piece_type_at(move.to_square)]
+        elif move.to_square == board.ep_square and board.pawns & BB_SQUARES[move.from_square]:
+            # Only a capturing pawn can reach the en passant square
+            gain = values[chess.PAWN]
+        elif not move.promotion:
+            # Quiet moves, most of them, leave the material alone
+            return 0
+        else:
+            gain = 0
+        if move.promotion:
+            gain += values[move.promotion] - values[chess.PAWN]
+        return gain if board.turn == chess.WHITE else -gain
+
+class CenterFeature:
+    """Occupation of a set of squares (the four center squares by default), white minus black."""
+    def __init__(self, weight, squares=chess.BB_CENTER):
+        self.weight = weight
+        self.squares = squares
+
+    def full(self, board):
+        """Recount the term for board from scratch."""
+        squares = self.squares
+        return self.weight * ((board.occupied_co[chess.WHITE] & squares).bit_count() -
+                              (board.occupied_co[chess.BLACK] & squares).bit_count())
+
+    def delta(self, board, move):
+        """Change of the term when move is played on board (before the push)."""
+        squares = self.squares
+        from_bb = BB_SQUARES[move.from_square]
+        to_bb = BB_SQUARES[move.to_square]
+        if board.kings & from_bb and board.is_castling(move):
+            # The king lands on the g- or c-file and the rook next to it
+            rank = chess.square_rank(move.from_square)
+            kingside = chess.square_file(move.to_square) > chess.square_file(move.from_square)
+            king_to = chess.square(6 if kingside else 2, rank)
+            rook_from = board.rooks & board.occupied_co[board.turn] & chess.BB_RANKS[rank] & (
+                BB_SQUARES[move.to_square] if board.chess960 else
+                BB_SQUARES[chess.square(7 if kingside else 0, rank)])
+            rook_to = BB_SQUARES[chess.square(5 if kingside else 3, rank)]
+            gain = (bool(BB_SQUARES[king_to] & squares) + bool(rook_to & squares) -
+                    bool(from_bb & squares) - bool(rook_from & squares))
+        else:
+            gain = bool(to_bb & squares) - bool(from_bb & squares)
+            if to_bb & squares and board.occupied_co[not board.turn] & to_bb:
+                gain += 1
+            elif move.to_square == board.ep_square and board.pawns & from_bb:
+                captured_bb = BB_SQUARES[move.to_square + (-8 if board.turn == chess.WHITE else 8)]
+                gain += bool(captured_bb & squares)
+        if not gain:
+            return 0
+        gain *= self.weight
+        return gain if board.turn == chess.WHITE else -gain
+
+def reward_features():
+    """Features of get_reward: material in pawns and half a pawn per occupied center square."""
+    return [MaterialFeature(REWARD_PIECE_VALUES), CenterFeature(REWARD_CENTER_WEIGHT)]
+
+class IncrementalEvaluator:
+    """Keeps the sum of evaluation features up to date move by move.
+
+    Each feature provides full(board), a recount from scratch, and
+    delta(board, move), the change a move makes, computed from the move's
+    from/to squares, capture and promotion before it is pushed. push() and
+    pop() play and take back moves on the board while keeping a stack of
+    scores, so taking a move back costs nothing. Scores are from white's
+    point of view; evaluate() gives the side to move's view, as a search
+    engine's static evaluation expects.
+
+    With verify set, every push and pop compares the score against a full
+    recount and raises EvaluationMismatch if they differ.
+    """
+    def __init__(self, features=None, verify=False):
+        self.features = features if features is not None else reward_features()
+        self.verify = verify
+        self.scores = [0]
+
+    def full(self, board):
+        """Sum of all features recounted from scratch."""
+        return sum(feature.full(board) for feature in self.features)
+
+    def reset(self, board):
+        """Start tracking board's current position."""
+        self.scores = [self.full(board)]
+
+    @property
+    def score(self):
+        """Current score from white's point of view."""
+        return self.scores[-1]
+
+    def evaluate(self, board):
+        """Current score from the side to move's point of view."""
+        score = self.scores[-1]
+        return score if board.turn == chess.WHITE else -score
+
+    def push(self, board, move):
+        """Play move on board and update the score."""
+        score = self.scores[-1]
+        for feature in self.features:
+            score += feature.delta(board, move)
+        board.push(move)
+        self.scores.append(score)
+        if self.verify:
+            self.check(board)
+
+    def pop(self, board):
+        """Take back board's last move and restore the score before it."""
+        board.pop()
+        self.scores.pop()
+        if self.verify:
+            self.check(board)
+
+    def trim(self):
+        """Forget the scores before the current position, e.g. when the board's move stack is cleared."""
+        del self.scores[:-1]
+
+    def check(self, board):
+        """Raise EvaluationMismatch unless the score equals a full recount of board."""
+        expected = self.full(board)
+        if self.scores[-1] != expected:
+            raise EvaluationMismatch(f"incremental score {self.scores[-1]} != recount {expected} after "
+                                     f"{board.peek() if board.move_stack else 'no moves'} in {board.fen()}")
+
+_REWARD_FEATURES = reward_features()
+
+def tablebase_reward(board, wdl, dtz=None):
+    """Reward from white's point of view of a position whose tablebase result is known.
+
+    wdl and dtz are from the side to move's point of view. Wins and losses
+    score like a checkmate, less for a longer DTZ so that quicker
+    conversions are preferred; wins and losses that the 50-move rule
+    turns into draws score 0 like draws.
+    """
+    if abs(wdl) < 2:
+        return 0
+    reward = TABLEBASE_WIN_REWARD * (1 - min(abs(dtz or 0), 50) / 100)
+    return reward if (wdl > 0) == (board.turn == chess.WHITE) else -reward
+
+def get_reward(board, evaluator=None, position=None, tablebase=None):
+    """Calculate reward based on game state.
+
+    Pass the IncrementalEvaluator that tracks board to skip the recount, and
+    the position's movecache.PositionMoves to skip the mate and stalemate
+    tests, which have to look for a legal move. With a
+    tablebase.EndgameTablebase, positions it covers are scored by their
+    tablebase result instead of material.
+    """
+    if position is not None:
+        if position.is_checkmate:
+            return 100 if board.turn == chess.BLACK else -100
+        elif position.is_stalemate:
+            return 0
+    elif board.is_checkmate():
+        return 100 if board.turn == chess.BLACK else -100
+    elif board.is_stalemate():
+        return 0
+    if tablebase is not None:
+        result = tablebase.probe(board)
+        if result is not None:
+            return tablebase_reward(board, *result)
+    if evaluator is not None:
+        return evaluator.score
+    return sum(feature.full(board) for feature in _REWARD_FEATURES)
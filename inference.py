@@ -0,0 +1,94 @@
+import asyncio
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from encoding import ACTION_SIZE, legal_masks, masked_argmax
+
+class BatchedInference:
+    """Batches DQNAgent.act requests from many concurrent games into one forward pass.
+
+    Games call act() from their own threads (or act_async() from asyncio
+    tasks). A background thread collects pending requests and runs them
+    through the model together once max_batch_size requests are waiting or
+    the oldest one has waited max_wait seconds, then applies each game's
+    legal-move masking to its row of Q-values.
+    """
+    def __init__(self, agent, max_batch_size=64, max_wait=0.002):
+        self.agent = agent
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.states = np.zeros((max_batch_size, agent.state_size), dtype=np.float32)
+        self.masks = np.zeros((max_batch_size, ACTION_SIZE), dtype=np.bool_)
+        self.batches = 0
+        self.batched_requests = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="BatchedInference", daemon=True)
+        self.thread.start()
+
+    def submit(self, state, legal_moves):
+        """Queue an act request and return a Future resolving to the chosen move."""
+        future = Future()
+        legal_moves = list(legal_moves)
+        if not legal_moves:
+            future.set_result(None)
+        elif np.random.rand() <= self.agent.epsilon:
+            future.set_result(random.choice(legal_moves))
+        else:
+            self.requests.put((state, legal_moves, future))
+        return future
+
+    def act(self, state, legal_moves):
+        """Blocking equivalent of DQNAgent.act served from a shared batch."""
+        return self.submit(state, legal_moves).result()
+
+    async def act_async(self, state, legal_moves):
+        """Awaitable equivalent of DQNAgent.act for asyncio games."""
+        return await asyncio.wrap_future(self.submit(state, legal_moves))
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the deadline passes."""
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=timeout) if timeout > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return [request for request in batch if request is not None]
+
+    def _run(self):
+        """Serve batches until close() is called."""
+        while self.running:
+            batch = self._collect()
+            if not batch:
+                continue
+            n = len(batch)
+            for i, (state, _, _) in enumerate(batch):
+                self.states[i] = state
+            try:
+                q_values = self.agent.q_values(self.states[:n])
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_requests += n
+            masks = legal_masks([legal_moves for _, legal_moves, _ in batch], out=self.masks[:n])
+            for index, (_, _, future) in zip(masked_argmax(q_values, masks), batch):
+                future.set_result(self.agent.index_to_move(int(index)))
+
+    def mean_batch_size(self):
+        """Average number of requests served per forward pass."""
+        return self.batched_requests / self.batches if self.batches else 0.0
+
+    def close(self):
+        """Stop the batching thread."""
+        self.running = False
+        self.requests.put(None)
+        self.thread.join()
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+def position_key(board):
+    """Key identifying a position for move generation.
+
+    Built from the same fields the Zobrist hash covers (piece placement,
+    side to move, castling rights, en passant square), but as a tuple of
+    the board's bitboards: chess.polyglot.zobrist_hash is pure Python and
+    costs about half as much as generating the moves it would save.
+    """
+    return (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+            board.occupied_co[0], board.occupied_co[1], board.turn, board.castling_rights, board.ep_square)
+
+class PositionMoves:
+    """Legal moves of one position and the end states that follow from them."""
+    def __init__(self, board):
+        self.moves = list(board.legal_moves)
+        self.is_check = board.is_check()
+        self.is_checkmate = self.is_check and not self.moves
+        self.is_stalemate = not self.is_check and not self.moves
+        self.by_from_square = None
+
+    def moves_from(self, square):
+        """Legal moves starting on square."""
+        if self.by_from_square is None:
+            self.by_from_square = {}
+            for move in self.moves:
+                self.by_from_square.setdefault(move.from_square, []).append(move)
+        return self.by_from_square.get(square, [])
+
+    def is_promotion(self, from_square, to_square):
+        """Check if a legal move from from_square to to_square promotes a pawn."""
+        return any(move.promotion and move.to_square == to_square for move in self.moves_from(from_square))
+
+class LegalMoveCache:
+    """Per-position legal move lists shared by everything that asks about one game.
+
+    position(board) returns the PositionMoves of the board's current
+    position. The result is memoized until invalidate() is called, which
+    the owner does after every push or pop; after that the next call keys
+    the new position and looks it up in an LRU table of up to maxsize
+    positions, so positions revisited by undo/redo or repeated across games
+    (openings) are not generated again.
+
+    requests counts position() calls and generations the calls that had to
+    run the move generator; avoided is the difference.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.current = None
+        self.requests = 0
+        self.generations = 0
+
+    @property
+    def avoided(self):
+        """Number of legal move generations saved by the cache."""
+        return self.requests - self.generations
+
+    def invalidate(self):
+        """Forget the current position; call after pushing or popping a move."""
+        self.current = None
+
+    def lookup(self, board):
+        """PositionMoves of board if already generated, otherwise None (never generates)."""
+        if self.current is None:
+            entry = self.entries.get(position_key(board))
+            if entry is None:
+                return None
+            self.current = entry
+        return self.current
+
+    def position(self, board):
+        """Return the PositionMoves of board's current position."""
+        self.requests += 1
+        if self.current is not None:
+            return self.current
+        key = position_key(board)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        else:
+            self.generations += 1
+            entry = PositionMoves(board)
+            if self.maxsize > 0:
+                self.entries[key] = entry
+                if len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        self.current = entry
+        return entry
+
+    def is_legal(self, board, move):
+        """Same as move in board.legal_moves, using the cached list when there is one."""
+        entry = self.lookup(board)
+        return move in entry.moves if entry is not None else board.is_legal(move)
+
+    def is_game_over(self, board):
+        """Same result as board.is_game_over(), reusing the cached move list when there is one."""
+        entry = self.lookup(board)
+        if entry is None:
+            # Stops at the first legal move, so cheaper than generating the full list here
+            return board.is_game_over()
+        return (not entry.moves or board.is_insufficient_material() or
+                board.halfmove_clock >= 150 or board.is_fivefold_repetition())
+
+    def reset_counters(self):
+        """Start counting requests and generations from zero, e.g. at the start of a game."""
+        self.requests = 0
+        self.generations = 0
+
+    def clear(self):
+        """Remove all cached positions."""
+        self.entries.clear()
+        self.current = None
@@ -0,0 +1,114 @@
+import argparse
+import multiprocessing as mp
+import time
+
+import chess
+
+from core import ChessEngine
+
+# Standard perft test positions with their node counts by depth (from depth 1)
+POSITIONS = {
+    "start": (chess.STARTING_FEN, [20, 400, 8902, 197281, 4865609]),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                 [48, 2039, 97862, 4085603]),
+    "endgame": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    "promotions": ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    "discovered": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    "middlegame": ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                   [46, 2079, 89890, 3894594]),
+}
+PATHS = ("raw", "engine", "trusted")
+
+def perft(board, depth):
+    """Number of leaf positions depth plies below board, with raw python-chess push and pop."""
+    if depth == 1:
+        return len(list(board.legal_moves))
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in list(board.legal_moves):
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+def perft_engine(engine, depth, trusted=False):
+    """Same count through the ChessEngine move path: make_move (or make_trusted_move) and undo_move."""
+    if depth == 0:
+        return 1
+    moves = engine.legal_moves()
+    if depth == 1:
+        return len(moves)
+    make = engine.make_trusted_move if trusted else engine.make_move
+    nodes = 0
+    for move in moves:
+        make(move)
+        nodes += perft_engine(engine, depth - 1, trusted)
+        engine.undo_move()
+    return nodes
+
+def count(fen, depth, path="raw"):
+    """Perft of fen to depth along the given path ("raw", "engine" or "trusted")."""
+    if path == "raw":
+        return perft(chess.Board(fen), depth)
+    engine = ChessEngine()
+    engine.reset(fen)
+    return perft_engine(engine, depth, trusted=path == "trusted")
+
+def divide(fen, depth, path="raw"):
+    """{root move: perft of the position after it to depth - 1}; depth must be at least 1."""
+    if depth < 1:
+        raise ValueError(f"divide needs a depth of at least 1, not {depth}")
+    board = chess.Board(fen)
+    results = {}
+    for move in board.legal_moves:
+        board.push(move)
+        results[move] = count(board.fen(), depth - 1, path)
+        board.pop()
+    return results
+
+def _count_after(args):
+    fen, uci, depth, path = args
+    board = chess.Board(fen)
+    board.push_uci(uci)
+    return uci, count(board.fen(), depth - 1, path)
+
+def divide_parallel(fen, depth, path="raw", num_workers=None):
+    """divide() with the root moves split across num_workers processes."""
+    if depth < 1:
+        raise ValueError(f"divide needs a depth of at least 1, not {depth}")
+    board = chess.Board(fen)
+    tasks = [(fen, move.uci(), depth, path) for move in board.legal_moves]
+    with mp.get_context("spawn").Pool(num_workers) as pool:
+        return {chess.Move.from_uci(uci): nodes for uci, nodes in pool.imap_unordered(_count_after, tasks)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Count move generation leaf nodes of test positions.")
+    parser.add_argument('--position', choices=sorted(POSITIONS), default="start")
+    parser.add_argument('--fen', help="count this position instead of a standard one")
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--path', choices=PATHS, default="raw",
+                        help="raw python-chess, ChessEngine.make_move or ChessEngine.make_trusted_move")
+    parser.add_argument('--workers', type=int, default=1, help="processes splitting the root moves")
+    parser.add_argument('--divide', action='store_true', help="print the count after each root move")
+    args = parser.parse_args()
+    if args.depth < 1:
+        parser.error("--depth must be at least 1")
+
+    fen, expected = (args.fen, []) if args.fen else POSITIONS[args.position]
+    start = time.perf_counter()
+    if args.workers > 1:
+        results = divide_parallel(fen, args.depth, args.path, args.workers)
+    else:
+        results = divide(fen, args.depth, args.path)
+    elapsed = time.perf_counter() - start
+    if args.divide:
+        for move in sorted(results, key=chess.Move.uci):
+            print(f"{move.uci()}: {results[move]}")
+    nodes = sum(results.values())
+    print(f"depth {args.depth}: {nodes} nodes in {elapsed:.2f} s ({nodes / elapsed:,.0f} nodes/s)")
+    if args.depth <= len(expected) and nodes != expected[args.depth - 1]:
+        raise SystemExit(f"expected {expected[args.depth - 1]} nodes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import json
+import os
+import numpy as np
+
+class ReplayBuffer:
+    """Fixed-capacity ring buffer of transitions stored in preallocated NumPy arrays.
+
+    States are stored as uint8 planes (the board encoding is 0/1), actions as
+    move indices. Passing a directory as ``path`` backs every array with a
+    memory-mapped .npy file so that a long run can be flushed to disk and
+    resumed later by opening the same directory again.
+
+    With ``mask_size`` set, the legal actions of every next state are kept
+    as a bit-packed mask (mask_size / 8 bytes per transition) and sampled
+    batches gain a sixth element, the unpacked (batch, mask_size) boolean
+    masks. A row without any legal action means the mask is unknown.
+    """
+    META_FILE = "meta.json"
+
+    def __init__(self, capacity, state_size, path=None, state_dtype=np.uint8, mask_size=None):
+        self.capacity = capacity
+        self.state_size = state_size
+        self.mask_size = mask_size
+        self.path = path
+        self.position = 0
+        self.size = 0
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            meta_path = os.path.join(path, self.META_FILE)
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                if meta["capacity"] != capacity or meta["state_size"] != state_size:
+                    raise ValueError(f"Replay buffer at {path} has capacity {meta['capacity']} and state size "
+                                     f"{meta['state_size']}, expected {capacity} and {state_size}")
+                if meta.get("mask_size", mask_size) != mask_size:
+                    raise ValueError(f"Replay buffer at {path} has mask size {meta['mask_size']}, expected {mask_size}")
+                self.position = meta["position"]
+                self.size = meta["size"]
+
+        self.states = self._allocate("states", (capacity, state_size), state_dtype)
+        self.next_states = self._allocate("next_states", (capacity, state_size), state_dtype)
+        self.actions = self._allocate("actions", (capacity,), np.int32)
+        self.rewards = self._allocate("rewards", (capacity,), np.float32)
+        self.dones = self._allocate("dones", (capacity,), np.bool_)
+        self.next_masks = None
+        if mask_size is not None:
+            self.next_masks = self._allocate("next_masks", (capacity, (mask_size + 7) // 8), np.uint8)
+
+    def _allocate(self, name, shape, dtype):
+        """Create an in-memory array, or open/create a memory-mapped one under self.path."""
+        if self.path is None:
+            return np.zeros(shape, dtype=dtype)
+        filename = os.path.join(self.path, f"{name}.npy")
+        if os.path.exists(filename):
+            array = np.load(filename, mmap_mode="r+")
+            if array.shape != shape or array.dtype != dtype:
+                raise ValueError(f"{filename} has shape {array.shape} and dtype {array.dtype}, expected {shape} and {np.dtype(dtype)}")
+            return array
+        return np.lib.format.open_memmap(filename, mode="w+", dtype=dtype, shape=shape)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action_index, reward, next_state, done, next_mask=None):
+        """Store one transition, overwriting the oldest one when full.
+
+        next_mask is the boolean legal-action mask of next_state (or None if unknown).
+        """
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action_index
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        if self.next_masks is not None:
+            self.next_masks[i] = np.packbits(next_mask) if next_mask is not None else 0
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def add_batch(self, states, actions, rewards, next_states, dones, next_masks=None):
+        """Store a batch of transitions given as arrays, wrapping around the ring as needed.
+
+        next_masks, if given, holds the next states' legal-action masks already
+        bit-packed with np.packbits along the last axis.
+        """
+        n = len(actions)
+        if n > self.capacity:
+            states, actions, rewards, next_states, dones = (
+                array[-self.capacity:] for array in (states, actions, rewards, next_states, dones))
+            if next_masks is not None:
+                next_masks = next_masks[-self.capacity:]
+            n = self.capacity
+        indices = (self.position + np.arange(n)) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+        if self.next_masks is not None:
+            self.next_masks[indices] = next_masks if next_masks is not None else 0
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size, rng=np.random):
+        """Sample a batch uniformly (with replacement) as (states, actions, rewards, next_states, dones)."""
+        indices = rng.randint(0, self.size, size=batch_size)
+        return self.get_batch(indices)
+
+    def get_batch(self, indices):
+        """Gather the transitions at the given indices with fancy indexing."""
+        batch = (
+            self.states[indices].astype(np.float32),
+            self.actions[indices],
+            self.rewards[indices],
+            self.next_states[indices].astype(np.float32),
+            self.dones[indices]
+        )
+        if self.next_masks is None:
+            return batch
+        next_masks = np.unpackbits(self.next_masks[indices], axis=1, count=self.mask_size).astype(np.bool_)
+        return batch + (next_masks,)
+
+    def arrays(self):
+        """Name to array of every stored field."""
+        arrays = {
+            "states": self.states,
+            "next_states": self.next_states,
+            "actions": self.actions,
+            "rewards": self.rewards,
+            "dones": self.dones
+        }
+        if self.next_masks is not None:
+            arrays["next_masks"] = self.next_masks
+        return arrays
+
+    def save(self, filename):
+        """Write the stored transitions and the ring position to one .npz file."""
+        arrays = {name: array[:self.size] for name, array in self.arrays().items()}
+        np.savez(filename, position=self.position, **arrays)
+
+    def load(self, filename):
+        """Restore transitions written by save(); the file must not hold more than capacity."""
+        with np.load(filename) as data:
+            size = len(data["actions"])
+            if size > self.capacity:
+                raise ValueError(f"{filename} holds {size} transitions, more than the capacity {self.capacity}")
+            for name, array in self.arrays().items():
+                if name in data:
+                    array[:size] = data[name]
+            self.position = int(data["position"])
+            self.size = size
+
+    def flush(self):
+        """Write memory-mapped arrays and the ring position to disk."""
+        if self.path is None:
+            return
+        for array in self.arrays().values():
+            array.flush()
+        with open(os.path.join(self.path, self.META_FILE), "w") as f:
+            json.dump({
+                "capacity": self.capacity,
+                "state_size": self.state_size,
+                "mask_size": self.mask_size,
+                "position": self.position,
+                "size": self.size
+            }, f)
+
+class SumTree:
+    """Binary tree of non-negative priorities in one flat array, each node holding the sum of its children.
+
+    Leaves sit at tree[leaf_count:] (capacity rounded up to a power of
+    two) and the root at tree[1], so the total is read in O(1), and
+    update() and find() walk one root-to-leaf path per element: O(log n)
+    per element, vectorized with NumPy across a batch.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.depth = max(1, (capacity - 1).bit_length())
+        self.leaf_count = 1 << self.depth
+        self.tree = np.zeros(2 * self.leaf_count, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def priorities(self, indices):
+        return self.tree[self.leaf_count + np.asarray(indices)]
+
+    def update(self, indices, priorities):
+        """Set the priorities of the leaves at indices and refresh the sums above them."""
+        nodes = self.leaf_count + np.asarray(indices, dtype=np.int64)
+        tree = self.tree
+        tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes //= 2
+            # Recomputed from both children, so repeated indices are harmless
+            tree[nodes] = tree[2 * nodes] + tree[2 * nodes + 1]
+
+    def rebuild(self, priorities):
+        """Replace all leaves with priorities (shorter arrays leave the rest at zero) and recompute every sum."""
+        tree = self.tree
+        tree[:] = 0
+        tree[self.leaf_count:self.leaf_count + len(priorities)] = priorities
+        start = self.leaf_count
+        while start > 1:
+            start //= 2
+            tree[start:2 * start] = tree[2 * start:4 * start:2] + tree[2 * start + 1:4 * start:2]
+
+    def find(self, values):
+        """Leaf index of each value in [0, total): the leaf whose prefix-sum interval contains it."""
+        tree = self.tree
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sums = tree[left]
+            right = values >= left_sums
+            values -= left_sums * right
+            nodes = left + right
+        return nodes - self.leaf_count
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """ReplayBuffer that samples transitions in proportion to their TD error (Schaul et al., 2016).
+
+    Transition i is drawn with probability p_i^alpha / sum_k p_k^alpha,
+    where p_i is its last absolute TD error plus epsilon; new transitions
+    get the largest priority seen so far so that each is replayed at least
+    once. Priorities live in a SumTree, so sampling and updating cost
+    O(log n) per transition even at millions of transitions.
+
+    sample() draws one transition from each of batch_size equal slices of
+    the total priority and returns the usual batch followed by the
+    importance-sampling weights (N * P(i))^-beta, normalized by their
+    maximum, and the sampled indices to pass back to update_priorities()
+    with the batch's TD errors. beta grows by beta_increment per sample()
+    up to 1, removing the sampling bias by the end of training.
+
+    The alpha-scaled priorities are stored with the transitions (and saved,
+    loaded and memory-mapped like them); the tree is rebuilt from them on
+    opening.
+    """
+    def __init__(self, capacity, state_size, path=None, state_dtype=np.uint8, mask_size=None,
+                 alpha=0.6, beta=0.4, beta_increment=0.001, epsilon=1e-3):
+        super().__init__(capacity, state_size, path=path, state_dtype=state_dtype, mask_size=mask_size)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.priorities = self._allocate("priorities", (capacity,), np.float32)
+        self.tree = SumTree(capacity)
+        self._rebuild()
+
+    def _rebuild(self):
+        """Rebuild the tree from the stored priorities; transitions without one get the maximum."""
+        stored = self.priorities[:self.size]
+        self.max_priority = float(stored.max()) if self.size and stored.max() > 0 else 1.0
+        stored[stored <= 0] = self.max_priority
+        self.tree.rebuild(stored)
+
+    def add(self, state, action_index, reward, next_state, done, next_mask=None):
+        i = self.position
+        super().add(state, action_index, reward, next_state, done, next_mask)
+        self.priorities[i] = self.max_priority
+        self.tree.update([i], self.max_priority)
+
+    def add_batch(self, states, actions, rewards, next_states, dones, next_masks=None):
+        n = min(len(actions), self.capacity)
+        indices = (self.position + np.arange(n)) % self.capacity
+        super().add_batch(states, actions, rewards, next_states, dones, next_masks)
+        self.priorities[indices] = self.max_priority
+        self.tree.update(indices, self.max_priority)
+
+    def sample(self, batch_size, rng=np.random):
+        """Sample a prioritized batch as (states, actions, rewards, next_states, dones[, next_masks], weights, indices)."""
+        total = self.tree.total
+        values = (np.arange(batch_size) + rng.random_sample(batch_size)) * (total / batch_size)
+        # Rounding in the sums can walk past the last stored transition
+        indices = np.minimum(self.tree.find(values), self.size - 1)
+        probabilities = self.tree.priorities(indices) / total
+        weights = (self.size * probabilities) ** -self.beta
+        weights = (weights / weights.max()).astype(np.float32)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return self.get_batch(indices) + (weights, indices)
+
+    def update_priorities(self, indices, td_errors):
+        """Set the priorities of sampled transitions from their new TD errors."""
+        priorities = ((np.abs(td_errors) + self.epsilon) ** self.alpha).astype(np.float32)
+        self.priorities[indices] = priorities
+        self.tree.update(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+    def arrays(self):
+        arrays = super().arrays()
+        arrays["priorities"] = self.priorities
+        return arrays
+
+    def load(self, filename):
+        self.priorities[:] = 0
+        super().load(filename)
+        self._rebuild()
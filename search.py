@@ -0,0 +1,398 @@
+import time
+import chess
+import chess.polyglot
+from evaluation import IncrementalEvaluator, MaterialFeature, CenterFeature
+
+INFINITY = 1000000
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000
+# Tablebase wins score below any mate, less per ply to reach them
+TABLEBASE_SCORE = MATE_THRESHOLD - 1000
+TABLEBASE_THRESHOLD = TABLEBASE_SCORE - 1000
+
+# Piece values in centipawns, indexed by piece type
+PIECE_VALUES = [0, 100, 320, 330, 500, 900, 0]
+CENTER_BONUS = 50
+
+# Transposition table entry flags
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+def search_features():
+    """Features of the search's static evaluation: material and center occupation in centipawns."""
+    return [MaterialFeature(PIECE_VALUES), CenterFeature(CENTER_BONUS)]
+
+_SEARCH_FEATURES = search_features()
+
+def evaluate(board):
+    """Static evaluation in centipawns from the side to move's point of view.
+
+    Recounts the same terms as evaluation.get_reward (material and
+    occupation of the four center squares) from scratch; an
+    incremental_evaluator() keeps the same score up to date instead.
+    """
+    score = 0
+    for feature in _SEARCH_FEATURES:
+        score += feature.full(board)
+    return score if board.turn == chess.WHITE else -score
+
+def incremental_evaluator(verify=False):
+    """IncrementalEvaluator with the same terms and values as evaluate()."""
+    return IncrementalEvaluator(search_features(), verify=verify)
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time limit is reached."""
+
+class TranspositionTable:
+    """Fixed-size hash table of search results keyed by Zobrist hash.
+
+    Each key maps to one slot. An existing entry is replaced when it belongs
+    to the same position, comes from an older search, or was searched to a
+    depth no greater than the new result (depth-preferred with aging).
+    """
+    def __init__(self, size=1 << 18):
+        self.size = size
+        self.entries = [None] * size
+        self.age = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        """Mark existing entries as belonging to a previous search."""
+        self.age += 1
+
+    def clear(self):
+        """Remove all entries."""
+        self.entries = [None] * self.size
+
+    def probe(self, key):
+        """Return (depth, score, flag, move) for key, or None."""
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1:5]
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        """Store a search result, subject to the replacement policy."""
+        index = key % self.size
+        entry = self.entries[index]
+        if entry is None or entry[0] == key or entry[5] != self.age or depth >= entry[1]:
+            self.entries[index] = (key, depth, score, flag, move, self.age)
+            self.stores += 1
+
+class SearchInfo:
+    """Statistics of a completed search iteration."""
+    def __init__(self, depth, score, nodes, elapsed, pv):
+        self.depth = depth
+        self.score = score
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.pv = pv
+
+    @property
+    def nps(self):
+        """Nodes searched per second."""
+        return int(self.nodes / self.elapsed) if self.elapsed > 0 else 0
+
+    def __str__(self):
+        if abs(self.score) >= MATE_THRESHOLD:
+            moves_to_mate = (MATE_SCORE - abs(self.score) + 1) // 2
+            score = f"mate {moves_to_mate if self.score > 0 else -moves_to_mate}"
+        elif abs(self.score) >= TABLEBASE_THRESHOLD:
+            score = "tablebase win" if self.score > 0 else "tablebase loss"
+        else:
+            score = f"cp {self.score}"
+        pv = " ".join(move.uci() for move in self.pv)
+        return f"depth {self.depth} score {score} nodes {self.nodes} nps {self.nps} time {self.elapsed:.2f}s pv {pv}"
+
+class SearchEngine:
+    """Iterative-deepening alpha-beta (PVS) search used as a computer opponent.
+
+    Moves are ordered by transposition table move, MVV-LVA for captures,
+    killer moves and the history heuristic. Leaf positions are resolved
+    with a capture-only quiescence search.
+
+    Static evaluation calls evaluate(board), or, when an
+    IncrementalEvaluator is given, reads the score it keeps up to date
+    while the search plays and takes back moves through it.
+
+    With a tablebase.EndgameTablebase, positions it covers are scored by
+    their WDL result inside the search, and a root position it covers is
+    not searched at all: the tablebase's DTZ-optimal move is played.
+    """
+    def __init__(self, tt_size=1 << 18, max_time=5.0, max_depth=64, evaluate=evaluate, evaluator=None,
+                 tablebase=None):
+        self.tt = TranspositionTable(tt_size)
+        self.tablebase = tablebase
+        self.max_time = max_time
+        self.max_depth = max_depth
+        self.evaluator = evaluator
+        if evaluator is not None:
+            self.evaluate = evaluator.evaluate
+            self.push = evaluator.push
+            self.pop = evaluator.pop
+        else:
+            self.evaluate = evaluate
+            self.push = chess.Board.push
+            self.pop = chess.Board.pop
+        self.killers = []
+        self.history = {}
+        self.nodes = 0
+        self.deadline = None
+        self.search_start = None
+        self.stop_event = None
+        self.root_best = None
+        self.last_info = None
+
+    def time_for_move(self, timer, color):
+        """Time budget for one move: a 30th of the remaining clock, capped at max_time."""
+        remaining = timer.white_time if color == chess.WHITE else timer.black_time
+        return max(0.05, min(remaining / 30, self.max_time))
+
+    def choose_move(self, board, timer):
+        """Opponent interface used by ChessEngine: search within the clock's budget."""
+        return self.search(board, max_time=self.time_for_move(timer, board.turn))
+
+    def set_time_limit(self, max_time):
+        """Give a running search max_time seconds from now (used when a ponder search becomes real)."""
+        self.search_start = time.perf_counter()
+        self.deadline = self.search_start + max_time
+
+    def search(self, board, max_time=None, max_depth=None, info_callback=None, stop_event=None):
+        """Search board and return (best_move, SearchInfo of the deepest completed iteration).
+
+        Without max_time the search runs until max_depth or until stop_event
+        (a threading.Event) is set from another thread.
+        """
+        max_depth = max_depth or self.max_depth
+        board = board.copy()
+        start = time.perf_counter()
+        self.search_start = start
+        self.deadline = start + max_time if max_time else None
+        self.stop_event = stop_event
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(max_depth + 64)]
+        self.history = {key: value // 2 for key, value in self.history.items()}
+        self.tt.new_search()
+        if self.evaluator is not None:
+            self.evaluator.reset(board)
+
+        legal_moves = list(board.legal_moves)
+        if not legal_moves:
+            return None, None
+
+        if self.tablebase is not None:
+            move = self.tablebase.best_move(board)
+            if move is not None:
+                score = self._tablebase_score(self.tablebase.probe_wdl(board), 0)
+                self.last_info = SearchInfo(0, score, 0, time.perf_counter() - start, [move])
+                return move, self.last_info
+
+        best_move = legal_moves[0]
+        info = None
+        for depth in range(1, max_depth + 1):
+            self.root_best = None
+            try:
+                score = self._negamax(board, depth, -INFINITY, INFINITY, 0)
+            except SearchTimeout:
+                # Moves found in a partial iteration beat the previous best, which is searched first
+                if self.root_best is not None:
+                    best_move = self.root_best
+                break
+            best_move = self.root_best
+            elapsed = time.perf_counter() - start
+            info = SearchInfo(depth, score, self.nodes, elapsed, self._principal_variation(board, depth))
+            if info_callback:
+                info_callback(info)
+            if abs(score) >= MATE_THRESHOLD or len(legal_moves) == 1:
+                break
+            # The next iteration would almost certainly not finish in time
+            deadline = self.deadline
+            if deadline and time.perf_counter() - self.search_start > (deadline - self.search_start) / 2:
+                break
+
+        if info is None:
+            info = SearchInfo(0, 0, self.nodes, time.perf_counter() - start, [best_move])
+        else:
+            info.nodes = self.nodes
+            info.elapsed = time.perf_counter() - start
+        self.last_info = info
+        return best_move, info
+
+    def _check_time(self):
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
+        if self.deadline and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def _negamax(self, board, depth, alpha, beta, ply):
+        """Principal variation search returning the score from the side to move's view."""
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self._check_time()
+
+        if ply > 0 and (board.halfmove_clock >= 100 or
+                        (board.halfmove_clock >= 4 and board.is_repetition(2))):
+            return 0
+
+        if ply > 0 and self.tablebase is not None:
+            wdl = self.tablebase.probe_wdl(board)
+            if wdl is not None:
+                return self._tablebase_score(wdl, ply)
+
+        in_check = board.is_check()
+        if in_check:
+            depth += 1
+        if depth <= 0:
+            return self._quiesce(board, alpha, beta, ply)
+
+        key = chess.polyglot.zobrist_hash(board)
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if ply > 0 and tt_depth >= depth:
+                tt_score = self._score_from_tt(tt_score, ply)
+                if tt_flag == EXACT:
+                    return tt_score
+                if tt_flag == LOWER_BOUND and tt_score >= beta:
+                    return tt_score
+                if tt_flag == UPPER_BOUND and tt_score <= alpha:
+                    return tt_score
+
+        moves = list(board.legal_moves)
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        for i, move in enumerate(self._order_moves(board, moves, tt_move, ply)):
+            quiet = not board.is_capture(move) and not move.promotion
+            self.push(board, move)
+            if i == 0:
+                score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                score = -self._negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta:
+                    score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            self.pop(board)
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+                if ply == 0:
+                    self.root_best = move
+            if alpha >= beta:
+                if quiet:
+                    self._update_killers_and_history(board, move, depth, ply)
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, self._score_to_tt(best_score, ply), flag, best_move)
+        return best_score
+
+    def _tablebase_score(self, wdl, ply):
+        """Search score of a tablebase result; 50-move-rule wins and losses count as draws."""
+        if wdl >= 2:
+            return TABLEBASE_SCORE - ply
+        if wdl <= -2:
+            return -TABLEBASE_SCORE + ply
+        return 0
+
+    def _quiesce(self, board, alpha, beta, ply):
+        """Capture-only search to settle tactical exchanges at the horizon."""
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self._check_time()
+
+        stand_pat = self.evaluate(board)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = sorted(board.generate_legal_captures(), key=lambda move: self._mvv_lva(board, move), reverse=True)
+        for move in captures:
+            self.push(board, move)
+            score = -self._quiesce(board, -beta, -alpha, ply + 1)
+            self.pop(board)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def _mvv_lva(self, board, move):
+        """Most valuable victim, least valuable attacker capture score."""
+        victim = board.piece_type_at(move.to_square) or chess.PAWN  # en passant
+        attacker = board.piece_type_at(move.from_square)
+        return 10 * PIECE_VALUES[victim] - PIECE_VALUES[attacker]
+
+    def _order_moves(self, board, moves, tt_move, ply):
+        """Sort moves: TT move, captures and promotions by MVV-LVA, killers, then history."""
+        killers = self.killers[ply]
+        turn = board.turn
+        scored = []
+        for move in moves:
+            if move == tt_move:
+                score = 10000000
+            elif board.is_capture(move):
+                score = 1000000 + self._mvv_lva(board, move)
+            elif move.promotion:
+                score = 900000 + PIECE_VALUES[move.promotion]
+            elif move == killers[0]:
+                score = 800000
+            elif move == killers[1]:
+                score = 700000
+            else:
+                score = self.history.get((turn, move.from_square, move.to_square), 0)
+            scored.append((score, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+    def _update_killers_and_history(self, board, move, depth, ply):
+        killers = self.killers[ply]
+        if move != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = move
+        key = (board.turn, move.from_square, move.to_square)
+        self.history[key] = min(self.history.get(key, 0) + depth * depth, 600000)
+
+    def _score_to_tt(self, score, ply):
+        """Store mate scores relative to the node rather than the root."""
+        if score >= MATE_THRESHOLD:
+            return score + ply
+        if score <= -MATE_THRESHOLD:
+            return score - ply
+        return score
+
+    def _score_from_tt(self, score, ply):
+        if score >= MATE_THRESHOLD:
+            return score - ply
+        if score <= -MATE_THRESHOLD:
+            return score + ply
+        return score
+
+    def _principal_variation(self, board, depth):
+        """Follow transposition table moves from the root."""
+        pv = []
+        seen = set()
+        for _ in range(depth):
+            key = chess.polyglot.zobrist_hash(board)
+            entry = self.tt.probe(key)
+            if entry is None or entry[3] is None or key in seen or not board.is_legal(entry[3]):
+                break
+            seen.add(key)
+            pv.append(entry[3])
+            board.push(entry[3])
+        for _ in pv:
+            board.pop()
+        return pv
@@ -0,0 +1,143 @@
+import multiprocessing as mp
+import os
+import queue
+import random
+import numpy as np
+from core import ChessEngine
+from encoding import board_to_state, move_to_index, index_to_move, legal_mask, masked_argmax, STATE_SIZE
+from evaluation import get_reward, IncrementalEvaluator
+
+def q_values(weights, states):
+    """Forward pass of the DQNAgent network in NumPy.
+
+    weights is the list returned by model.get_weights(): kernel and bias of
+    every Dense layer, with ReLU on all but the last layer. Workers use this
+    so that they never have to import TensorFlow.
+    """
+    x = states
+    last = len(weights) - 2
+    for i in range(0, len(weights), 2):
+        x = x @ weights[i] + weights[i + 1]
+        if i < last:
+            np.maximum(x, 0, out=x)
+    return x
+
+def play_game(game, weights, epsilon, max_moves=100, rng=random):
+    """Play one epsilon-greedy self-play game and return its transitions as arrays.
+
+    The last array holds each next state's legal-action mask, bit-packed as
+    ReplayBuffer.add_batch expects.
+    """
+    game.reset()
+    state = board_to_state(game.board)
+    legal_moves = game.legal_moves()
+    mask = legal_mask(legal_moves)
+    states, actions, rewards, next_states, dones, next_masks = [], [], [], [], [], []
+
+    while not game.game_over and len(actions) < max_moves:
+        if not legal_moves:
+            break
+
+        if rng.random() <= epsilon:
+            action = rng.choice(legal_moves)
+        else:
+            values = q_values(weights, state[np.newaxis])[0]
+            action = index_to_move(int(masked_argmax(values, mask)))
+
+        game.make_trusted_move(action)
+        next_state = board_to_state(game.board)
+        legal_moves = game.legal_moves()
+        mask = legal_mask(legal_moves)
+        states.append(state)
+        actions.append(move_to_index(action))
+        rewards.append(get_reward(game.board, game.evaluator, game.position_moves()))
+        next_states.append(next_state)
+        dones.append(game.game_over)
+        next_masks.append(np.packbits(mask))
+        state = next_state
+
+    return (
+        np.array(states, dtype=np.uint8).reshape(-1, STATE_SIZE),
+        np.array(actions, dtype=np.int32),
+        np.array(rewards, dtype=np.float32),
+        np.array(next_states, dtype=np.uint8).reshape(-1, STATE_SIZE),
+        np.array(dones, dtype=np.bool_),
+        np.array(next_masks, dtype=np.uint8).reshape(len(actions), -1)
+    )
+
+def _worker(worker_id, transitions, policy, stop, seed, max_moves):
+    """Self-play worker loop: play games with the latest policy and stream them back."""
+    rng = random.Random(seed)
+    game = ChessEngine(evaluator=IncrementalEvaluator())
+    weights, epsilon = policy.get()
+
+    while not stop.is_set():
+        # Pick up the newest policy if the learner pushed one
+        try:
+            while True:
+                weights, epsilon = policy.get_nowait()
+        except queue.Empty:
+            pass
+
+        transitions.put((worker_id, play_game(game, weights, epsilon, max_moves, rng)))
+
+class SelfPlayPool:
+    """Runs self-play games in a pool of worker processes.
+
+    Each worker owns a headless ChessEngine and a NumPy copy of the policy
+    network. Finished games are streamed back through a queue as arrays of
+    (state, action, reward, next_state, done) transitions; push_weights()
+    sends a new policy to every worker, which picks it up before its next game.
+    """
+    def __init__(self, weights, epsilon, num_workers=None, max_moves=100, seed=0, max_pending_games=64):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        # Workers never need the parent's TensorFlow state, so start them clean
+        context = mp.get_context("spawn")
+        self.transitions = context.Queue(maxsize=max_pending_games)
+        self.stop_event = context.Event()
+        self.policy_queues = [context.Queue() for _ in range(self.num_workers)]
+        self.workers = [
+            context.Process(
+                target=_worker,
+                args=(i, self.transitions, self.policy_queues[i], self.stop_event, seed + i, max_moves),
+                daemon=True
+            )
+            for i in range(self.num_workers)
+        ]
+        self.push_weights(weights, epsilon)
+        for worker in self.workers:
+            worker.start()
+
+    def push_weights(self, weights, epsilon):
+        """Send a new policy (network weights and exploration rate) to every worker."""
+        weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        for policy in self.policy_queues:
+            policy.put((weights, epsilon))
+
+    def get_game(self, timeout=None):
+        """Return (worker_id, transitions) of the next finished game, blocking up to timeout."""
+        return self.transitions.get(timeout=timeout)
+
+    def close(self):
+        """Stop all workers."""
+        self.stop_event.set()
+        # Unblock workers waiting on a full transitions queue
+        try:
+            while True:
+                self.transitions.get_nowait()
+        except queue.Empty:
+            pass
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        # Policies pushed after a worker's last game are never read; don't wait to flush them
+        for policy in self.policy_queues:
+            policy.cancel_join_thread()
+            policy.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
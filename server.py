@@ -0,0 +1,586 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import queue
+import secrets
+import socket
+import struct
+import threading
+import time
+
+import chess
+
+from core import ChessEngine, ChessTimer
+from movecache import LegalMoveCache
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_MESSAGE = 64 * 1024
+MAX_WRITE_BUFFER = 1024 * 1024
+SEATS = ("white", "black", "both")
+COLORS = {"white": chess.WHITE, "black": chess.BLACK}
+# Longest clock a client may ask for, in minutes per player
+MAX_MINUTES = 24 * 60
+
+def clock_minutes(value):
+    """A client's requested minutes per player, capped at MAX_MINUTES.
+
+    Raises ValueError unless value is a finite number above 0: NaN would
+    never run out and keep the flag timer firing, and a negative clock
+    starts out of time.
+    """
+    minutes = float(value)
+    if not math.isfinite(minutes) or minutes <= 0:
+        raise ValueError(f"minutes must be a positive number, not {value!r}")
+    return min(minutes, MAX_MINUTES)
+
+class ProtocolError(Exception):
+    """A client sent a malformed frame or handshake."""
+
+class LineConnection:
+    """A client speaking newline-delimited JSON over plain TCP."""
+    def __init__(self, reader, writer, first_line=None):
+        self.reader = reader
+        self.writer = writer
+        self.pending = first_line
+
+    async def receive(self):
+        """The next message text, or None when the client is gone."""
+        if self.pending is not None:
+            line, self.pending = self.pending, None
+        else:
+            line = await self.reader.readline()
+        if not line:
+            return None
+        return line.decode()
+
+    def send(self, data):
+        """Queue the encoded JSON message data; drop clients that stopped reading."""
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.writer.close()
+            return
+        self.writer.write(data + b"\n")
+
+    def close(self):
+        self.writer.close()
+
+class WebSocketConnection(LineConnection):
+    """A client speaking JSON text frames over RFC 6455 WebSocket, after the HTTP upgrade."""
+    async def handshake(self, request_line):
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ProtocolError("connection closed during handshake")
+            line = line.decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if headers.get("upgrade", "").lower() != "websocket" or key is None:
+            self.writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            raise ProtocolError(f"not a WebSocket upgrade: {request_line.strip()!r}")
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest()).decode()
+        self.writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                           f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+    async def _frame(self):
+        """(fin, opcode, unmasked payload) of the next frame."""
+        head = await self.reader.readexactly(2)
+        fin, opcode = head[0] & 0x80, head[0] & 0x0F
+        masked, length = head[1] & 0x80, head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", await self.reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", await self.reader.readexactly(8))[0]
+        if length > MAX_MESSAGE:
+            raise ProtocolError(f"{length}-byte frame")
+        if not masked:
+            raise ProtocolError("unmasked client frame")
+        mask = await self.reader.readexactly(4)
+        payload = await self.reader.readexactly(length)
+        # XOR with the repeated 4-byte mask as one big integer operation
+        key = int.from_bytes(mask * (length // 4 + 1), "little") & ((1 << (8 * length)) - 1)
+        payload = (int.from_bytes(payload, "little") ^ key).to_bytes(length, "little")
+        return fin, opcode, payload
+
+    async def receive(self):
+        message = b""
+        try:
+            while True:
+                fin, opcode, payload = await self._frame()
+                if opcode == 0x8:  # close
+                    self.writer.write(b"\x88\x00")
+                    return None
+                if opcode == 0x9:  # ping
+                    self._write_frame(0xA, payload)
+                    continue
+                if opcode == 0xA:  # pong
+                    continue
+                message += payload
+                if len(message) > MAX_MESSAGE:
+                    raise ProtocolError(f"{len(message)}-byte message")
+                if fin:
+                    return message.decode()
+        except asyncio.IncompleteReadError:
+            return None
+
+    def _write_frame(self, opcode, data):
+        length = len(data)
+        if length < 126:
+            header = struct.pack(">BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+        self.writer.write(header + data)
+
+    def send(self, data):
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.writer.close()
+            return
+        self._write_frame(0x1, data)
+
+class Session:
+    """One game on the server: a headless ChessEngine, its clients and their seats.
+
+    The engine's ChessTimer is the authoritative clock. A timer callback
+    is scheduled for the moment the side to move runs out of time, so
+    flags fall without polling thousands of clocks.
+    """
+    def __init__(self, session_id, minutes=10):
+        self.id = session_id
+        self.engine = ChessEngine(clocked=True)
+        self.engine.timer = ChessTimer(minutes)
+        self.clients = {}
+        self.flag_handle = None
+
+    def can_move(self, client):
+        seat = self.clients.get(client)
+        return seat == "both" or (seat in COLORS and COLORS[seat] == self.engine.board.turn)
+
+    def result(self):
+        """(result, reason) of a finished game, or (None, None)."""
+        engine = self.engine
+        if not engine.game_over:
+            return None, None
+        if engine.resigned:
+            return ("1-0" if engine.winner_by_resignation == chess.WHITE else "0-1"), "resignation"
+        timer = engine.timer
+        if timer.white_time <= 0:
+            return "0-1", "time"
+        if timer.black_time <= 0:
+            return "1-0", "time"
+        board = engine.board
+        if board.is_checkmate():
+            return ("0-1" if board.turn == chess.WHITE else "1-0"), "checkmate"
+        return "1/2-1/2", "stalemate" if board.is_stalemate() else "draw"
+
+    def state(self, request_id=None):
+        """The full position and clock message sent after every change."""
+        engine = self.engine
+        timer = engine.timer
+        result, reason = self.result()
+        return {
+            "type": "state", "session": self.id, "id": request_id,
+            "fen": engine.board.fen(),
+            "last_move": engine.last_move.uci() if engine.last_move else None,
+            "capture": engine.last_move_was_capture,
+            "ply": engine.current_position, "plies": len(engine.move_history),
+            "white": timer.white_time, "black": timer.black_time,
+            "running": timer.running, "game_over": engine.game_over,
+            "result": result, "reason": reason,
+        }
+
+    def clock(self):
+        timer = self.engine.timer
+        return {"type": "clock", "session": self.id, "white": timer.white_time, "black": timer.black_time,
+                "running": timer.running}
+
+class GameServer:
+    """Asyncio server keeping many headless ChessEngine sessions.
+
+    Clients connect over TCP and speak newline-delimited JSON, or over
+    WebSocket (detected from an HTTP GET on the same port) with one JSON
+    message per text frame. Requests:
+
+        {"type": "new", "color": "white"|"black"|"both", "minutes": 10}
+        {"type": "join", "session": ID, "color": "white"|"black"|"both"|null}
+        {"type": "move", "uci": "e2e4", "id": 1}
+        {"type": "undo"}, {"type": "redo"}, {"type": "reset"}, {"type": "resign"}
+
+    minutes must be a positive number and is capped at MAX_MINUTES.
+    new and join answer with a "joined" message followed by the session's
+    "state"; every change is pushed as a "state" to all of the session's
+    clients, carrying the id of the request that caused it, and running
+    clocks are pushed as "clock" every clock_interval seconds. Clients
+    without a color watch. Only the seat whose turn it is may move, and
+    undo, redo and reset are limited to "both" (hot-seat) seats. Errors
+    come back as {"type": "error", "message": ..., "id": ...}.
+
+    The server's timers are the only clocks that count: a move arriving
+    after the mover's time ran out is rejected and the game is lost on
+    time even if no client asked.
+    """
+    def __init__(self, host="127.0.0.1", port=8765, clock_interval=1.0):
+        self.host = host
+        self.port = port
+        self.clock_interval = clock_interval
+        self.sessions = {}
+        self.server = None
+        self.clock_task = None
+        self.moves = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, backlog=4096,
+                                                 limit=MAX_MESSAGE)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.clock_task = asyncio.get_running_loop().create_task(self._clock_loop())
+        return self
+
+    async def close(self):
+        self.clock_task.cancel()
+        self.server.close()
+        for session in list(self.sessions.values()):
+            for client in list(session.clients):
+                client.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        writer.transport.set_write_buffer_limits(high=MAX_WRITE_BUFFER)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = None
+        session = None
+        try:
+            first_line = await reader.readline()
+            if first_line.startswith(b"GET "):
+                client = WebSocketConnection(reader, writer)
+                await client.handshake(first_line.decode("latin-1"))
+            else:
+                client = LineConnection(reader, writer, first_line)
+            while True:
+                text = await client.receive()
+                if text is None:
+                    break
+                if not text.strip():
+                    continue
+                session = self._dispatch(client, session, text)
+        except (ProtocolError, ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            if session is not None:
+                self._leave(client, session)
+            writer.close()
+
+    def _dispatch(self, client, session, text):
+        """Handle one request and return the client's session afterwards."""
+        request_id = None
+        try:
+            request = json.loads(text)
+            request_id = request.get("id")
+            kind = request.get("type")
+            if kind in ("new", "join"):
+                seat = request.get("color", "both" if kind == "new" else None)
+                if seat is not None and seat not in SEATS:
+                    raise ValueError(f"unknown color {seat!r}")
+                if kind == "new":
+                    new_session = Session(secrets.token_hex(4), clock_minutes(request.get("minutes", 10)))
+                    self.sessions[new_session.id] = new_session
+                else:
+                    new_session = self.sessions.get(request.get("session"))
+                    if new_session is None:
+                        raise ValueError(f"no session {request.get('session')!r}")
+                if session is not None:
+                    self._leave(client, session)
+                session = new_session
+                session.clients[client] = seat
+                self._send(client, {"type": "joined", "session": session.id, "color": seat, "id": request_id})
+                self._send(client, session.state(request_id))
+                return session
+            if session is None:
+                raise ValueError("not in a session")
+            if kind == "move":
+                self._move(client, session, request.get("uci"), request_id)
+            elif kind in ("undo", "redo", "reset"):
+                if session.clients[client] != "both":
+                    raise ValueError(f"{kind} needs a hot-seat session")
+                self._navigate(session, kind)
+                self._broadcast(session, session.state(request_id))
+            elif kind == "resign":
+                seat = session.clients[client]
+                if seat is None:
+                    raise ValueError("spectators cannot resign")
+                session.engine.resign_game(COLORS.get(seat))
+                self._schedule_flag(session)
+                self._broadcast(session, session.state(request_id))
+            else:
+                raise ValueError(f"unknown request {kind!r}")
+        except (ValueError, TypeError, AttributeError) as error:
+            self._send(client, {"type": "error", "message": str(error), "id": request_id})
+        return session
+
+    def _move(self, client, session, uci, request_id):
+        engine = session.engine
+        if engine.game_over:
+            raise ValueError("the game is over")
+        if not session.can_move(client):
+            raise ValueError("not your turn")
+        move = chess.Move.from_uci(uci)
+        engine.timer.update()
+        if engine.timer.is_time_up():
+            # The flag fell before the move arrived
+            self._flag(session)
+            raise ValueError("out of time")
+        if not engine.make_move(move):
+            raise ValueError(f"illegal move {uci}")
+        self.moves += 1
+        self._schedule_flag(session)
+        self._broadcast(session, session.state(request_id))
+
+    def _navigate(self, session, kind):
+        engine = session.engine
+        timer = engine.timer
+        timer.update()
+        if kind == "reset":
+            engine.reset()
+        elif kind == "undo":
+            engine.undo_move()
+        else:
+            engine.redo_move()
+        # Keep the clock running for the side to move after a takeback
+        timer.current_player = engine.board.turn
+        if engine.game_over:
+            timer.stop()
+        elif engine.game_started and not timer.is_time_up():
+            timer.running = True
+        self._schedule_flag(session)
+
+    def _schedule_flag(self, session):
+        """Arrange for _flag to run when the side to move's time runs out."""
+        if session.flag_handle is not None:
+            session.flag_handle.cancel()
+            session.flag_handle = None
+        timer = session.engine.timer
+        if timer.running:
+            remaining = timer.white_time if timer.current_player == chess.WHITE else timer.black_time
+            session.flag_handle = asyncio.get_running_loop().call_later(max(0.0, remaining), self._flag, session)
+
+    def _flag(self, session):
+        session.flag_handle = None
+        engine = session.engine
+        engine.timer.update()
+        if not engine.timer.is_time_up():
+            self._schedule_flag(session)
+            return
+        engine.game_over = True
+        engine.timer.stop()
+        self._broadcast(session, session.state())
+        if not session.clients:
+            self.sessions.pop(session.id, None)
+
+    def _leave(self, client, session):
+        session.clients.pop(client, None)
+        if not session.clients and (session.engine.game_over or not session.engine.game_started):
+            self.sessions.pop(session.id, None)
+            if session.flag_handle is not None:
+                session.flag_handle.cancel()
+
+    async def _clock_loop(self):
+        while True:
+            await asyncio.sleep(self.clock_interval)
+            for session in list(self.sessions.values()):
+                if session.clients and session.engine.timer.running:
+                    session.engine.timer.update()
+                    self._broadcast(session, session.clock())
+
+    def _send(self, client, message):
+        client.send(json.dumps(message).encode())
+
+    def _broadcast(self, session, message):
+        data = json.dumps(message).encode()
+        for client in list(session.clients):
+            client.send(data)
+
+class RemoteGame:
+    """A thin client mirror of a server session with the attributes ChessRenderer reads.
+
+    A background thread reads the server's messages into a queue; poll()
+    applies them from the UI thread. The board, last move, result and
+    clocks always come from the server: make_move() and the other actions
+    only send requests, and the local ChessTimer just counts down between
+    the server's clock updates. notify, if given, is called from the
+    network thread whenever a message arrives (e.g. to wake the pygame
+    event loop).
+    """
+    def __init__(self, host, port, session=None, color="both", minutes=10, notify=None):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile("rb")
+        self.messages = queue.Queue()
+        self.notify = notify
+        self.send_lock = threading.Lock()
+        self.next_id = 0
+        self.color = color
+        self.session = session
+        self.error = None
+        self.connected = True
+
+        self.board = chess.Board()
+        self.move_cache = LegalMoveCache()
+        self.timer = ChessTimer(minutes)
+        self.last_move = None
+        self.last_move_was_capture = False
+        self.game_over = False
+        self.game_started = False
+        self.resigned = False
+        self.winner_by_resignation = None
+        self.last_search_info = None
+        self.opponent = None
+
+        self.thread = threading.Thread(target=self._read, daemon=True)
+        self.thread.start()
+        if session is None:
+            self._request("new", color=color, minutes=minutes)
+        else:
+            self._request("join", session=session, color=color)
+
+    def _read(self):
+        try:
+            for line in self.file:
+                self.messages.put(json.loads(line))
+                if self.notify is not None:
+                    self.notify()
+        except (OSError, ValueError):
+            pass
+        self.messages.put({"type": "closed"})
+        if self.notify is not None:
+            self.notify()
+
+    def _request(self, kind, **fields):
+        self.next_id += 1
+        fields.update(type=kind, id=self.next_id)
+        try:
+            with self.send_lock:
+                self.sock.sendall(json.dumps(fields).encode() + b"\n")
+        except OSError:
+            self.connected = False
+        return self.next_id
+
+    def poll(self):
+        """Apply the messages received since the last call; return whether the position changed."""
+        changed = False
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                return changed
+            kind = message["type"]
+            if kind == "joined":
+                self.session, self.color = message["session"], message["color"]
+            elif kind == "state":
+                changed = self._apply_state(message) or changed
+            elif kind == "clock":
+                self._sync_clock(message, message["running"])
+            elif kind == "error":
+                self.error = message["message"]
+            elif kind == "closed":
+                self.connected = False
+                self.game_over = True
+                self.timer.stop()
+
+    def _sync_clock(self, message, running):
+        timer = self.timer
+        timer.white_time = message["white"]
+        timer.black_time = message["black"]
+        timer.current_player = self.board.turn
+        timer.running = running
+        timer.last_update = time.time()
+
+    def _apply_state(self, message):
+        board = chess.Board(message["fen"])
+        changed = board != self.board
+        if changed:
+            self.board = board
+            self.move_cache.invalidate()
+        self.last_move = chess.Move.from_uci(message["last_move"]) if message["last_move"] else None
+        self.last_move_was_capture = message["capture"]
+        self.game_over = message["game_over"]
+        self.game_started = message["plies"] > 0
+        self.resigned = message["reason"] == "resignation"
+        self.winner_by_resignation = ((chess.WHITE if message["result"] == "1-0" else chess.BLACK)
+                                      if self.resigned else None)
+        self._sync_clock(message, message["running"])
+        self.error = None
+        return changed
+
+    def is_opponent_turn(self):
+        """Whether the other seat is to move (never for a hot-seat client)."""
+        return self.color in COLORS and not self.game_over and self.board.turn != COLORS[self.color]
+
+    def make_move(self, move):
+        """Send move if it is legal here; the board changes when the server confirms it."""
+        if self.game_over or not self.move_cache.is_legal(self.board, move):
+            return False
+        self._request("move", uci=move.uci())
+        return True
+
+    def undo_move(self):
+        self._request("undo")
+        return True
+
+    def redo_move(self):
+        self._request("redo")
+        return True
+
+    def reset(self):
+        self._request("reset")
+
+    def resign_game(self):
+        self._request("resign")
+
+    def book_move(self):
+        return None
+
+    def position_moves(self):
+        return self.move_cache.position(self.board)
+
+    def legal_moves(self):
+        return self.position_moves().moves
+
+    def moves_from(self, square):
+        return self.position_moves().moves_from(square)
+
+    def is_promotion_move(self, from_square, to_square):
+        return self.position_moves().is_promotion(from_square, to_square)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve chess games over TCP and WebSocket.")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765, help="0 picks a free port")
+    parser.add_argument('--clock-interval', type=float, default=1.0, help="seconds between clock pushes")
+    args = parser.parse_args()
+
+    async def run():
+        server = await GameServer(args.host, args.port, args.clock_interval).start()
+        print(f"listening on {server.host}:{server.port}", flush=True)
+        await server.server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
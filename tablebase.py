@@ -0,0 +1,122 @@
+from collections import OrderedDict
+
+import chess
+import chess.syzygy
+
+from movecache import position_key
+
+_UNKNOWN = object()
+
+class EndgameTablebase:
+    """Syzygy tablebase probes of positions with few pieces, behind an LRU cache.
+
+    Opens the .rtbw/.rtbz files of a local directory with
+    chess.syzygy. probe(board) returns the position's (wdl, dtz) from the
+    side to move's point of view: wdl is 2 for a win, 1 for a win that the
+    50-move rule turns into a draw, 0 for a draw and -1/-2 for the
+    corresponding losses; dtz is the distance to the next capture or pawn
+    move that keeps that result. Positions with more pieces than the
+    largest table (or max_pieces), with castling rights, or whose table is
+    missing return None.
+
+    Results are cached per position (keyed like the legal move cache, by
+    the board's bitboards), so games and searches that keep returning to
+    the same endgame probe each position once. probe_wdl() skips the
+    slower DTZ probe for callers that only need the result. probes counts
+    the lookups that reached the files and hits the ones served from the
+    cache.
+
+    prober can replace the chess.syzygy.Tablebase with any object that
+    has get_wdl(board) and get_dtz(board).
+    """
+    def __init__(self, directory=None, max_pieces=None, cache_size=1 << 16, prober=None):
+        self.prober = prober if prober is not None else chess.syzygy.open_tablebase(directory)
+        if max_pieces is None:
+            # Table names are the pieces, e.g. KRPvKR
+            max_pieces = max((len(name) - 1 for name in getattr(self.prober, "wdl", ())), default=0)
+        self.max_pieces = max_pieces
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.probes = 0
+        self.hits = 0
+
+    def covers(self, board):
+        """Whether board has few enough pieces and no castling rights to be probed."""
+        return chess.popcount(board.occupied) <= self.max_pieces and not board.castling_rights
+
+    def _entry(self, board):
+        """The cache entry [wdl, dtz] of board, or None if board is not in the tables."""
+        if not self.covers(board):
+            return None
+        key = position_key(board)
+        cache = self.cache
+        entry = cache.get(key, _UNKNOWN)
+        if entry is not _UNKNOWN:
+            cache.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.probes += 1
+        wdl = self.prober.get_wdl(board)
+        entry = [wdl, _UNKNOWN] if wdl is not None else None
+        cache[key] = entry
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return entry
+
+    def probe_wdl(self, board):
+        """WDL of board from the side to move's point of view, or None."""
+        entry = self._entry(board)
+        return entry[0] if entry is not None else None
+
+    def probe(self, board):
+        """(wdl, dtz) of board from the side to move's point of view, or None.
+
+        dtz is None when the DTZ table is missing.
+        """
+        entry = self._entry(board)
+        if entry is None:
+            return None
+        if entry[1] is _UNKNOWN:
+            entry[1] = self.prober.get_dtz(board)
+        return entry[0], entry[1]
+
+    def best_move(self, board):
+        """The move that keeps the best result fastest, or None if board is not in the tables.
+
+        Wins go for a checkmate, then a capture or pawn move that keeps the
+        win, then the smallest DTZ; losses take the longest DTZ; among
+        equal results the first legal move is kept.
+        """
+        if self.probe_wdl(board) is None:
+            return None
+        best_move, best_key = None, None
+        for move in board.legal_moves:
+            zeroing = board.is_zeroing(move)
+            board.push(move)
+            if board.is_checkmate():
+                board.pop()
+                return move
+            result = self.probe(board)
+            board.pop()
+            if result is None:
+                continue
+            wdl, dtz = result
+            dtz = abs(dtz) if dtz is not None else 0
+            # wdl is the opponent's result after the move: lower is better for the mover
+            if wdl < 0:
+                key = (wdl, not zeroing, dtz)
+            elif wdl > 0:
+                key = (wdl, zeroing, -dtz)
+            else:
+                key = (wdl, False, 0)
+            if best_key is None or key < best_key:
+                best_move, best_key = move, key
+        return best_move
+
+    def clear(self):
+        """Drop all cached results."""
+        self.cache.clear()
+
+    def close(self):
+        if hasattr(self.prober, "close"):
+            self.prober.close()
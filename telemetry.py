@@ -0,0 +1,224 @@
+import collections
+import cProfile
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+_NULL_STAGE = nullcontext()
+
+class _StageTimer:
+    """Context manager adding the time spent inside it to one stage's total."""
+    def __init__(self, totals, name):
+        self.totals = totals
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.totals[self.name] += time.perf_counter() - self.start
+
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval from a background thread.
+
+    Unlike cProfile it does not slow down every function call, so it shows
+    where a long run really spends its time. Results are written as
+    collapsed stacks ("outer;inner;leaf count" per line), the input format
+    of flamegraph.pl and speedscope.
+    """
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def enable(self):
+        """Start sampling."""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self.thread.start()
+
+    def disable(self):
+        """Stop sampling."""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def dump_stats(self, filename):
+        """Write the collapsed stacks to filename."""
+        with open(filename, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class Telemetry:
+    """Per-stage timers, counters and gauges for training loops, exported once per episode.
+
+    Wrap each stage of a loop in ``with telemetry.stage(name):``, count
+    events with count() and record values such as epsilon with gauge().
+    end_episode() writes one record with every stage's seconds, each
+    counter and its rate per second over the episode, and the gauges, to
+    a JSONL or CSV file (chosen by the file extension) and, with
+    tensorboard_dir set, as TensorBoard scalars.
+
+    profile_episodes=(first, last) profiles that range of episodes with
+    cProfile (profiler="cprofile", written as .prof for pstats/snakeviz)
+    or the SamplingProfiler (profiler="sampling", collapsed stacks) into
+    profile_path.
+
+    A disabled Telemetry (enabled=False) hands out one shared no-op
+    context from stage() and returns immediately from the other methods,
+    so instrumented code costs a method call per stage when nothing is
+    recorded.
+    """
+    def __init__(self, path=None, tensorboard_dir=None, profile_episodes=None, profile_path="profile",
+                 profiler="cprofile", enabled=True):
+        self.enabled = enabled
+        self.path = path
+        self.profile_episodes = profile_episodes
+        self.profile_path = profile_path
+        self.profiler_kind = profiler
+        self.profiler = None
+        self.stage_seconds = collections.defaultdict(float)
+        self.counters = collections.defaultdict(int)
+        self.gauges = {}
+        self.timers = {}
+        self.episode_start = time.perf_counter()
+        self.run_start = self.episode_start
+        self.file = None
+        self.csv_fields = None
+        self.summary_writer = None
+        if not enabled:
+            return
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(path, "a", newline="")
+        if tensorboard_dir is not None:
+            import tensorflow as tf
+            self.summary_writer = tf.summary.create_file_writer(tensorboard_dir)
+
+    def stage(self, name):
+        """Context manager timing one stage."""
+        if not self.enabled:
+            return _NULL_STAGE
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = _StageTimer(self.stage_seconds, name)
+        return timer
+
+    def count(self, name, n=1):
+        """Add n to a counter."""
+        if self.enabled:
+            self.counters[name] += n
+
+    def gauge(self, name, value):
+        """Record the latest value of a quantity such as epsilon or buffer fill."""
+        if self.enabled:
+            self.gauges[name] = value
+
+    def begin_episode(self, episode):
+        """Start timing an episode (numbered from 1) and the profiler if it is in range."""
+        if not self.enabled:
+            return
+        self.episode_start = time.perf_counter()
+        if self.profile_episodes and self.profiler is None and episode == self.profile_episodes[0]:
+            self.profiler = SamplingProfiler() if self.profiler_kind == "sampling" else cProfile.Profile()
+            self.profiler.enable()
+
+    def end_episode(self, episode):
+        """Write the episode's record, reset the per-episode totals and return the record."""
+        if not self.enabled:
+            return None
+        now = time.perf_counter()
+        elapsed = now - self.episode_start
+        record = {"episode": episode, "elapsed": elapsed, "wall_time": now - self.run_start}
+        for name, seconds in sorted(self.stage_seconds.items()):
+            record[f"{name}_seconds"] = seconds
+        for name, value in sorted(self.counters.items()):
+            record[name] = value
+            record[f"{name}_per_second"] = value / elapsed if elapsed > 0 else 0.0
+        record.update(sorted(self.gauges.items()))
+        self._write(record)
+
+        self.stage_seconds.clear()
+        self.counters.clear()
+        if self.profiler is not None and episode >= self.profile_episodes[1]:
+            self.profiler.disable()
+            extension = ".txt" if self.profiler_kind == "sampling" else ".prof"
+            self.profiler.dump_stats(self.profile_path + extension)
+            self.profiler = None
+        return record
+
+    def _write(self, record):
+        if self.file is not None:
+            if self.path.endswith(".csv"):
+                self._write_csv(record)
+            else:
+                self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+        if self.summary_writer is not None:
+            import tensorflow as tf
+            from tensorflow.core.framework.summary_pb2 import SummaryMetadata
+            # tf.summary.write with the scalars plugin's metadata, which unlike
+            # tf.summary.scalar does not need the tensorboard package installed
+            metadata = SummaryMetadata()
+            metadata.plugin_data.plugin_name = "scalars"
+            metadata.plugin_data.content = b""
+            with self.summary_writer.as_default():
+                for name, value in record.items():
+                    if name != "episode":
+                        tf.summary.write(name, tf.constant(value, dtype=tf.float32), step=record["episode"],
+                                         metadata=metadata.SerializeToString())
+            self.summary_writer.flush()
+
+    def _write_csv(self, record):
+        if self.csv_fields is None:
+            with open(self.path, newline="") as f:
+                self.csv_fields = next(csv.reader(f), [])
+        new_fields = [name for name in record if name not in self.csv_fields]
+        if new_fields:
+            # A stage or counter showed up for the first time: rewrite the file with the wider header
+            self.file.close()
+            with open(self.path, newline="") as f:
+                rows = list(csv.DictReader(f))
+            self.csv_fields += new_fields
+            with open(self.path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=self.csv_fields)
+                writer.writeheader()
+                writer.writerows(rows)
+            self.file = open(self.path, "a", newline="")
+        csv.DictWriter(self.file, fieldnames=self.csv_fields).writerow(record)
+
+    def close(self):
+        """Stop profiling and close the output files."""
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.summary_writer is not None:
+            self.summary_writer.close()
+            self.summary_writer = None
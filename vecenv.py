@@ -0,0 +1,81 @@
+import numpy as np
+from core import ChessEngine
+from encoding import boards_to_states, legal_masks, index_to_move, STATE_SIZE, ACTION_SIZE
+from evaluation import get_reward, IncrementalEvaluator
+
+class VecChessEnv:
+    """N chess games stepped together with batched observations.
+
+    reset() and step() return (N, 768) float32 states and (N, ACTION_SIZE)
+    boolean legal-action masks, encoded for all boards at once, so an agent
+    can choose every game's move with one forward pass. step(actions) takes
+    one action index per game and returns the transition arrays
+    (next_states, rewards, dones, truncated, next_masks), where dones marks
+    games that ended and truncated games cut off after max_moves plies.
+    Finished and truncated games are reset automatically: the returned
+    next_states still show the final position, while the states and masks
+    attributes hold the observations to act on next.
+    """
+    def __init__(self, num_envs, max_moves=100):
+        self.num_envs = num_envs
+        self.max_moves = max_moves
+        self.games = [ChessEngine(evaluator=IncrementalEvaluator()) for _ in range(num_envs)]
+        self.states = np.zeros((num_envs, STATE_SIZE), dtype=np.float32)
+        self.masks = np.zeros((num_envs, ACTION_SIZE), dtype=np.bool_)
+        self.episode_rewards = np.zeros(num_envs, dtype=np.float32)
+        self.episode_lengths = np.zeros(num_envs, dtype=np.int32)
+        self.finished_episodes = []
+
+    def reset(self):
+        """Start a new game on every board and return (states, masks)."""
+        for game in self.games:
+            game.reset()
+        self.episode_rewards[:] = 0
+        self.episode_lengths[:] = 0
+        self._observe(self.states, self.masks)
+        return self.states, self.masks
+
+    def _observe(self, states, masks):
+        """Encode every board's state and legal-action mask into states and masks."""
+        boards_to_states([game.board for game in self.games], out=states)
+        legal_masks([game.legal_moves() for game in self.games], out=masks)
+
+    def step(self, actions):
+        """Play one action index per game and return (next_states, rewards, dones, truncated, next_masks)."""
+        n = self.num_envs
+        rewards = np.zeros(n, dtype=np.float32)
+        dones = np.zeros(n, dtype=np.bool_)
+        truncated = np.zeros(n, dtype=np.bool_)
+        for i, (game, action) in enumerate(zip(self.games, actions)):
+            move = index_to_move(int(action))
+            if not game.make_move(move):
+                raise ValueError(f"Illegal action {int(action)} ({move.uci()}) in game {i}: {game.board.fen()}")
+            rewards[i] = get_reward(game.board, game.evaluator, game.position_moves())
+            dones[i] = game.game_over or not game.legal_moves()
+            truncated[i] = not dones[i] and game.current_position >= self.max_moves
+
+        next_states = np.empty((n, STATE_SIZE), dtype=np.float32)
+        next_masks = np.empty((n, ACTION_SIZE), dtype=np.bool_)
+        self._observe(next_states, next_masks)
+
+        self.episode_rewards += rewards
+        self.episode_lengths += 1
+        # New arrays, so that callers can still use the states they passed to step()
+        self.states = next_states.copy()
+        self.masks = next_masks.copy()
+        finished = np.flatnonzero(dones | truncated)
+        for i in finished:
+            self.finished_episodes.append((float(self.episode_rewards[i]), int(self.episode_lengths[i])))
+            self.episode_rewards[i] = 0
+            self.episode_lengths[i] = 0
+            self.games[i].reset()
+        if len(finished):
+            restarted = [self.games[i] for i in finished]
+            self.states[finished] = boards_to_states([game.board for game in restarted])
+            self.masks[finished] = legal_masks([game.legal_moves() for game in restarted])
+        return next_states, rewards, dones, truncated, next_masks
+
+    def pop_finished_episodes(self):
+        """Return and clear (total reward, length) of the episodes finished since the last call."""
+        finished, self.finished_episodes = self.finished_episodes, []
+        return finished
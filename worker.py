@@ -0,0 +1,111 @@
+import queue
+import threading
+
+class SearchWorker:
+    """Runs SearchEngine searches in a background thread so the UI loop never blocks.
+
+    Results are delivered through a queue that the main loop drains with
+    poll(): ("info", SearchInfo) after every completed iteration and
+    ("bestmove", move, SearchInfo) when a real (non-ponder) search ends.
+    cancel() stops the running search; messages of cancelled searches are
+    dropped.
+
+    While the opponent is thinking the worker can ponder: it searches the
+    position after the move it expects the opponent to play. If that move
+    is played, ponderhit() turns the running search into the real one with
+    a time limit; otherwise the ponder search is cancelled and its work
+    survives only in the shared transposition table.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = None
+        self.search_id = 0
+        self.pondering = False
+        self.ponder_move = None
+        self.ponder_result = None
+
+    def is_thinking(self):
+        """Check if a real (non-ponder) search is running."""
+        return self.thread is not None and self.thread.is_alive() and not self.pondering
+
+    def start(self, board, max_time):
+        """Cancel any running search and start searching board for max_time seconds."""
+        self.cancel()
+        self._launch(board, max_time, ponder=False)
+
+    def ponder(self, board, predicted_move):
+        """Search the position after predicted_move without a time limit until ponderhit() or cancel()."""
+        self.cancel()
+        if predicted_move not in board.legal_moves:
+            return
+        ponder_board = board.copy()
+        ponder_board.push(predicted_move)
+        self.ponder_move = predicted_move
+        self._launch(ponder_board, None, ponder=True)
+
+    def ponderhit(self, max_time):
+        """The predicted move was played: give the ponder search max_time and deliver its result."""
+        with self.lock:
+            if not self.pondering:
+                return False
+            self.pondering = False
+            self.ponder_move = None
+            if self.ponder_result is not None:
+                # The ponder search already finished (mate found or depth limit reached)
+                self.results.put(self.ponder_result)
+                self.ponder_result = None
+            else:
+                self.engine.set_time_limit(max_time)
+        return True
+
+    def cancel(self):
+        """Stop the running search, if any, and discard its results."""
+        with self.lock:
+            self.search_id += 1
+            self.pondering = False
+            self.ponder_move = None
+            self.ponder_result = None
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def poll(self):
+        """Return the messages of the current search that arrived since the last poll."""
+        messages = []
+        while True:
+            try:
+                search_id, message = self.results.get_nowait()
+            except queue.Empty:
+                return messages
+            if search_id == self.search_id:
+                messages.append(message)
+
+    def _launch(self, board, max_time, ponder):
+        with self.lock:
+            self.pondering = ponder
+            search_id = self.search_id
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run,
+            args=(search_id, board.copy(), max_time, self.stop_event),
+            name="SearchWorker",
+            daemon=True
+        )
+        self.thread.start()
+
+    def _run(self, search_id, board, max_time, stop_event):
+        def on_info(info):
+            self.results.put((search_id, ("info", info)))
+
+        move, info = self.engine.search(board, max_time=max_time, info_callback=on_info, stop_event=stop_event)
+        with self.lock:
+            if search_id != self.search_id:
+                return
+            if self.pondering:
+                self.ponder_result = (search_id, ("bestmove", move, info))
+                return
+        self.results.put((search_id, ("bestmove", move, info)))